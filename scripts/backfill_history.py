@@ -0,0 +1,92 @@
+"""
+Backfill - Integra al historial páginas HTML guardadas y CSV exportados por otros recolectores
+
+Los CSV (ancho como ratings_data.csv o largo TIMESTAMP,CHANNEL,RATING) se
+leen por bloques; las páginas (<slug>_<fecha>.html o <slug>/<fecha>.html,
+también .html.gz) se parsean en todos los núcleos con la misma regla que el
+scraper. Las lecturas se deduplican por TIMESTAMP + canal y se escriben con
+una pasada de merge por lote de --batch-rows filas; las que ya estaban en el
+historial se conservan.
+
+Tras la carga se reconstruyen los agregados (--rollups, si existen o se
+indican) y se descarta el cubo de franjas (--cube): ambos solo incorporan
+filas posteriores a la última que vieron. --skip-rollups / --skip-cube los
+dejan como están (por ejemplo para reconstruirlos después de varias cargas).
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/backfill_history.py paginas_guardadas/ export_otro.csv \\
+        --backend csv --path ratings_data.csv --align 1min --rename CHILEVISION=CHV
+"""
+import argparse
+import logging
+import os
+import time
+
+from archive import SegmentArchive, TieredStore
+from backfill import BackfillLoader, find_inputs
+from change_feed import ChangeNotifier, notify_path_for
+from channel_registry import load_channels
+from rating_scraper import RatingScraper
+from rollups import RollupStore
+from storage import STORAGE_BACKENDS, create_store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Carga masiva de historial de ratings")
+    parser.add_argument("inputs", nargs='+', help="CSV, páginas HTML o directorios con ellos")
+    parser.add_argument("--backend", default="csv", choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--path", default="ratings_data.csv", help="Historial destino")
+    parser.add_argument("--archive", help="Directorio de segmentos (ver compact_history.py)")
+    parser.add_argument("--channels", help="Catálogo de canales (por defecto channels.json)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para parsear páginas")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--batch-rows", type=int, default=1000000,
+                        help="Filas por pasada de escritura (acota la memoria)")
+    parser.add_argument("--align",
+                        help="Redondear TIMESTAMP hacia abajo (regla de pandas, ej: 1min)")
+    parser.add_argument("--rename", action='append', default=[], metavar='COLUMNA=CANAL',
+                        help="Columna del CSV a canal del catálogo (se puede repetir)")
+    parser.add_argument("--rollups",
+                        help="Agregados a reconstruir (por defecto ratings_rollups.db, si existe)")
+    parser.add_argument("--cube", default="ratings_cube.npz",
+                        help="Cubo de franjas a descartar tras la carga")
+    parser.add_argument("--skip-rollups", action="store_true", help="No reconstruir los agregados")
+    parser.add_argument("--skip-cube", action="store_true", help="No descartar el cubo de franjas")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Solo leer y deduplicar, sin escribir")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    store = create_store(args.backend, args.path)
+    if args.archive:
+        store = TieredStore(store, SegmentArchive(args.archive))
+    renames = dict(value.upper().split('=', 1) for value in args.rename)
+    loader = BackfillLoader(load_channels(args.channels, default=RatingScraper.CHANNELS),
+                            workers=args.workers, chunksize=args.chunksize, align=args.align,
+                            renames=renames, batch_rows=args.batch_rows)
+    csv_paths, page_paths = find_inputs(args.inputs)
+    summary = loader.load(store, csv_paths, page_paths, dry_run=args.dry_run)
+
+    if summary['added'] and not args.dry_run:
+        # El dashboard abierto relee el historial
+        ChangeNotifier(notify_path_for(store.location)).publish(
+            summary['rows'], summary['last_timestamp'].isoformat())
+        rollups_path = args.rollups or "ratings_rollups.db"
+        if not args.skip_rollups and (args.rollups or os.path.exists(rollups_path)):
+            RollupStore(rollups_path).rebuild(store.read())
+        if not args.skip_cube and os.path.exists(args.cube):
+            os.remove(args.cube)
+
+    print("=" * 60)
+    print(f"{'(simulación) ' if args.dry_run else ''}✓ {len(csv_paths)} CSV "
+          f"({summary['csv_rows']:,} filas) y {summary['pages']:,} páginas "
+          f"({summary['pages_without_rating']:,} sin rating, "
+          f"{summary['pages_unknown_channel']:,} de canales desconocidos)")
+    if summary['rows']:
+        print(f"  {summary['readings']:,} lecturas en {summary['rows']:,} filas, "
+              f"{summary['first_timestamp']} a {summary['last_timestamp']} "
+              f"({summary['duplicates']:,} duplicadas descartadas)")
+    print(f"  {summary['added']:,} lecturas nuevas en {store.location} | "
+          f"{time.perf_counter() - start:.1f}s")
+    print("=" * 60)
@@ -0,0 +1,100 @@
+"""
+Benchmark - Costo de Transformer.append_to_csv a medida que crece el historial
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/bench_append.py --max-rows 1000000 --legacy
+"""
+import argparse
+import json
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from transformer import Transformer
+
+CHANNELS = ['CHV', 'CANAL13', 'TVM', 'TVNO', 'LARED', 'MEGA']
+
+
+def synthetic_rows(count: int, start: datetime):
+    """Genera filas con el mismo formato que produce transform_ratings"""
+    for i in range(count):
+        row = {'TIMESTAMP': (start + timedelta(minutes=i)).isoformat()}
+        for channel in CHANNELS:
+            row[channel] = round(random.uniform(0, 40), 1)
+        yield row
+
+
+def grow_file(filepath: str, current: int, target: int):
+    """Hace crecer el CSV hasta target filas usando escrituras en lote"""
+    start = datetime(2024, 1, 1) + timedelta(minutes=current)
+    batch = []
+    for row in synthetic_rows(target - current, start):
+        batch.append(row)
+        if len(batch) >= 100000:
+            Transformer.append_rows_to_csv(batch, filepath)
+            batch = []
+    Transformer.append_rows_to_csv(batch, filepath)
+
+
+def legacy_append(data: dict, filepath: str):
+    """Implementación anterior: leer todo, concatenar y reescribir"""
+    import pandas as pd
+    existing_df = pd.read_csv(filepath)
+    combined_df = pd.concat([existing_df, pd.DataFrame([data])], ignore_index=True)
+    combined_df.to_csv(filepath, index=False)
+
+
+def time_appends(append_fn, filepath: str, repeats: int) -> float:
+    """Mide la mediana (ms) de varias llamadas a append_fn"""
+    samples = []
+    for row in synthetic_rows(repeats, datetime(2030, 1, 1)):
+        t0 = time.perf_counter()
+        append_fn(row, filepath)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de append_to_csv")
+    parser.add_argument("--max-rows", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--fsync", action="store_true", help="Medir con fsync activado")
+    parser.add_argument("--legacy", action="store_true", help="Comparar con read-concat-rewrite")
+    parser.add_argument("--output", help="Ruta opcional para guardar resultados en JSON")
+    args = parser.parse_args()
+
+    sizes = [n for n in (1000, 10000, 100000, 1000000, 10000000) if n <= args.max_rows]
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = str(Path(tmp) / "ratings_bench.csv")
+        current = 0
+        for size in sizes:
+            grow_file(filepath, current, size)
+            current = size
+
+            append_ms = time_appends(
+                lambda row, path: Transformer.append_to_csv(row, path, fsync=args.fsync),
+                filepath, args.repeats
+            )
+            current += args.repeats
+            result = {'rows': size, 'append_ms': round(append_ms, 3)}
+
+            # El método anterior es O(historial): se limita a pocas repeticiones
+            if args.legacy and size <= 1000000:
+                result['legacy_ms'] = round(time_appends(legacy_append, filepath, 3), 3)
+                current += 3
+
+            results.append(result)
+            legacy = f" | legacy: {result['legacy_ms']:>10.3f} ms" if 'legacy_ms' in result else ""
+            print(f"{size:>10,} filas | append: {result['append_ms']:>8.3f} ms{legacy}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
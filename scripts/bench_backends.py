@@ -0,0 +1,86 @@
+"""
+Benchmark - Compara los backends de RatingScraper contra el servidor stub local
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/bench_backends.py --cycles 5 --backends http playwright
+"""
+import argparse
+import resource
+import statistics
+import time
+
+from rating_scraper import RatingScraper
+from stub_zapping_server import start_stub_server
+
+
+def run_backend(backend: str, base_url: str, cycles: int, max_concurrency: int,
+                **scraper_options) -> dict:
+    """Mide arranque, duración por ciclo y CPU consumida por un backend"""
+    usage_before = resource.getrusage(resource.RUSAGE_SELF)
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    t0 = time.perf_counter()
+    scraper = RatingScraper(backend=backend, base_url=base_url, max_concurrency=max_concurrency,
+                            **scraper_options)
+    scraper.start()
+    startup = time.perf_counter() - t0
+
+    durations = []
+    failures = 0
+    total_bytes = 0
+    blocked = 0
+    try:
+        for _ in range(cycles):
+            t0 = time.perf_counter()
+            ratings = scraper.scrape_all_channels()
+            durations.append(time.perf_counter() - t0)
+            failures += sum(1 for value in ratings.values() if value is None)
+            total_bytes += sum(stats['bytes'] for stats in scraper.last_stats.values())
+            blocked += sum(stats['blocked'] for stats in scraper.last_stats.values())
+    finally:
+        scraper.close()
+
+    usage_after = resource.getrusage(resource.RUSAGE_SELF)
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = ((usage_after.ru_utime + usage_after.ru_stime)
+           - (usage_before.ru_utime + usage_before.ru_stime)
+           + (children_after.ru_utime + children_after.ru_stime)
+           - (children_before.ru_utime + children_before.ru_stime))
+
+    return {
+        'backend': backend,
+        'startup_s': startup,
+        'cycle_median_s': statistics.median(durations),
+        'cpu_s': cpu,
+        'failures': failures,
+        'kb_per_cycle': total_bytes / 1024 / cycles,
+        'blocked_per_cycle': blocked / cycles,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de backends del scraper")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--backends", nargs="+", default=list(RatingScraper.BACKENDS))
+    parser.add_argument("--block-resources", action="store_true",
+                        help="Bloquear recursos no esenciales en Playwright")
+    parser.add_argument("--wait-for", choices=["networkidle", "selector"], default="networkidle")
+    args = parser.parse_args()
+
+    server = start_stub_server()
+    try:
+        for backend in args.backends:
+            result = run_backend(backend, server.base_url, args.cycles, args.concurrency,
+                                 block_resources=args.block_resources, wait_for=args.wait_for)
+            print(f"{result['backend']:>10} | arranque: {result['startup_s']:.3f}s"
+                  f" | ciclo: {result['cycle_median_s']:.3f}s"
+                  f" | CPU: {result['cpu_s']:.2f}s | fallos: {result['failures']}"
+                  f" | {result['kb_per_cycle']:.1f} KB/ciclo"
+                  f" | {result['blocked_per_cycle']:.0f} bloqueados/ciclo")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""
+Benchmark - Suite offline de los caminos críticos: scraping, escritura, carga y gráfico
+
+Mide contra el servidor stub local (sin red) y contra historiales CSV
+sintéticos reproducibles:
+    - scrape: throughput de scrape_all_channels con latencia y fallas simuladas
+    - append: latencia de Transformer.append_to_csv sobre historiales grandes
+    - load:   parseo del historial como lo hace load_data (IncrementalLoader)
+    - chart:  construcción y serialización de create_timeline_chart
+
+Los resultados se guardan en JSON para comparar entre versiones.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/bench_suite.py --sizes 1000 100000 1000000
+    PYTHONPATH=src python scripts/bench_suite.py --sizes 10000000 --only load chart
+    PYTHONPATH=src python scripts/bench_suite.py --compare bench_results/anterior.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from bench_append import synthetic_rows
+from data_loader import IncrementalLoader
+from rating_scraper import RatingScraper
+from storage import create_store
+from stub_zapping_server import start_stub_server
+from transformer import Transformer
+
+BENCHMARKS = ('scrape', 'append', 'load', 'chart')
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+CHANNELS = list(RatingScraper.CHANNELS)
+
+
+def fixture_path(directory: Path, rows: int, seed: int) -> Path:
+    """
+    Historial sintético de `rows` filas, generado una vez y reutilizado
+
+    Las filas tienen el mismo formato que escribe el Orchestrator (una por
+    minuto, un rating con un decimal por canal) y dependen solo de la semilla.
+
+    Args:
+        directory: Carpeta de fixtures
+        rows: Cantidad de filas
+        seed: Semilla del generador
+
+    Returns:
+        Ruta del CSV
+    """
+    path = directory / f"history_{rows}_{seed}.csv"
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2020-01-01T00:00:00', 's')
+    tmp_path = path.with_suffix('.tmp')
+    chunk = 1_000_000
+    t0 = time.perf_counter()
+    for offset in range(0, rows, chunk):
+        n = min(chunk, rows - offset)
+        timestamps = start + np.arange(offset, offset + n).astype('timedelta64[m]')
+        frame = pd.DataFrame({'TIMESTAMP': timestamps.astype(str)})
+        # Paseo aleatorio acotado: se parece más a un rating real que ruido blanco
+        for channel in CHANNELS:
+            walk = np.cumsum(rng.normal(0, 0.3, n)) + rng.uniform(5, 25)
+            frame[channel] = np.round(np.clip(walk, 0, 40), 1)
+        frame.to_csv(tmp_path, mode='w' if offset == 0 else 'a', header=offset == 0, index=False)
+    os.replace(tmp_path, path)
+    print(f"  fixture {path.name} generado en {time.perf_counter() - t0:.1f}s")
+    return path
+
+
+def positive_int(value: str) -> int:
+    """Tipo de argparse para conteos que deben ser al menos 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"debe ser al menos 1: {value}")
+    return number
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Mediana, p95 y mínimo de una lista de duraciones"""
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {'median': statistics.median(ordered), 'p95': p95, 'min': ordered[0]}
+
+
+def timed(fn: Callable[[], object]) -> float:
+    """Segundos que tarda fn()"""
+    t0 = time.perf_counter()
+    fn()
+    return time.perf_counter() - t0
+
+
+def bench_scrape(args) -> List[dict]:
+    """Throughput de scrape_all_channels contra el servidor stub"""
+    server = start_stub_server(latency=args.latency, latency_jitter=args.latency_jitter,
+                               failure_rate=args.failure_rate, missing_rate=args.missing_rate,
+                               seed=args.seed)
+    results = []
+    try:
+        scraper = RatingScraper(backend=args.scrape_backend, base_url=server.base_url,
+                                max_concurrency=args.concurrency)
+        scraper.start()
+        try:
+            scraper.scrape_all_channels()  # calentamiento (conexiones, imports)
+            durations, missing = [], 0
+            for _ in range(args.cycles):
+                t0 = time.perf_counter()
+                ratings = scraper.scrape_all_channels()
+                durations.append(time.perf_counter() - t0)
+                missing += sum(1 for value in ratings.values() if value is None)
+        finally:
+            scraper.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    stats = summarize(durations)
+    params = {'backend': args.scrape_backend, 'concurrency': args.concurrency,
+              'latency': args.latency, 'failure_rate': args.failure_rate}
+    results.append(result('scrape', None, 'cycle_median', stats['median'], 's', params))
+    results.append(result('scrape', None, 'cycle_p95', stats['p95'], 's', params))
+    results.append(result('scrape', None, 'channels_per_second',
+                          len(CHANNELS) * len(durations) / sum(durations), '1/s', params))
+    results.append(result('scrape', None, 'none_rate',
+                          missing / (len(CHANNELS) * len(durations)), 'ratio', params))
+    return results
+
+
+def bench_append(path: Path, rows: int, args) -> List[dict]:
+    """Latencia de append_to_csv sobre una copia del historial"""
+    with tempfile.TemporaryDirectory() as tmp:
+        target = os.path.join(tmp, 'ratings_data.csv')
+        shutil.copyfile(path, target)
+        Transformer._header_cache.clear()
+
+        samples = []
+        random.seed(args.seed)
+        for row in synthetic_rows(args.append_repeats + 1, datetime(2040, 1, 1)):
+            samples.append(timed(lambda: Transformer.append_to_csv(row, target)))
+
+    # La primera escritura incluye la validación de la cabecera y la cola del archivo
+    stats = summarize(samples[1:])
+    return [
+        result('append', rows, 'first_append', samples[0], 's'),
+        result('append', rows, 'append_median', stats['median'], 's'),
+        result('append', rows, 'append_p95', stats['p95'], 's'),
+    ]
+
+
+def bench_load(path: Path, rows: int, args) -> Tuple[List[dict], pd.DataFrame]:
+    """Parseo completo e incremental del historial (el camino de load_data)"""
+    samples, incremental = [], []
+    df = None
+    for _ in range(args.load_repeats):
+        loader = IncrementalLoader(create_store('csv', str(path)))
+        t0 = time.perf_counter()
+        df = loader.load()
+        samples.append(time.perf_counter() - t0)
+        # Sin filas nuevas: solo se consulta el cursor
+        incremental.append(timed(loader.load))
+
+    stats = summarize(samples)
+    return [
+        result('load', rows, 'full_parse_median', stats['median'], 's'),
+        result('load', rows, 'rows_per_second', rows / stats['median'], '1/s'),
+        result('load', rows, 'incremental_noop_median', statistics.median(incremental), 's'),
+        result('load', rows, 'frame_memory', float(df.memory_usage(deep=True).sum()), 'bytes'),
+    ], df
+
+
+def bench_chart(df: pd.DataFrame, rows: int, args) -> List[dict]:
+    """Construcción y serialización del gráfico temporal"""
+    # dashboard configura la página de Streamlit al importarse; fuera de
+    # `streamlit run` solo emite advertencias que aquí se silencian
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    from dashboard import create_timeline_chart
+
+    build, serialize = [], []
+    points = 0
+    for _ in range(args.chart_repeats):
+        t0 = time.perf_counter()
+        fig = create_timeline_chart(df)
+        build.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        payload = fig.to_json()
+        serialize.append(time.perf_counter() - t0)
+        points = sum(len(trace.x) for trace in fig.data)
+
+    return [
+        result('chart', rows, 'build_median', statistics.median(build), 's'),
+        result('chart', rows, 'to_json_median', statistics.median(serialize), 's'),
+        result('chart', rows, 'points', float(points), 'count'),
+        result('chart', rows, 'payload', float(len(payload)), 'bytes'),
+    ]
+
+
+def result(benchmark: str, rows: Optional[int], metric: str, value: float, unit: str,
+           params: Optional[dict] = None) -> dict:
+    """Entrada de resultado en formato plano (una métrica por entrada)"""
+    entry = {'benchmark': benchmark, 'rows': rows, 'metric': metric,
+             'value': round(value, 9), 'unit': unit}
+    if params:
+        entry['params'] = params
+    return entry
+
+
+def environment() -> dict:
+    """Versión del código y del entorno donde se midió"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                cwd=Path(__file__).resolve().parent,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+    }
+
+
+def compare(current: List[dict], baseline_path: str):
+    """Imprime la variación de cada métrica respecto de un resultado anterior"""
+    baseline = json.loads(Path(baseline_path).read_text())
+    previous = {(r['benchmark'], r['rows'], r['metric']): r['value'] for r in baseline['results']}
+    print(f"\nComparación con {baseline_path} (commit {baseline['environment'].get('commit')}):")
+    print(f"{'benchmark':<8} {'filas':>10} {'métrica':<26} "
+          f"{'antes':>12} {'ahora':>12} {'cambio':>8}")
+    for r in current:
+        before = previous.get((r['benchmark'], r['rows'], r['metric']))
+        if before is None:
+            continue
+        change = f"{(r['value'] / before - 1) * 100:+.1f}%" if before else 'n/a'
+        print(f"{r['benchmark']:<8} {str(r['rows'] or '-'):>10} {r['metric']:<26} "
+              f"{before:>12.6g} {r['value']:>12.6g} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks offline")
+    parser.add_argument("--only", nargs='+', choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--sizes", nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help="Filas de los historiales sintéticos (hasta 10000000)")
+    parser.add_argument("--fixtures-dir", default=".bench_fixtures")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None,
+                        help="Archivo JSON de resultados "
+                             "(por defecto bench_results/<commit>-<fecha>.json)")
+    parser.add_argument("--compare", default=None, help="JSON anterior con el cual comparar")
+    # scrape
+    parser.add_argument("--cycles", type=positive_int, default=20)
+    parser.add_argument("--scrape-backend", default='http', choices=RatingScraper.BACKENDS)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.02)
+    parser.add_argument("--missing-rate", type=float, default=0.0)
+    # append / load / chart
+    parser.add_argument("--append-repeats", type=positive_int, default=50)
+    parser.add_argument("--load-repeats", type=positive_int, default=3)
+    parser.add_argument("--chart-repeats", type=positive_int, default=3)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, force=True)
+    env = environment()
+    results: List[dict] = []
+
+    if 'scrape' in args.only:
+        print(f"scrape ({args.scrape_backend}, {args.cycles} ciclos)...")
+        results.extend(bench_scrape(args))
+
+    fixtures = Path(args.fixtures_dir)
+    for rows in sorted(args.sizes):
+        if not {'append', 'load', 'chart'} & set(args.only):
+            break
+        print(f"historial de {rows:,} filas...")
+        path = fixture_path(fixtures, rows, args.seed)
+        if 'append' in args.only:
+            results.extend(bench_append(path, rows, args))
+        if {'load', 'chart'} & set(args.only):
+            load_results, df = bench_load(path, rows, args)
+            if 'load' in args.only:
+                results.extend(load_results)
+            if 'chart' in args.only:
+                results.extend(bench_chart(df, rows, args))
+            del df
+
+    for r in results:
+        print(f"  {r['benchmark']:<8} {str(r['rows'] or '-'):>10} {r['metric']:<26} "
+              f"{r['value']:.6g} {r['unit']}")
+
+    output = Path(args.output) if args.output else Path(
+        'bench_results') / f"{env['commit'] or 'local'}-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {'environment': env, 'args': vars(args), 'results': results}
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
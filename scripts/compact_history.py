@@ -0,0 +1,49 @@
+"""
+Compacta el historial: deja caliente solo lo reciente y archiva lo demás en segmentos comprimidos
+
+Las filas más viejas que --hot-days pasan a segmentos inmutables por día o
+mes (CSV gzip o Parquet) con un índice de rangos; los segmentos más viejos
+que --raw-days se reemplazan por promedios horarios. Pensado para correr
+desde cron (ej: una vez por día, entre ciclos del scraper). El dashboard lee
+el archivo si se define RATINGS_ARCHIVE_PATH.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/compact_history.py --backend csv --path ratings_data.csv \\
+        --archive ratings_archive --hot-days 7 --raw-days 90
+"""
+import argparse
+import logging
+import time
+
+from archive import GRANULARITIES, SEGMENT_FORMATS, RetentionPolicy, SegmentArchive, compact
+from storage import STORAGE_BACKENDS, create_store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retención por niveles del historial de ratings")
+    parser.add_argument("--backend", default="csv", choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--path", default="ratings_data.csv", help="Historial caliente")
+    parser.add_argument("--archive", default="ratings_archive", help="Directorio de segmentos")
+    parser.add_argument("--granularity", default="day", choices=GRANULARITIES)
+    parser.add_argument("--format", default="csv.gz", choices=list(SEGMENT_FORMATS))
+    parser.add_argument("--hot-days", type=float, default=7, help="Días que quedan en caliente")
+    parser.add_argument("--raw-days", type=float, default=90,
+                        help="Días con muestras originales; lo anterior se reduce (<0 = nunca)")
+    parser.add_argument("--rule", default="h", help="Regla de reducción de pandas ('h', 'D')")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    summary = compact(
+        create_store(args.backend, args.path),
+        SegmentArchive(args.archive, granularity=args.granularity, fmt=args.format),
+        RetentionPolicy(hot_days=args.hot_days,
+                        raw_days=args.raw_days if args.raw_days >= 0 else None, rule=args.rule),
+    )
+
+    print("=" * 60)
+    print(f"✓ {summary['archived_rows']:,} filas anteriores a {summary['cutoff']} archivadas "
+          f"({summary['segments']} segmentos escritos, {summary['downsampled']} reducidos)")
+    print(f"  Caliente: {summary['hot_bytes_before']:,} -> {summary['hot_bytes_after']:,} bytes | "
+          f"archivo: {summary['archive_bytes']:,} bytes | {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
@@ -0,0 +1,112 @@
+"""
+Presupuesto de tiempo de import de los puntos de entrada del scraper
+
+Importa cada módulo en un intérprete nuevo con ``python -X importtime``,
+informa el tiempo acumulado (mediana de varias corridas) y los módulos más
+caros, y verifica que las dependencias pesadas (pandas, numpy, Playwright,
+plotly) no se carguen al importar. Termina con código 1 si algún módulo
+supera su presupuesto o carga una dependencia pesada, para usarlo en CI o
+antes de publicar una imagen de cron.
+
+Uso:
+    PYTHONPATH=src python scripts/import_budget.py
+    PYTHONPATH=src python scripts/import_budget.py --budget orchestrator=120 --runs 7 --top 15
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Presupuesto por defecto en ms (import en frío, sin contar el arranque del intérprete)
+DEFAULT_BUDGETS_MS = {
+    'orchestrator': 150.0,
+    'rating_scraper': 80.0,
+    'storage': 40.0,
+    'transformer': 30.0,
+}
+
+# Dependencias que el camino de ingesta no debe cargar
+HEAVY_MODULES = ('pandas', 'numpy', 'playwright', 'plotly', 'pyarrow')
+
+# Imprime las dependencias pesadas realmente cargadas (un módulo diferido
+# por lazy_import sigue en sys.modules, pero como _LazyModule)
+_PROBE = (
+    "import sys, types; import {module}; "
+    "print(','.join(m for m in {heavy!r} "
+    "if type(sys.modules.get(m)) is types.ModuleType))"
+)
+
+
+def measure(module: str) -> Tuple[float, List[Tuple[str, float]], List[str]]:
+    """
+    Importa un módulo en un intérprete nuevo
+
+    Args:
+        module: Módulo a importar
+
+    Returns:
+        Tupla (ms acumulados del módulo, [(módulo, ms propios)], pesados cargados)
+    """
+    probe = _PROBE.format(module=module, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        capture_output=True, text=True, env=os.environ.copy()
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    cumulative = 0.0
+    own: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        own.append((name.strip(), int(self_us) / 1000))
+        if name.strip() == module:
+            cumulative = int(cumulative_us) / 1000
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return cumulative, own, loaded
+
+
+def parse_budgets(values: List[str]) -> Dict[str, float]:
+    """Convierte ['modulo=ms', ...] en un diccionario, partiendo de los valores por defecto"""
+    budgets = dict(DEFAULT_BUDGETS_MS)
+    for value in values:
+        module, _, limit = value.partition('=')
+        budgets[module] = float(limit)
+    return budgets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Presupuesto de tiempo de import")
+    parser.add_argument('--budget', action='append', default=[], metavar='MODULO=MS',
+                        help="Presupuesto de un módulo (se puede repetir)")
+    parser.add_argument('--runs', type=int, default=5,
+                        help="Corridas por módulo (se usa la mediana)")
+    parser.add_argument('--top', type=int, default=10, help="Módulos más caros a mostrar")
+    args = parser.parse_args()
+
+    budgets = parse_budgets(args.budget)
+    failures = []
+    for module, budget in budgets.items():
+        runs = [measure(module) for _ in range(args.runs)]
+        median = statistics.median(run[0] for run in runs)
+        _, own, loaded = runs[-1]
+        status = 'OK' if median <= budget and not loaded else 'FALLA'
+        print(f"{module:<16} {median:8.1f} ms  (presupuesto {budget:.0f} ms)  {status}")
+        for name, ms in sorted(own, key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {ms:8.1f} ms  {name}")
+        if loaded:
+            print(f"    carga dependencias pesadas: {', '.join(loaded)}")
+        if status != 'OK':
+            failures.append(module)
+
+    if failures:
+        print(f"\nFuera de presupuesto: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
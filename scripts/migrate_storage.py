@@ -0,0 +1,50 @@
+"""
+Migración - Copia el historial CSV a otro backend de almacenamiento
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/migrate_storage.py --backend sqlite --target ratings.db
+    PYTHONPATH=src python scripts/migrate_storage.py --backend parquet --target ratings_parquet
+    PYTHONPATH=src python scripts/migrate_storage.py --backend long --target ratings_long.csv \
+        --zero-as-null
+    PYTHONPATH=src python scripts/migrate_storage.py --backend long --target ratings_long.csv \
+        --export-wide ratings_wide.csv
+"""
+import argparse
+import logging
+import time
+
+from long_format import write_wide_csv
+from storage import STORAGE_BACKENDS, create_store, migrate_csv
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migra ratings_data.csv a otro backend")
+    parser.add_argument("--csv", default="ratings_data.csv", help="CSV de origen")
+    parser.add_argument("--backend", required=True,
+                        choices=[b for b in STORAGE_BACKENDS if b != 'csv'])
+    parser.add_argument("--target", required=True, help="Archivo o directorio destino")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    parser.add_argument("--zero-as-null", action="store_true",
+                        help="(long) Guardar los 0.0 del CSV como lecturas faltantes")
+    parser.add_argument("--export-wide", metavar="CSV",
+                        help="En vez de migrar, exporta el backend destino a un CSV ancho")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    options = {'zero_as_null': True} if args.zero_as_null and args.backend == 'long' else {}
+    store = create_store(args.backend, args.target, **options)
+
+    if args.export_wide:
+        wide = store.read()
+        write_wide_csv(wide, args.export_wide)
+        print(f"✓ {len(wide):,} filas exportadas a {args.export_wide} "
+              f"en {time.perf_counter() - start:.1f}s")
+        raise SystemExit(0)
+
+    rows = migrate_csv(args.csv, store, chunksize=args.chunksize)
+
+    print("=" * 60)
+    print(f"✓ {rows:,} filas migradas a {args.backend} ({args.target}) "
+          f"en {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
@@ -0,0 +1,33 @@
+"""
+Reconstruye los agregados (ratings_rollups.db) desde el historial completo
+
+Necesario una vez al activar los agregados sobre un historial existente, o
+tras una carga masiva.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python scripts/rebuild_rollups.py --backend csv --path ratings_data.csv
+"""
+import argparse
+import logging
+import time
+
+from rollups import RollupStore
+from storage import STORAGE_BACKENDS, create_store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruye los agregados del dashboard")
+    parser.add_argument("--backend", default="csv", choices=list(STORAGE_BACKENDS))
+    parser.add_argument("--path", default="ratings_data.csv", help="Historial de origen")
+    parser.add_argument("--rollups", default="ratings_rollups.db", help="Archivo de agregados")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = create_store(args.backend, args.path).read()
+    RollupStore(args.rollups).rebuild(df)
+
+    print("=" * 60)
+    print(f"✓ Agregados reconstruidos desde {len(df):,} filas "
+          f"en {time.perf_counter() - start:.1f}s")
+    print("=" * 60)
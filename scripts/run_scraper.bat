@@ -14,5 +14,5 @@ cd /d "%~dp0\.."
 call venv\Scripts\activate
 
 echo Ejecutando con intervalo de 1 minuto (testing)...
-echo Para produccion (30 min), edita src\orchestrator.py linea 71
-python src\orchestrator.py
+echo Para produccion (30 min), edita el bloque __main__ de src\orchestrator.py
+python src\orchestrator.py --dashboard
@@ -0,0 +1,222 @@
+"""
+Servidor stub - Imita las páginas de rating de Zapping para pruebas offline
+
+Sirve /public/rating/<slug> con un HTML que contiene #channel_rating, de modo
+que los backends HTTP y Playwright se pueden probar y medir sin red. La
+latencia y las tasas de error son configurables para simular carga real.
+
+Uso:
+    python scripts/stub_zapping_server.py --port 8765 --latency 0.2 --failure-rate 0.05
+    PYTHONPATH=src python -c "from orchestrator import Orchestrator; \\
+        Orchestrator(base_url='http://127.0.0.1:8765/public/rating').run_single_scrape()"
+"""
+import argparse
+import hashlib
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+RATING_PATH = "/public/rating/"
+STATIC_PATH = "/static/"
+
+# Recursos pesados que la página real también carga (imágenes, fuentes, CSS)
+STATIC_ASSETS = {
+    'app.css': ('text/css', b'/* stub */' + b' ' * 40000),
+    'logo.png': ('image/png', b'\x89PNG' + b'\x00' * 120000),
+    'font.woff2': ('font/woff2', b'wOF2' + b'\x00' * 60000),
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+  <title>Rating {slug}</title>
+  <link rel="stylesheet" href="/static/app.css">
+  <link rel="preload" as="font" href="/static/font.woff2" crossorigin>
+</head>
+<body>
+  <img src="/static/logo.png" alt="logo">
+  <div class="rating-card">
+    <span class="label">Rating</span>
+    <div id="channel_rating">{rating}</div>
+  </div>
+</body>
+</html>
+"""
+
+
+class StubRatingHandler(BaseHTTPRequestHandler):
+    """Responde las páginas de rating con valores sintéticos"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path.startswith(STATIC_PATH):
+            asset = STATIC_ASSETS.get(self.path[len(STATIC_PATH):])
+            if asset is None:
+                self._send(404, "not found")
+            else:
+                self._send_bytes(200, asset[1], asset[0])
+            return
+        if not self.path.startswith(RATING_PATH):
+            self._send(404, "not found")
+            return
+        slug = self.path[len(RATING_PATH):].strip('/')
+        outcome = self.server.next_outcome(slug)
+        if outcome == 'error':
+            self._send(503, "service unavailable")
+            return
+        rating = '' if outcome == 'missing' else self.server.rating_for(slug)
+        page = PAGE_TEMPLATE.format(slug=slug, rating=rating)
+        if not self.server.etag:
+            self._send(200, page)
+            return
+        etag = '"' + hashlib.md5(page.encode('utf-8')).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self._send(200, page, {'ETag': etag})
+
+    def _send(self, status: int, body: str, headers: Optional[Dict[str, str]] = None):
+        self._send_bytes(status, body.encode('utf-8'), 'text/html; charset=utf-8', headers)
+
+    def _send_bytes(self, status: int, payload: bytes, content_type: str,
+                    headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente abandonó el request (timeout o request duplicado que perdió)
+            pass
+
+    def log_message(self, format, *args):
+        # Silenciar el log por request
+        pass
+
+
+class StubRatingServer(ThreadingHTTPServer):
+    """Servidor HTTP con ratings fijos o aleatorios por slug"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], ratings: Optional[Dict[str, float]] = None,
+                 latency: float = 0.0, latency_jitter: float = 0.0,
+                 failure_rate: float = 0.0, missing_rate: float = 0.0, seed: Optional[int] = None,
+                 etag: bool = False, tail_rate: float = 0.0, tail_latency: float = 0.0,
+                 slow_slugs: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            address: (host, puerto)
+            ratings: Ratings fijos por slug (el resto es aleatorio)
+            latency: Demora base de cada página de rating (segundos)
+            latency_jitter: Demora adicional aleatoria uniforme [0, jitter)
+            failure_rate: Fracción de requests que responden 503
+            missing_rate: Fracción de páginas sin el rating renderizado
+            seed: Semilla para que las fallas y demoras sean reproducibles
+            etag: Si True, envía ETag y responde 304 a If-None-Match sin cambios
+            tail_rate: Fracción de requests que tardan tail_latency segundos extra
+                (cola de latencia, para probar requests duplicados)
+            tail_latency: Demora extra de los requests lentos (segundos)
+            slow_slugs: Demora extra fija por slug (ej: {'tvno': 60} simula una
+                página colgada)
+        """
+        super().__init__(address, StubRatingHandler)
+        self.ratings = ratings or {}
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.failure_rate = failure_rate
+        self.missing_rate = missing_rate
+        self.etag = etag
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.slow_slugs = slow_slugs or {}
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+    def next_outcome(self, slug: str = '') -> str:
+        """Aplica la latencia configurada y decide si el request falla ('ok', 'error', 'missing')"""
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            if self.tail_rate and self._random.random() < self.tail_rate:
+                delay += self.tail_latency
+            roll = self._random.random()
+        delay += self.slow_slugs.get(slug, 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        if roll < self.failure_rate:
+            return 'error'
+        if roll < self.failure_rate + self.missing_rate:
+            return 'missing'
+        return 'ok'
+
+    def rating_for(self, slug: str) -> float:
+        """Rating fijo si fue configurado, o uno aleatorio"""
+        if slug in self.ratings:
+            return self.ratings[slug]
+        return round(random.uniform(0, 40), 1)
+
+    @property
+    def base_url(self) -> str:
+        """URL base para pasar a RatingScraper(base_url=...)"""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}{RATING_PATH.rstrip('/')}"
+
+
+def start_stub_server(port: int = 0, **kwargs) -> StubRatingServer:
+    """
+    Inicia el servidor stub en un thread de fondo
+
+    Args:
+        port: Puerto (0 = uno libre)
+        **kwargs: Argumentos para StubRatingServer
+
+    Returns:
+        Servidor iniciado; llamar a shutdown() para detenerlo
+    """
+    server = StubRatingServer(('127.0.0.1', port), **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de ratings de Zapping")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Demora base por página (s)")
+    parser.add_argument("--latency-jitter", type=float, default=0.0,
+                        help="Demora aleatoria adicional (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Fracción de respuestas 503")
+    parser.add_argument("--missing-rate", type=float, default=0.0,
+                        help="Fracción de páginas sin rating")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--etag", action="store_true",
+                        help="Responder 304 a requests condicionales")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="Fracción de requests lentos")
+    parser.add_argument("--tail-latency", type=float, default=0.0,
+                        help="Demora extra de los requests lentos (s)")
+    parser.add_argument("--slow", action="append", default=[], metavar="SLUG=S",
+                        help="Demora extra fija de un slug (se puede repetir)")
+    args = parser.parse_args()
+
+    slow_slugs = {slug: float(seconds)
+                  for slug, _, seconds in (v.partition('=') for v in args.slow)}
+    server = StubRatingServer(('127.0.0.1', args.port), latency=args.latency,
+                              latency_jitter=args.latency_jitter, failure_rate=args.failure_rate,
+                              missing_rate=args.missing_rate, seed=args.seed, etag=args.etag,
+                              tail_rate=args.tail_rate, tail_latency=args.tail_latency,
+                              slow_slugs=slow_slugs)
+    print(f"Sirviendo ratings en {server.base_url}/<slug>")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
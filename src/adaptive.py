@@ -0,0 +1,137 @@
+"""
+AdaptivePoller - Intervalo de consulta propio por canal según cuánto cambia su rating
+"""
+from dataclasses import dataclass
+from typing import Dict, Optional
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ChannelPollState:
+    """Estado de consulta de un canal"""
+    name: str
+    slug: str
+    interval: float
+    next_due: float
+    last_value: Optional[float] = None
+    unchanged_streak: int = 0
+
+
+class AdaptivePoller:
+    """
+    Decide qué canales consultar en cada momento
+
+    Cuando el rating de un canal cambia entre dos lecturas su intervalo se
+    acorta (hasta min_interval); si se mantiene igual se alarga (hasta
+    max_interval). Un token bucket limita las consultas totales por minuto.
+    """
+
+    def __init__(self, channels: Dict[str, str], min_interval: float = 60.0,
+                 max_interval: float = 1800.0, tighten_factor: float = 0.5,
+                 relax_factor: float = 1.5, max_fetches_per_minute: float = 30.0,
+                 change_threshold: float = 0.0, clock=time.time):
+        """
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+            min_interval: Intervalo mínimo por canal en segundos
+            max_interval: Intervalo máximo por canal en segundos
+            tighten_factor: Multiplicador del intervalo cuando el valor cambia
+            relax_factor: Multiplicador del intervalo cuando el valor no cambia
+            max_fetches_per_minute: Tope global de consultas por minuto
+            change_threshold: Diferencia mínima para considerar que el valor cambió
+            clock: Reloj (inyectable para pruebas)
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("Se requiere 0 < min_interval <= max_interval")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tighten_factor = tighten_factor
+        self.relax_factor = relax_factor
+        self.change_threshold = change_threshold
+        self.clock = clock
+
+        now = clock()
+        self.states: Dict[str, ChannelPollState] = {
+            name: ChannelPollState(name=name, slug=slug, interval=min_interval, next_due=now)
+            for name, slug in channels.items()
+        }
+
+        # Token bucket para el tope global
+        self.rate_per_second = max_fetches_per_minute / 60.0
+        self.capacity = max(1.0, max_fetches_per_minute)
+        self._tokens = self.capacity
+        self._last_refill = now
+
+    def _refill(self, now: float):
+        """Repone tokens según el tiempo transcurrido"""
+        elapsed = max(0.0, now - self._last_refill)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._last_refill = now
+
+    def due_channels(self, now: Optional[float] = None) -> Dict[str, str]:
+        """
+        Canales que toca consultar ahora, respetando el tope global
+
+        Los más atrasados van primero; los que no alcanzan token esperan.
+
+        Args:
+            now: Instante actual (por defecto el reloj)
+
+        Returns:
+            Diccionario nombre -> slug a consultar
+        """
+        now = self.clock() if now is None else now
+        self._refill(now)
+        overdue = sorted((s for s in self.states.values() if s.next_due <= now),
+                         key=lambda s: s.next_due)
+        allowed = int(self._tokens)
+        selected = overdue[:allowed]
+        self._tokens -= len(selected)
+        if len(overdue) > len(selected):
+            logger.info(f"Tope de consultas alcanzado: {len(overdue) - len(selected)} "
+                        f"canales esperan")
+        return {s.name: s.slug for s in selected}
+
+    def record(self, name: str, value: Optional[float], now: Optional[float] = None) -> bool:
+        """
+        Registra una lectura y ajusta el intervalo del canal
+
+        Args:
+            name: Nombre del canal
+            value: Rating leído (None si la lectura falló)
+            now: Instante de la lectura
+
+        Returns:
+            True si el valor cambió respecto de la lectura anterior
+        """
+        now = self.clock() if now is None else now
+        state = self.states[name]
+
+        if value is None:
+            # Una lectura fallida no dice nada del canal: reintentar pronto
+            state.next_due = now + self.min_interval
+            return False
+
+        changed = (state.last_value is None
+                   or abs(value - state.last_value) > self.change_threshold)
+        if changed:
+            state.interval = max(self.min_interval, state.interval * self.tighten_factor)
+            state.unchanged_streak = 0
+        else:
+            state.interval = min(self.max_interval, state.interval * self.relax_factor)
+            state.unchanged_streak += 1
+
+        state.last_value = value
+        state.next_due = now + state.interval
+        return changed
+
+    def next_wakeup(self) -> float:
+        """Instante en que vence el próximo canal"""
+        return min(s.next_due for s in self.states.values())
+
+    def intervals(self) -> Dict[str, float]:
+        """Intervalo actual de cada canal en segundos"""
+        return {name: state.interval for name, state in self.states.items()}
@@ -0,0 +1,374 @@
+"""
+Analytics - Cubo canal × día × franja horaria con consultas vectorizadas sobre el historial
+"""
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from storage import RatingStore
+
+logger = logging.getLogger(__name__)
+
+DAY_MS = 86_400_000
+WEEKDAY_NAMES = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+DateBound = Optional[Union[str, date, datetime, pd.Timestamp]]
+
+
+class SlotCube:
+    """
+    Suma y cantidad de lecturas por canal, día y franja horaria
+
+    Dos arreglos densos (C canales × D días × S franjas): sums en float64 y
+    counts en uint32, 12 bytes por celda. Tres años de 6 canales en franjas
+    de 30 minutos ocupan ~4 MB, y cualquier consulta (promedio por día de
+    semana × franja, ranking de una franja, share semanal) es una reducción
+    de NumPy sobre esos arreglos, sin volver a leer el historial.
+
+    Los días son días calendario en la hora local de los TIMESTAMP (sin
+    zona horaria), contados desde 1970-01-01. Los NaN no suman lecturas.
+    """
+
+    def __init__(self, channels: Optional[List[str]] = None, slot_minutes: int = 30):
+        """
+        Args:
+            channels: Orden inicial de canales (los nuevos se agregan al final)
+            slot_minutes: Ancho de cada franja; debe dividir las 24 horas
+        """
+        if slot_minutes <= 0 or 1440 % slot_minutes:
+            raise ValueError("slot_minutes debe dividir 1440 (minutos de un día)")
+        self.slot_minutes = slot_minutes
+        self.slots = 1440 // slot_minutes
+        self.channels: List[str] = list(channels or [])
+        # Día (desde 1970-01-01) de la primera columna y días en uso
+        self.day0: Optional[int] = None
+        self.days = 0
+        self.rows = 0
+        # Último TIMESTAMP incorporado, en ms
+        self.last_ts: Optional[int] = None
+        self._sums = np.zeros((len(self.channels), 0, self.slots), dtype=np.float64)
+        self._counts = np.zeros((len(self.channels), 0, self.slots), dtype=np.uint32)
+        self._cursor: Any = None
+        self._lock = threading.RLock()
+
+    # --- estructura --------------------------------------------------------
+
+    @property
+    def sums(self) -> np.ndarray:
+        """Sumas de ratings (canal × día × franja) de los días en uso"""
+        return self._sums[:, :self.days]
+
+    @property
+    def counts(self) -> np.ndarray:
+        """Lecturas (canal × día × franja) de los días en uso"""
+        return self._counts[:, :self.days]
+
+    @property
+    def slot_labels(self) -> List[str]:
+        """Hora de inicio de cada franja ('HH:MM')"""
+        return [f"{m // 60:02d}:{m % 60:02d}" for m in range(0, 1440, self.slot_minutes)]
+
+    def _grow(self, channels: List[str], first_day: int, last_day: int):
+        """Agrega canales y días faltantes (capacidad duplicada hacia adelante)"""
+        new_channels = [ch for ch in channels if ch not in self.channels]
+        if new_channels:
+            self.channels.extend(new_channels)
+            extra = ((0, len(new_channels)), (0, 0), (0, 0))
+            self._sums = np.pad(self._sums, extra)
+            self._counts = np.pad(self._counts, extra)
+
+        if self.day0 is None:
+            self.day0 = first_day
+        if first_day < self.day0:
+            # Historia anterior a la ya cargada (poco común): desplazar
+            before = ((0, 0), (self.day0 - first_day, 0), (0, 0))
+            self._sums = np.pad(self._sums, before)
+            self._counts = np.pad(self._counts, before)
+            self.days += self.day0 - first_day
+            self.day0 = first_day
+
+        needed = last_day - self.day0 + 1
+        if needed > self._sums.shape[1]:
+            capacity = max(needed, 2 * self._sums.shape[1], 32)
+            after = ((0, 0), (0, capacity - self._sums.shape[1]), (0, 0))
+            self._sums = np.pad(self._sums, after)
+            self._counts = np.pad(self._counts, after)
+        self.days = max(self.days, needed)
+
+    def add_frame(self, df: pd.DataFrame) -> int:
+        """
+        Incorpora filas del historial ancho
+
+        Args:
+            df: DataFrame con TIMESTAMP (datetime64) y una columna por canal
+
+        Returns:
+            Filas incorporadas
+        """
+        if df.empty:
+            return 0
+        channels = [col for col in df.columns if col != 'TIMESTAMP']
+        ts = df['TIMESTAMP'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+        day = ts // DAY_MS
+        slot = (ts % DAY_MS) // (self.slot_minutes * 60_000)
+        values = df[channels].to_numpy(dtype=np.float64)
+
+        with self._lock:
+            self._grow(channels, int(day.min()), int(day.max()))
+            channel_idx = np.array([self.channels.index(ch) for ch in channels])
+            capacity = self._sums.shape[1]
+
+            # Índice plano (canal, día, franja) de cada lectura válida
+            valid = ~np.isnan(values)
+            rows, cols = np.nonzero(valid)
+            flat = ((channel_idx[cols] * capacity + (day[rows] - self.day0)) * self.slots
+                    + slot[rows])
+            size = self._sums.size
+            sums = np.bincount(flat, weights=values[rows, cols], minlength=size)
+            self._sums += sums.reshape(self._sums.shape)
+            counts = np.bincount(flat, minlength=size).astype(np.uint32)
+            self._counts += counts.reshape(self._counts.shape)
+
+            self.rows += len(df)
+            newest = int(ts.max())
+            self.last_ts = newest if self.last_ts is None else max(self.last_ts, newest)
+        return len(df)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, slot_minutes: int = 30) -> 'SlotCube':
+        """
+        Construye el cubo desde un historial completo
+
+        Args:
+            df: DataFrame con TIMESTAMP (datetime64) y una columna por canal
+            slot_minutes: Ancho de cada franja
+
+        Returns:
+            Cubo con todas las filas
+        """
+        cube = cls([col for col in df.columns if col != 'TIMESTAMP'], slot_minutes)
+        cube.add_frame(df)
+        return cube
+
+    def sync(self, store: RatingStore) -> int:
+        """
+        Incorpora lo que llegó al almacenamiento desde la última sincronización
+
+        Usa read_incremental del store, así que en cada llamada solo se
+        parsean las filas nuevas. Tras cargar un cubo guardado, la primera
+        llamada lee el historial pero incorpora solo lo posterior a last_ts.
+
+        Args:
+            store: Backend con el historial
+
+        Returns:
+            Filas incorporadas
+        """
+        if not store.exists():
+            return 0
+        with self._lock:
+            archive = getattr(store, 'archive', None)
+            if self.last_ts is None and archive is not None:
+                # Cubo nuevo sobre un TieredStore: read_incremental solo ve la
+                # ventana caliente, la historia anterior está en los segmentos
+                self.add_frame(archive.read())
+            df, self._cursor, _ = store.read_incremental(self._cursor)
+            if self.last_ts is not None and not df.empty:
+                # Comparar en ms, la misma precisión con la que se guarda last_ts
+                ts = df['TIMESTAMP'].to_numpy(dtype='datetime64[ms]').astype(np.int64)
+                df = df[ts > self.last_ts]
+            added = self.add_frame(df)
+        if added:
+            logger.info(f"Cubo de franjas: {added} filas nuevas ({self.rows} en total)")
+        return added
+
+    # --- persistencia ------------------------------------------------------
+
+    def save(self, filepath: str):
+        """
+        Guarda el cubo en un .npz de forma atómica
+
+        Args:
+            filepath: Archivo destino
+        """
+        with self._lock:
+            tmp_path = f"{filepath}.tmp.npz"
+            np.savez(
+                tmp_path, sums=self.sums, counts=self.counts,
+                channels=np.array(self.channels, dtype=str),
+                meta=np.array([self.slot_minutes, -1 if self.day0 is None else self.day0,
+                               self.rows, -1 if self.last_ts is None else self.last_ts],
+                              dtype=np.int64),
+            )
+            os.replace(tmp_path, filepath)
+
+    @classmethod
+    def load(cls, filepath: str) -> 'SlotCube':
+        """
+        Carga un cubo guardado con save()
+
+        Args:
+            filepath: Archivo .npz
+
+        Returns:
+            Cubo listo para seguir sincronizándose
+        """
+        with np.load(filepath) as data:
+            slot_minutes, day0, rows, last_ts = (int(v) for v in data['meta'])
+            cube = cls([str(ch) for ch in data['channels']], slot_minutes)
+            cube._sums = data['sums'].copy()
+            cube._counts = data['counts'].copy()
+        cube.days = cube._sums.shape[1]
+        cube.day0 = None if day0 < 0 else day0
+        cube.rows = rows
+        cube.last_ts = None if last_ts < 0 else last_ts
+        return cube
+
+    # --- consultas ---------------------------------------------------------
+
+    def _day_slice(self, start: DateBound, end: DateBound) -> slice:
+        """Columnas de los días en [start, end) (None = sin límite)"""
+        def column(bound):
+            day = pd.Timestamp(bound).value // 10**6 // DAY_MS
+            return int(np.clip(day - self.day0, 0, self.days))
+        if self.day0 is None:
+            return slice(0, 0)
+        return slice(column(start) if start is not None else 0,
+                     column(end) if end is not None else self.days)
+
+    def _weekdays(self, days: slice) -> np.ndarray:
+        """Día de la semana (lunes = 0) de cada columna del rango"""
+        # 1970-01-01 fue jueves
+        return (np.arange(days.start, days.stop) + self.day0 + 3) % 7
+
+    @staticmethod
+    def _mean(sums: np.ndarray, counts: np.ndarray) -> np.ndarray:
+        """sums / counts con NaN donde no hay lecturas"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    def slot_index(self, label: str) -> int:
+        """
+        Franja que contiene una hora del día
+
+        Args:
+            label: Hora 'HH:MM'
+
+        Returns:
+            Índice de la franja
+        """
+        hours, minutes = (int(part) for part in label.split(':'))
+        return (hours * 60 + minutes) // self.slot_minutes
+
+    def weekday_slot_means(self, channel: str, start: DateBound = None,
+                           end: DateBound = None) -> pd.DataFrame:
+        """
+        Rating promedio de un canal por día de la semana × franja
+
+        Args:
+            channel: Canal
+            start: Primer día (inclusive)
+            end: Último día (exclusivo)
+
+        Returns:
+            DataFrame 7 × S (filas: días de la semana, columnas: franjas)
+        """
+        with self._lock:
+            days = self._day_slice(start, end)
+            c = self.channels.index(channel)
+            sums = np.zeros((7, self.slots))
+            counts = np.zeros((7, self.slots))
+            weekdays = self._weekdays(days)
+            np.add.at(sums, weekdays, self._sums[c, days])
+            np.add.at(counts, weekdays, self._counts[c, days])
+        return pd.DataFrame(self._mean(sums, counts), index=WEEKDAY_NAMES, columns=self.slot_labels)
+
+    def slot_ranking(self, slot_start: int = 0, slot_end: Optional[int] = None,
+                     weekdays: Optional[List[int]] = None, start: DateBound = None,
+                     end: DateBound = None) -> pd.DataFrame:
+        """
+        Ranking de canales por rating promedio en una franja
+
+        Args:
+            slot_start: Primera franja (inclusive)
+            slot_end: Última franja (exclusiva); None = hasta el final del día
+            weekdays: Días de la semana a considerar (lunes = 0); None = todos
+            start: Primer día (inclusive)
+            end: Último día (exclusivo)
+
+        Returns:
+            DataFrame con channel, rating, samples y rank, ordenado por rank
+        """
+        with self._lock:
+            days = self._day_slice(start, end)
+            slots = slice(slot_start, slot_end if slot_end is not None else self.slots)
+            day_mask = np.ones(days.stop - days.start, dtype=bool) if weekdays is None \
+                else np.isin(self._weekdays(days), weekdays)
+            sums = self._sums[:, days, slots][:, day_mask].sum(axis=(1, 2))
+            counts = self._counts[:, days, slots][:, day_mask].sum(axis=(1, 2))
+            channels = list(self.channels)
+        ranking = pd.DataFrame({
+            'channel': channels,
+            'rating': self._mean(sums, counts),
+            'samples': counts.astype(np.int64),
+        })
+        ranking = ranking[ranking['samples'] > 0].sort_values('rating', ascending=False)
+        ranking['rank'] = np.arange(1, len(ranking) + 1)
+        return ranking.reset_index(drop=True)
+
+    def weekly_share(self, start: DateBound = None, end: DateBound = None) -> pd.DataFrame:
+        """
+        Share semanal de cada canal (% de la suma de ratings promedio)
+
+        Args:
+            start: Primer día (inclusive)
+            end: Último día (exclusivo)
+
+        Returns:
+            DataFrame con TIMESTAMP (lunes de cada semana) y una columna por canal
+        """
+        with self._lock:
+            days = self._day_slice(start, end)
+            if days.stop <= days.start:
+                return pd.DataFrame(columns=['TIMESTAMP'] + self.channels)
+            absolute = np.arange(days.start, days.stop) + self.day0
+            # Semana de cada día, contada desde el lunes 1969-12-29
+            week = (absolute + 3) // 7
+            week_idx = week - week[0]
+            n_weeks = int(week_idx[-1]) + 1
+            sums = np.zeros((len(self.channels), n_weeks))
+            counts = np.zeros((len(self.channels), n_weeks))
+            np.add.at(sums.T, week_idx, self._sums[:, days].sum(axis=2).T)
+            np.add.at(counts.T, week_idx, self._counts[:, days].sum(axis=2).T)
+            channels = list(self.channels)
+
+        means = self._mean(sums, counts)
+        totals = np.nansum(means, axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = np.where(totals > 0, means / totals * 100, np.nan)
+        mondays = (np.arange(n_weeks) + week[0]) * 7 - 3
+        df = pd.DataFrame(share.T, columns=channels)
+        df.insert(0, 'TIMESTAMP', pd.to_datetime(mondays * DAY_MS, unit='ms'))
+        return df
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Tamaño y rango del cubo
+
+        Returns:
+            Diccionario con channels, days, slots, rows, bytes, first_day y last_day
+        """
+        first = last = None
+        if self.day0 is not None:
+            first = pd.Timestamp(self.day0 * DAY_MS, unit='ms')
+            last = pd.Timestamp((self.day0 + self.days - 1) * DAY_MS, unit='ms')
+        return {
+            'channels': len(self.channels), 'days': self.days, 'slots': self.slots,
+            'rows': self.rows, 'bytes': self.sums.nbytes + self.counts.nbytes,
+            'first_day': first, 'last_day': last,
+        }
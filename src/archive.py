@@ -0,0 +1,469 @@
+"""
+Archive - Retención por niveles: historial caliente y segmentos comprimidos inmutables
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+
+from lazy_imports import lazy_import
+from storage import DropCallback, RatingStore, TimeBound, merge_readings
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Granularidad de los segmentos: formato de la clave y cómo avanzar al siguiente
+GRANULARITIES = ('day', 'month')
+
+# Formatos de segmento: extensión del archivo
+SEGMENT_FORMATS = {
+    'csv.gz': '.csv.gz',
+    'parquet': '.parquet',
+}
+
+INDEX_FILE = "index.json"
+
+
+def segment_bounds(ts: datetime, granularity: str) -> Tuple[datetime, datetime]:
+    """
+    Rango [inicio, fin) del segmento que contiene un instante
+
+    Args:
+        ts: Instante (hora local, sin zona)
+        granularity: 'day' o 'month'
+
+    Returns:
+        Tupla (inicio, fin exclusivo)
+    """
+    if granularity == 'day':
+        start = datetime(ts.year, ts.month, ts.day)
+        return start, start + timedelta(days=1)
+    if granularity == 'month':
+        start = datetime(ts.year, ts.month, 1)
+        end = datetime(ts.year + 1, 1, 1) if ts.month == 12 else datetime(ts.year, ts.month + 1, 1)
+        return start, end
+    raise ValueError(f"Granularidad desconocida: {granularity}. Opciones: {GRANULARITIES}")
+
+
+def segment_key(start: datetime, granularity: str) -> str:
+    """Clave legible de un segmento (2026-01-21 o 2026-01)"""
+    return start.strftime('%Y-%m-%d' if granularity == 'day' else '%Y-%m')
+
+
+@dataclass
+class Segment:
+    """Entrada del índice: un archivo inmutable con las filas de [start, end)"""
+    key: str
+    file: str
+    start: str
+    end: str
+    rows: int
+    bytes: int
+    # 'raw' (muestras originales) o la regla de resample con la que se redujo ('h', 'D')
+    resolution: str = 'raw'
+
+    def overlaps(self, start: TimeBound, end: TimeBound) -> bool:
+        """True si el segmento se solapa con [start, end)"""
+        if start is not None and self.end <= pd.Timestamp(start).isoformat():
+            return False
+        if end is not None and self.start >= pd.Timestamp(end).isoformat():
+            return False
+        return True
+
+
+class SegmentArchive:
+    """
+    Directorio de segmentos comprimidos con un índice JSON de rangos
+
+    Cada segmento cubre un día o un mes completo y nunca se modifica: si
+    llegan filas tardías para un rango ya archivado se escribe una versión
+    nueva del segmento y se reemplaza en el índice. El índice (index.json)
+    se reemplaza de forma atómica, así que un lector ve siempre un conjunto
+    consistente. Una lectura por rango solo abre los segmentos que se
+    solapan con el rango.
+    """
+
+    def __init__(self, directory: str, granularity: str = 'day', fmt: str = 'csv.gz'):
+        """
+        Args:
+            directory: Directorio del archivo histórico
+            granularity: 'day' o 'month' (cobertura de cada segmento)
+            fmt: 'csv.gz' o 'parquet' (requiere pyarrow)
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Granularidad desconocida: {granularity}. Opciones: {GRANULARITIES}")
+        if fmt not in SEGMENT_FORMATS:
+            raise ValueError(f"Formato desconocido: {fmt}. Opciones: {list(SEGMENT_FORMATS)}")
+        if fmt == 'parquet':
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError as e:
+                raise ImportError("Los segmentos Parquet requieren pyarrow: "
+                                  "pip install pyarrow") from e
+        self.directory = Path(directory)
+        self.location = str(directory)
+        self.granularity = granularity
+        self.fmt = fmt
+
+    # --- índice -------------------------------------------------------------
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / INDEX_FILE
+
+    def segments(self) -> List[Segment]:
+        """Segmentos del índice ordenados por inicio"""
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                entries = json.load(f)['segments']
+        except FileNotFoundError:
+            return []
+        return sorted((Segment(**entry) for entry in entries), key=lambda s: s.start)
+
+    def _write_index(self, segments: List[Segment]):
+        """Reemplaza el índice de forma atómica"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.directory / f".{INDEX_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            ordered = sorted(segments, key=lambda s: s.start)
+            json.dump({'segments': [vars(s) for s in ordered]}, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.index_path)
+
+    def exists(self) -> bool:
+        """True si hay al menos un segmento"""
+        return bool(self.segments())
+
+    def size_bytes(self) -> int:
+        """Tamaño de los segmentos en disco"""
+        return sum(s.bytes for s in self.segments())
+
+    # --- escritura ----------------------------------------------------------
+
+    def _segment_path(self, key: str, version: int) -> Path:
+        return self.directory / f"{key}.v{version}{SEGMENT_FORMATS[self.fmt]}"
+
+    def _write_file(self, df: pd.DataFrame, path: Path):
+        """Escribe un segmento en un temporal y lo publica con rename"""
+        tmp_path = path.with_name(f".{path.name}.tmp")
+        out = df.copy()
+        if self.fmt == 'parquet':
+            out.to_parquet(tmp_path, index=False)
+        else:
+            # Mismo formato de texto que el CSV caliente (TIMESTAMP ISO 8601)
+            out['TIMESTAMP'] = out['TIMESTAMP'].map(lambda ts: ts.isoformat())
+            out.to_csv(tmp_path, index=False, compression='gzip')
+        os.replace(tmp_path, path)
+
+    def _read_file(self, path: Path) -> pd.DataFrame:
+        """Lee un segmento con TIMESTAMP como datetime64"""
+        if self.fmt == 'parquet' or path.suffix == '.parquet':
+            df = pd.read_parquet(path)
+        else:
+            df = pd.read_csv(path)
+        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        return df
+
+    def write(self, df: pd.DataFrame, resolution: str = 'raw',
+              replace: bool = False) -> List[Segment]:
+        """
+        Archiva filas, agrupadas en segmentos según su TIMESTAMP
+
+        Si un segmento ya existe, sus filas se combinan con las nuevas (sin
+        duplicar TIMESTAMP) en una versión nueva del archivo; filas crudas
+        que caen en un segmento ya reducido se reducen con la misma regla.
+
+        Args:
+            df: Filas con TIMESTAMP (datetime64) y una columna por canal
+            resolution: 'raw' o la regla con la que se redujeron las filas
+            replace: Si True, las filas reemplazan al segmento existente en vez
+                de combinarse con él
+
+        Returns:
+            Segmentos escritos
+        """
+        if df.empty:
+            return []
+        from downsampling import rollup
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        current = {s.key: s for s in self.segments()}
+        written, replaced = [], []
+        keys = df['TIMESTAMP'].map(lambda ts: segment_key(segment_bounds(ts, self.granularity)[0],
+                                                          self.granularity))
+        for key, group in df.groupby(keys, sort=True):
+            previous = current.get(key)
+            segment_resolution = resolution
+            version = 1
+            if previous is not None:
+                version = int(previous.file.split('.v')[1].split('.')[0]) + 1
+                replaced.append(previous)
+                if not replace:
+                    if previous.resolution != 'raw' and resolution == 'raw':
+                        # Un segmento reducido no vuelve a tener datos crudos
+                        group = rollup(group, previous.resolution)
+                        segment_resolution = previous.resolution
+                    existing = self._read_file(self.directory / previous.file)
+                    group = pd.concat([existing, group], ignore_index=True)
+            group = (group.drop_duplicates(subset='TIMESTAMP', keep='last')
+                          .sort_values('TIMESTAMP', kind='stable')
+                          .reset_index(drop=True))
+            start, end = segment_bounds(group['TIMESTAMP'].iloc[0].to_pydatetime(),
+                                        self.granularity)
+            path = self._segment_path(key, version)
+            self._write_file(group, path)
+            segment = Segment(key=key, file=path.name, start=start.isoformat(),
+                              end=end.isoformat(), rows=len(group), bytes=path.stat().st_size,
+                              resolution=segment_resolution)
+            current[key] = segment
+            written.append(segment)
+
+        self._write_index(list(current.values()))
+        # Los archivos reemplazados se borran recién con el índice nuevo publicado
+        for segment in replaced:
+            try:
+                (self.directory / segment.file).unlink()
+            except FileNotFoundError:
+                pass
+        return written
+
+    def merge(self, df: pd.DataFrame) -> int:
+        """
+        Integra un lote histórico en los segmentos (ver RatingStore.merge_frame)
+
+        Gana la lectura que ya estaba archivada; en un segmento reducido el
+        lote se reduce con la misma regla antes de cruzarlo.
+
+        Args:
+            df: Filas con TIMESTAMP (datetime64) único y ordenado
+
+        Returns:
+            Lecturas (TIMESTAMP + canal) nuevas
+        """
+        if df.empty:
+            return 0
+        from downsampling import rollup
+
+        current = {s.key: s for s in self.segments()}
+        keys = df['TIMESTAMP'].map(lambda ts: segment_key(segment_bounds(ts, self.granularity)[0],
+                                                          self.granularity))
+        batches: Dict[str, List[pd.DataFrame]] = {}
+        added = 0
+        for key, group in df.groupby(keys, sort=True):
+            previous = current.get(key)
+            resolution = previous.resolution if previous is not None else 'raw'
+            if resolution != 'raw':
+                group = rollup(group, resolution)
+            existing = (self._read_file(self.directory / previous.file) if previous is not None
+                        else pd.DataFrame(columns=['TIMESTAMP']))
+            merged, new = merge_readings(existing, group)
+            added += int(new.drop(columns='TIMESTAMP').count().sum())
+            if not merged.empty:
+                batches.setdefault(resolution, []).append(merged)
+        # Las filas combinadas reemplazan a las de su mismo TIMESTAMP en el segmento
+        for resolution, frames in batches.items():
+            self.write(pd.concat(frames, ignore_index=True), resolution=resolution)
+        logger.info(f"{added:,} lecturas nuevas archivadas en {self.location}")
+        return added
+
+    def downsample(self, before: datetime, rule: str = 'h') -> int:
+        """
+        Reemplaza los segmentos crudos que terminan antes de `before` por su promedio
+
+        Args:
+            before: Los segmentos que terminan antes de este instante se reducen
+            rule: Regla de resample de pandas ('h' = horario, 'D' = diario)
+
+        Returns:
+            Segmentos reducidos
+        """
+        from downsampling import rollup
+
+        reduced = 0
+        for segment in self.segments():
+            if segment.resolution != 'raw' or segment.end > before.isoformat():
+                continue
+            df = rollup(self._read_file(self.directory / segment.file), rule)
+            self.write(df, resolution=rule, replace=True)
+            reduced += 1
+        if reduced:
+            logger.info(f"{reduced} segmentos reducidos a resolución '{rule}' en {self.location}")
+        return reduced
+
+    # --- lectura ------------------------------------------------------------
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Lee las filas archivadas en [start, end) abriendo solo los segmentos necesarios
+
+        Args:
+            start: Inicio del rango (inclusive)
+            end: Fin del rango (exclusivo)
+
+        Returns:
+            DataFrame ordenado por TIMESTAMP
+        """
+        frames = []
+        for segment in self.segments():
+            if not segment.overlaps(start, end):
+                continue
+            try:
+                frames.append(self._read_file(self.directory / segment.file))
+            except FileNotFoundError:
+                # Reemplazado mientras se leía: se relee con el índice nuevo
+                return self.read(start, end)
+        if not frames:
+            return pd.DataFrame(columns=['TIMESTAMP'])
+        df = pd.concat(frames, ignore_index=True).sort_values('TIMESTAMP', kind='stable')
+        return RatingStore._filter_range(df, start, end)
+
+    def bounds(self) -> Tuple[Optional[str], Optional[str]]:
+        """Inicio del primer segmento y fin del último (ISO 8601), o (None, None)"""
+        segments = self.segments()
+        if not segments:
+            return None, None
+        return segments[0].start, segments[-1].end
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Cuánto tiempo vive cada nivel
+
+    - hot_days: días que quedan en el almacenamiento caliente (el que escribe
+      el scraper y lee el dashboard en memoria)
+    - raw_days: días desde hoy durante los que los segmentos guardan las
+      muestras originales; los más viejos se reducen a promedios `rule`
+      (None = no reducir nunca)
+    """
+    hot_days: float = 7
+    raw_days: Optional[float] = 90
+    rule: str = 'h'
+
+    def __post_init__(self):
+        if self.raw_days is not None and self.raw_days < self.hot_days:
+            raise ValueError("raw_days no puede ser menor que hot_days")
+
+
+def compact(store: RatingStore, archive: SegmentArchive, policy: RetentionPolicy,
+            now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    Mueve al archivo las filas más viejas que la ventana caliente
+
+    El corte cae en el borde de un segmento, así cada segmento se escribe
+    una vez. Los segmentos se escriben desde el on_drop de drop_before, antes
+    de que las filas salgan del almacenamiento caliente; si el proceso se
+    corta en medio, TieredStore deduplica las filas que quedan en ambos.
+
+    Args:
+        store: Almacenamiento caliente (debe implementar drop_before)
+        archive: Archivo de segmentos
+        policy: Política de retención
+        now: Instante de referencia (por defecto ahora)
+
+    Returns:
+        Resumen con cutoff, filas archivadas, segmentos escritos/reducidos y bytes
+    """
+    now = now or datetime.now()
+    cutoff, _ = segment_bounds(now - timedelta(days=policy.hot_days), archive.granularity)
+    summary = {'cutoff': cutoff.isoformat(), 'archived_rows': 0, 'segments': 0, 'downsampled': 0,
+               'hot_bytes_before': store.size_bytes() if store.exists() else 0}
+
+    raw_cutoff = None
+    if policy.raw_days is not None:
+        raw_cutoff, _ = segment_bounds(now - timedelta(days=policy.raw_days), archive.granularity)
+
+    def archive_rows(old: pd.DataFrame):
+        summary['archived_rows'] += len(old)
+        if raw_cutoff is not None:
+            # Lo que ya pasó la edad de los datos crudos se archiva directamente reducido
+            from downsampling import rollup
+            aged = old[old['TIMESTAMP'] < raw_cutoff]
+            if not aged.empty:
+                written = archive.write(rollup(aged, policy.rule), resolution=policy.rule)
+                summary['segments'] += len(written)
+            old = old[old['TIMESTAMP'] >= raw_cutoff]
+        summary['segments'] += len(archive.write(old))
+
+    if store.exists():
+        store.drop_before(cutoff, on_drop=archive_rows)
+
+    if raw_cutoff is not None:
+        summary['downsampled'] = archive.downsample(raw_cutoff, policy.rule)
+
+    summary['hot_bytes_after'] = store.size_bytes() if store.exists() else 0
+    summary['archive_bytes'] = archive.size_bytes()
+    logger.info(f"Compactación: {summary['archived_rows']:,} filas anteriores a "
+                f"{summary['cutoff']} archivadas en {summary['segments']} segmentos; caliente "
+                f"{summary['hot_bytes_before']:,} -> {summary['hot_bytes_after']:,} bytes")
+    return summary
+
+
+class TieredStore(RatingStore):
+    """
+    Almacenamiento caliente más archivo de segmentos, con la interfaz de RatingStore
+
+    - append / read_incremental: solo el almacenamiento caliente (el frame en
+      memoria del dashboard cubre la ventana caliente)
+    - read(start, end): segmentos que se solapan con el rango más las filas
+      calientes; un TIMESTAMP presente en ambos (compactación interrumpida)
+      se toma una sola vez
+    - merge_frame: cada fila del lote va al nivel que cubre su TIMESTAMP
+    """
+
+    def __init__(self, hot: RatingStore, archive: SegmentArchive):
+        """
+        Args:
+            hot: Almacenamiento donde escribe el scraper
+            archive: Segmentos con la historia anterior
+        """
+        self.hot = hot
+        self.archive = archive
+        self.location = hot.location
+
+    def append(self, rows: List[Dict[str, Any]]):
+        self.hot.append(rows)
+
+    def append_frame(self, df: pd.DataFrame):
+        self.hot.append_frame(df)
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        archived = self.archive.read(start, end)
+        hot = (self.hot.read(start, end) if self.hot.exists()
+               else pd.DataFrame(columns=['TIMESTAMP']))
+        if archived.empty:
+            return hot
+        if hot.empty:
+            return archived
+        df = pd.concat([archived, hot], ignore_index=True)
+        df = (df.drop_duplicates(subset='TIMESTAMP', keep='last')
+                .sort_values('TIMESTAMP', kind='stable'))
+        return df.reset_index(drop=True)
+
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """Lo anterior al fin del archivo va a los segmentos; el resto al almacenamiento caliente"""
+        _, archived_until = self.archive.bounds()
+        if archived_until is None:
+            return self.hot.merge_frame(df)
+        older = (df['TIMESTAMP'] < pd.Timestamp(archived_until)).to_numpy()
+        return (self.archive.merge(df[older].reset_index(drop=True))
+                + self.hot.merge_frame(df[~older].reset_index(drop=True)))
+
+    def read_incremental(self, cursor: Any = None) -> Tuple[pd.DataFrame, Any, bool]:
+        return self.hot.read_incremental(cursor)
+
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        return self.hot.drop_before(cutoff, on_drop=on_drop)
+
+    def exists(self) -> bool:
+        return self.hot.exists() or self.archive.exists()
+
+    def size_bytes(self) -> int:
+        return (self.hot.size_bytes() if self.hot.exists() else 0) + self.archive.size_bytes()
@@ -0,0 +1,305 @@
+"""
+Backfill - Carga masiva de historial archivado (páginas HTML guardadas y CSV de otros recolectores)
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import gzip
+import logging
+import multiprocessing
+import os
+import re
+
+from http_fetcher import extract_rating
+from lazy_imports import lazy_import
+from storage import RatingStore
+from transformer import Transformer
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+PAGE_SUFFIXES = ('.html', '.htm', '.html.gz', '.htm.gz')
+CSV_SUFFIXES = ('.csv', '.csv.gz')
+# Fecha y hora en el nombre de una página: 2024-05-01T21-30-00, 20240501_213000, 2024-05-01 21:30
+_STAMP_PATTERN = re.compile(
+    r'(\d{4})-?(\d{2})-?(\d{2})[T_ ]?(\d{2})[-:.]?(\d{2})(?:[-:.]?(\d{2}))?')
+
+
+def find_inputs(paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """
+    Separa las entradas en CSV y páginas, recorriendo directorios
+
+    Args:
+        paths: Archivos o directorios
+
+    Returns:
+        Tupla (CSV, páginas HTML), cada lista ordenada
+    """
+    csvs, pages = [], []
+    for path in paths:
+        path = Path(path)
+        candidates = (sorted(p for p in path.rglob('*') if p.is_file()) if path.is_dir()
+                      else [path])
+        for candidate in candidates:
+            name = candidate.name.lower()
+            if name.endswith(CSV_SUFFIXES):
+                csvs.append(str(candidate))
+            elif name.endswith(PAGE_SUFFIXES):
+                pages.append(str(candidate))
+    return csvs, pages
+
+
+def describe_page(path: str) -> Tuple[str, datetime]:
+    """
+    Canal y momento de una página guardada, a partir de su ruta
+
+    Se aceptan <slug>_<fecha>.html y <slug>/<fecha>.html; sin fecha en el
+    nombre se usa la fecha de modificación del archivo.
+
+    Args:
+        path: Ruta de la página
+
+    Returns:
+        Tupla (slug, timestamp)
+    """
+    page = Path(path)
+    stem = page.name
+    for suffix in sorted(PAGE_SUFFIXES, key=len, reverse=True):
+        if stem.lower().endswith(suffix):
+            stem = stem[:-len(suffix)]
+            break
+    match = _STAMP_PATTERN.search(stem)
+    if match:
+        parts = [int(value) for value in match.groups(default='0')]
+        timestamp = datetime(*parts)
+        slug = stem[:match.start()].rstrip('_-@ ')
+    else:
+        timestamp = datetime.fromtimestamp(page.stat().st_mtime)
+        slug = stem
+    return (slug or page.parent.name).lower(), timestamp
+
+
+def _parse_page(task: Tuple[str, str, datetime]) -> Tuple[str, datetime, Optional[float]]:
+    """
+    Rating de una página guardada (corre en los procesos del pool)
+
+    Usa extract_rating, la misma regla que el scraper: el texto de
+    #channel_rating convertido a float.
+    """
+    path, channel, timestamp = task
+    opener = gzip.open if path.lower().endswith('.gz') else open
+    try:
+        with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+            return channel, timestamp, extract_rating(f.read())
+    except OSError as e:
+        logger.warning(f"No se pudo leer {path}: {str(e)}")
+        return channel, timestamp, None
+
+
+class BackfillLoader:
+    """
+    Lleva historial externo al formato del scraper y lo integra en bloque
+
+    Los CSV se leen por bloques de `chunksize` filas y las páginas se parsean
+    en todos los núcleos; cada bloque pasa por Transformer.transform_frame.
+    Los bloques se juntan en lotes de hasta `batch_rows` filas, cada lote se
+    deduplica por TIMESTAMP + canal (gana la última lectura no nula del lote)
+    y se escribe con RatingStore.merge_frame, que conserva las lecturas que
+    ya estaban; entre lotes gana por lo tanto el que se escribió primero.
+    """
+
+    def __init__(self, channels: Dict[str, str], workers: Optional[int] = None,
+                 chunksize: int = 100000, align: Optional[str] = None,
+                 renames: Optional[Dict[str, str]] = None, batch_rows: int = 1000000):
+        """
+        Args:
+            channels: Catálogo de canales (nombre -> slug)
+            workers: Procesos para parsear páginas (por defecto uno por núcleo)
+            chunksize: Filas de CSV o lecturas de páginas por bloque
+            align: Regla de pandas para redondear hacia abajo los TIMESTAMP
+                (ej: '1min'), así las páginas de una misma ronda caen en una fila
+            renames: Columna normalizada -> canal, además de los slugs del
+                catálogo (ej: {'CHILEVISION': 'CHV', 'FECHA': 'TIMESTAMP'})
+            batch_rows: Filas por llamada a merge_frame; acota la memoria (cada
+                lote es una pasada de escritura sobre el historial)
+        """
+        self.channels = channels
+        self.workers = workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self.batch_rows = batch_rows
+        self.align = align
+        # Columnas con el slug (ej: 'mega', 'tvm') se reconocen como su canal
+        self.renames = {slug.upper(): name for name, slug in channels.items()}
+        self.renames.update(renames or {})
+        self.stats: Dict[str, int] = {'csv_rows': 0, 'pages': 0, 'pages_without_rating': 0,
+                                      'pages_unknown_channel': 0, 'readings': 0, 'duplicates': 0}
+
+    def csv_frames(self, path: str) -> Iterator[pd.DataFrame]:
+        """
+        Bloques transformados de un CSV
+
+        Acepta el formato ancho del historial (TIMESTAMP y una columna por
+        canal) y el largo (TIMESTAMP, CHANNEL, RATING).
+
+        Args:
+            path: CSV (o .csv.gz)
+
+        Yields:
+            DataFrames con TIMESTAMP y una columna float por canal
+        """
+        rows = 0
+        for chunk in pd.read_csv(path, chunksize=self.chunksize, dtype=str):
+            rows += len(chunk)
+            self.stats['csv_rows'] += len(chunk)
+            normalized = {col: self.renames.get(''.join(str(col).split()).upper(),
+                                                ''.join(str(col).split()).upper())
+                          for col in chunk.columns}
+            if {'CHANNEL', 'RATING'} <= set(normalized.values()):
+                chunk = chunk.rename(columns=normalized)
+                readings = int(chunk['RATING'].count())
+                chunk = (chunk.groupby(['TIMESTAMP', 'CHANNEL'], sort=False)['RATING'].last()
+                              .unstack().reset_index())
+                kept = int(chunk.drop(columns='TIMESTAMP').count().sum())
+                self.stats['duplicates'] += readings - kept
+            yield Transformer.transform_frame(chunk, self.renames)
+        logger.info(f"{rows:,} filas leídas de {path}")
+
+    def page_frames(self, paths: List[str]) -> Iterator[pd.DataFrame]:
+        """
+        Bloques transformados de páginas guardadas, parseadas en paralelo
+
+        Args:
+            paths: Páginas HTML (ver describe_page para los nombres aceptados)
+
+        Yields:
+            DataFrames con TIMESTAMP y una columna float por canal
+        """
+        by_slug = {slug: name for name, slug in self.channels.items()}
+        tasks, unknown = [], set()
+        for path in paths:
+            slug, timestamp = describe_page(path)
+            if slug not in by_slug:
+                self.stats['pages_unknown_channel'] += 1
+                unknown.add(slug)
+                continue
+            tasks.append((path, by_slug[slug], timestamp))
+        if unknown:
+            logger.warning(f"Páginas de canales fuera del catálogo omitidas: {sorted(unknown)}")
+        if not tasks:
+            return
+
+        batch: List[Tuple[str, datetime, float]] = []
+        chunksize = max(1, min(256, len(tasks) // (self.workers * 4)))
+        with multiprocessing.Pool(min(self.workers, len(tasks))) as pool:
+            for channel, timestamp, rating in pool.imap_unordered(_parse_page, tasks,
+                                                                  chunksize=chunksize):
+                self.stats['pages'] += 1
+                if rating is None:
+                    self.stats['pages_without_rating'] += 1
+                    continue
+                batch.append((channel, timestamp, rating))
+                if len(batch) >= self.chunksize:
+                    yield self._pages_frame(batch)
+                    batch = []
+        if batch:
+            yield self._pages_frame(batch)
+        logger.info(f"{self.stats['pages']:,} páginas parseadas con {self.workers} procesos "
+                    f"({self.stats['pages_without_rating']:,} sin rating)")
+
+    @staticmethod
+    def _pages_frame(batch: List[Tuple[str, datetime, float]]) -> pd.DataFrame:
+        """Lecturas de páginas (canal, momento, rating) -> bloque ancho transformado"""
+        long = pd.DataFrame(batch, columns=['CHANNEL', 'TIMESTAMP', 'RATING'])
+        wide = (long.groupby(['TIMESTAMP', 'CHANNEL'], sort=False)['RATING'].last()
+                    .unstack().reset_index())
+        return Transformer.transform_frame(wide)
+
+    def batches(self, frames: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        """
+        Junta los bloques en lotes de hasta batch_rows filas, ya deduplicados
+
+        Args:
+            frames: Bloques transformados
+
+        Yields:
+            Lotes de collect, en el orden de las entradas
+        """
+        pending, rows = [], 0
+        for frame in frames:
+            if frame.empty:
+                continue
+            pending.append(frame)
+            rows += len(frame)
+            if rows >= self.batch_rows:
+                yield self.collect(pending)
+                pending, rows = [], 0
+        if pending:
+            yield self.collect(pending)
+
+    def collect(self, frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+        """
+        Une los bloques y deduplica por TIMESTAMP + canal con un solo ordenamiento
+
+        Args:
+            frames: Bloques transformados
+
+        Returns:
+            DataFrame con TIMESTAMP único y ordenado y solo canales del catálogo
+        """
+        frames = [frame for frame in frames if not frame.empty]
+        if not frames:
+            return pd.DataFrame(columns=['TIMESTAMP'])
+        df = pd.concat(frames, ignore_index=True, sort=False)
+        unknown = [col for col in df.columns if col != 'TIMESTAMP' and col not in self.channels]
+        if unknown:
+            logger.warning(f"Columnas fuera del catálogo descartadas: {unknown} "
+                           f"(usar renames para mapearlas)")
+            df = df.drop(columns=unknown)
+        channels = [name for name in self.channels if name in df.columns]
+        if self.align:
+            df['TIMESTAMP'] = df['TIMESTAMP'].dt.floor(self.align)
+
+        readings = int(df[channels].count().sum())
+        # groupby ordena por TIMESTAMP y last() toma la última lectura no nula de cada canal
+        df = df.groupby('TIMESTAMP', sort=True)[channels].last().dropna(how='all').reset_index()
+        kept = int(df[channels].count().sum())
+        self.stats['readings'] += kept
+        self.stats['duplicates'] += readings - kept
+        return df
+
+    def load(self, store: RatingStore, csv_paths: Iterable[str] = (),
+             page_paths: Iterable[str] = (), dry_run: bool = False) -> Dict[str, Any]:
+        """
+        Lee todas las entradas y las integra en el almacenamiento, lote por lote
+
+        Args:
+            store: Historial destino
+            csv_paths: CSV exportados
+            page_paths: Páginas HTML guardadas
+            dry_run: Si True, solo lee y deduplica, sin escribir
+
+        Returns:
+            Resumen: stats de lectura más rows (sumadas entre lotes),
+            first_timestamp, last_timestamp y added (lecturas nuevas en el
+            historial)
+        """
+        def frames():
+            for path in csv_paths:
+                yield from self.csv_frames(path)
+            yield from self.page_frames(list(page_paths))
+
+        rows = added = 0
+        first = last = None
+        for df in self.batches(frames()):
+            if df.empty:
+                continue
+            rows += len(df)
+            batch_first, batch_last = df['TIMESTAMP'].iloc[0], df['TIMESTAMP'].iloc[-1]
+            first = batch_first if first is None else min(first, batch_first)
+            last = batch_last if last is None else max(last, batch_last)
+            if not dry_run:
+                added += store.merge_frame(df)
+        return dict(self.stats, rows=rows, added=added, first_timestamp=first, last_timestamp=last)
@@ -0,0 +1,182 @@
+"""
+ChangeFeed - Aviso de datos nuevos del Orchestrator al dashboard mediante un archivo de notificación
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def notify_path_for(location: str) -> str:
+    """
+    Archivo de notificación asociado a un almacenamiento
+
+    Args:
+        location: Ubicación del RatingStore (store.location)
+
+    Returns:
+        Ruta <ubicación>.notify
+    """
+    return f"{location}.notify"
+
+
+def read_notification(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Lee la última notificación publicada
+
+    Args:
+        path: Archivo de notificación
+
+    Returns:
+        Diccionario con sequence, rows, last_timestamp y published_at,
+        o None si todavía no se publicó nada
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+class ChangeNotifier:
+    """
+    Lado del escritor: publica un aviso cada vez que se guardan filas
+
+    El aviso se reemplaza de forma atómica (archivo temporal + rename), así
+    que quien lo lea nunca ve un JSON a medio escribir. La secuencia continúa
+    desde la última publicada aunque el proceso se reinicie.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archivo de notificación (ver notify_path_for)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        last = read_notification(path)
+        self.sequence = int(last['sequence']) if last else 0
+
+    def publish(self, rows: int, last_timestamp: Optional[str] = None):
+        """
+        Anuncia filas recién guardadas
+
+        Args:
+            rows: Filas guardadas en esta escritura
+            last_timestamp: TIMESTAMP de la última fila guardada
+        """
+        with self._lock:
+            self.sequence += 1
+            payload = {
+                'sequence': self.sequence,
+                'rows': rows,
+                'last_timestamp': last_timestamp,
+                'published_at': time.time(),
+            }
+            tmp_path = f"{self.path}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                # El aviso es opcional: el dato ya quedó guardado
+                logger.warning(f"No se pudo publicar la notificación {self.path}: {str(e)}")
+
+
+class ChangeWatcher:
+    """
+    Lado del lector: un hilo que detecta cambios y despierta a quien espera
+
+    Revisa tamaño y mtime de los archivos indicados (el de notificación y,
+    como respaldo para escritores que no lo publican, los del propio
+    almacenamiento). Un stat cada poll_interval segundos es mucho más barato
+    que releer datos, y funciona igual en Linux, Windows y volúmenes
+    montados, donde inotify no siempre está disponible.
+
+    Cuando los archivos cambian se espera a que se estabilicen (settle)
+    antes de anunciar una versión nueva, para que el append del historial,
+    la actualización de agregados y el aviso de un mismo ciclo cuenten como
+    un solo cambio.
+    """
+
+    def __init__(self, paths: Iterable[str], poll_interval: float = 0.5, settle: float = 0.3):
+        """
+        Args:
+            paths: Archivos a vigilar (pueden no existir todavía)
+            poll_interval: Segundos entre revisiones
+            settle: Segundos sin cambios antes de anunciar una versión nueva
+        """
+        self.paths: List[str] = list(paths)
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.version = 0
+        self.last_change: Optional[float] = None
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _signature(self) -> Tuple:
+        """Tamaño y mtime de cada archivo vigilado (None si no existe)"""
+        signature = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _run(self):
+        """Loop del hilo vigilante"""
+        current = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            signature = self._signature()
+            if signature == current:
+                continue
+            # Esperar a que el ciclo de escritura termine
+            while not self._stop.wait(self.settle):
+                settled = self._signature()
+                if settled == signature:
+                    break
+                signature = settled
+            current = signature
+            with self._condition:
+                self.version += 1
+                self.last_change = time.time()
+                self._condition.notify_all()
+
+    def start(self) -> 'ChangeWatcher':
+        """Inicia el hilo vigilante (idempotente)"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="change-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Detiene el hilo vigilante y despierta a quienes esperan"""
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def wait_for_change(self, since: int, timeout: Optional[float] = None) -> int:
+        """
+        Bloquea hasta que haya una versión posterior a `since` o venza el timeout
+
+        Args:
+            since: Última versión que vio quien llama
+            timeout: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            Versión vigente (igual a `since` si no hubo cambios)
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != since or self._stop.is_set(), timeout)
+            return self.version
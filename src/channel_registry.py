@@ -0,0 +1,69 @@
+"""
+ChannelRegistry - Catálogo de canales a monitorear leído desde un archivo JSON
+"""
+from typing import Dict, Optional
+import json
+import logging
+import os
+import re
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Archivo por defecto (se puede cambiar con la variable de entorno)
+DEFAULT_REGISTRY_FILE = "channels.json"
+REGISTRY_ENV_VAR = "RATINGS_CHANNELS_FILE"
+
+# Los nombres se usan como columnas del CSV: mayúsculas sin espacios
+_NAME_PATTERN = re.compile(r'^[A-Z0-9_]+$')
+
+
+def load_channels(filepath: Optional[str] = None,
+                  default: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    Lee el catálogo de canales
+
+    El archivo acepta dos formatos:
+        {"CHV": "chv", "MEGA": "mega"}
+        [{"name": "CHV", "slug": "chv", "group": "abierta", "enabled": true}, ...]
+
+    Args:
+        filepath: Ruta del JSON; por defecto $RATINGS_CHANNELS_FILE o channels.json
+        default: Canales a usar si el archivo no existe
+
+    Returns:
+        Diccionario nombre -> slug, en el orden del archivo
+    """
+    path = Path(filepath or os.environ.get(REGISTRY_ENV_VAR, DEFAULT_REGISTRY_FILE))
+    if not path.exists():
+        if filepath is not None or default is None:
+            raise FileNotFoundError(f"No existe el catálogo de canales: {path}")
+        return dict(default)
+
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    if isinstance(data, dict):
+        entries = [{'name': name, 'slug': slug} for name, slug in data.items()]
+    elif isinstance(data, list):
+        entries = data
+    else:
+        raise ValueError(f"Formato de catálogo no soportado en {path}")
+
+    channels: Dict[str, str] = {}
+    slugs = set()
+    for entry in entries:
+        if not entry.get('enabled', True):
+            continue
+        name, slug = str(entry['name']).strip(), str(entry['slug']).strip()
+        if not _NAME_PATTERN.match(name):
+            raise ValueError(f"Nombre de canal inválido '{name}' (usar mayúsculas sin espacios)")
+        if name in channels:
+            raise ValueError(f"Canal duplicado en el catálogo: {name}")
+        if slug in slugs:
+            raise ValueError(f"Slug duplicado en el catálogo: {slug}")
+        channels[name] = slug
+        slugs.add(slug)
+
+    logger.info(f"{len(channels)} canales cargados desde {path}")
+    return channels
@@ -3,12 +3,25 @@ Dashboard Streamlit para visualizar ratings de TV en tiempo real
 """
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
+import os
 import time
 from pathlib import Path
 
+from analytics import WEEKDAY_NAMES, SlotCube
+from archive import SegmentArchive, TieredStore
+from change_feed import ChangeWatcher, notify_path_for
+from data_loader import IncrementalLoader
+from data_service import DataService
+from downsampling import choose_rollup, downsample_series, envelope, rollup_envelope
+from latest_ring import RingReader, ring_path_for
+from lazy_imports import lazy_import
+from rollups import RESAMPLE_RULES, RollupStore
+from storage import create_store
+
+# plotly se carga con el primer gráfico, no antes de pintar el encabezado
+go = lazy_import('plotly.graph_objects')
+
 # Configuración de la página
 st.set_page_config(
     page_title="📺 Ratings TV Chile - En Vivo",
@@ -42,7 +55,30 @@ st.markdown("""
 
 # Configuración
 CSV_FILE = "ratings_data.csv"
+# Backend de almacenamiento: csv, sqlite o parquet (ver storage.py)
+STORAGE_BACKEND = os.environ.get("RATINGS_STORAGE_BACKEND", "csv")
+STORAGE_PATH = os.environ.get("RATINGS_STORAGE_PATH", CSV_FILE)
+# Agregados que mantiene el Orchestrator al ingerir (ver rollups.py)
+ROLLUPS_PATH = os.environ.get("RATINGS_ROLLUPS_PATH", "ratings_rollups.db")
+# Segmentos del historial archivado por scripts/compact_history.py (vacío = sin archivo)
+ARCHIVE_PATH = os.environ.get("RATINGS_ARCHIVE_PATH", "")
+# Cubo de franjas horarias (ver analytics.py); se actualiza desde el historial
+CUBE_PATH = os.environ.get("RATINGS_CUBE_PATH", "ratings_cube.npz")
+RECENT_ROWS = 10
 REFRESH_INTERVAL = 30  # minutos
+# Segundos entre latidos de una sesión en vivo mientras espera datos nuevos
+LIVE_HEARTBEAT = 1.0
+# Puntos máximos por canal en el gráfico temporal (~2 por pixel de ancho)
+MAX_CHART_POINTS = 2000
+# Reducción de puntos del gráfico temporal: minmax (conserva picos) o lttb (conserva la forma)
+CHART_DOWNSAMPLING = os.environ.get("RATINGS_CHART_DOWNSAMPLING", "minmax")
+TIME_RANGES = {
+    'Últimas 6 horas': timedelta(hours=6),
+    'Últimas 24 horas': timedelta(hours=24),
+    'Últimos 7 días': timedelta(days=7),
+    'Últimos 30 días': timedelta(days=30),
+    'Todo el historial': None,
+}
 CHANNEL_COLORS = {
     'CHV': '#FF6B6B',
     'CANAL13': '#4ECDC4',
@@ -62,21 +98,163 @@ CHANNEL_NAMES = {
 }
 
 
-@st.cache_data(ttl=REFRESH_INTERVAL * 60)
+@st.cache_resource
+def get_store():
+    """Backend de almacenamiento configurado (compartido entre sesiones)"""
+    store = create_store(STORAGE_BACKEND, STORAGE_PATH)
+    if ARCHIVE_PATH:
+        return TieredStore(store, SegmentArchive(ARCHIVE_PATH))
+    return store
+
+
+@st.cache_resource
+def get_loader():
+    """Loader incremental cuyo frame en memoria comparten todas las sesiones"""
+    return IncrementalLoader(get_store())
+
+
+@st.cache_resource
+def get_data_service():
+    """Datos y figuras construidos una vez por versión y compartidos entre sesiones"""
+    return DataService(get_store(), get_rollups())
+
+
+@st.cache_resource
+def get_change_watcher():
+    """Hilo único que vigila el aviso del Orchestrator y despierta a las sesiones en vivo"""
+    location = get_store().location
+    return ChangeWatcher([
+        notify_path_for(location), ring_path_for(location), location, f"{location}-wal",
+        ROLLUPS_PATH,
+    ]).start()
+
+
+@st.cache_resource
+def get_ring():
+    """Ring en memoria compartida con las últimas lecturas que publica el Orchestrator"""
+    return RingReader(ring_path_for(get_store().location))
+
+
 def load_data():
-    """Carga los datos del CSV con cache"""
+    """Carga los datos nuevos del almacenamiento sobre el frame en memoria"""
+    store = get_store()
     try:
-        df = pd.read_csv(CSV_FILE)
-        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'])
-        return df
+        if not store.exists():
+            raise FileNotFoundError(store.location)
+        return get_data_service().get('frame', get_loader().load)
     except FileNotFoundError:
-        st.error(f"⚠️ No se encontró el archivo {CSV_FILE}. Ejecuta el scraper primero.")
+        st.error(f"⚠️ No se encontró el archivo {store.location}. Ejecuta el scraper primero.")
         return pd.DataFrame()
     except Exception as e:
         st.error(f"❌ Error al cargar datos: {str(e)}")
         return pd.DataFrame()
 
 
+@st.cache_resource
+def get_rollups():
+    """Agregados precalculados (compartidos entre sesiones)"""
+    return RollupStore(ROLLUPS_PATH)
+
+
+@st.cache_resource
+def get_cube():
+    """Cubo de franjas compartido entre sesiones, retomado desde disco si existe"""
+    if os.path.exists(CUBE_PATH):
+        try:
+            return SlotCube.load(CUBE_PATH)
+        except Exception as e:
+            st.warning(f"⚠️ No se pudo leer {CUBE_PATH} ({str(e)}); "
+                       f"se reconstruye desde el historial")
+    return SlotCube()
+
+
+def load_cube():
+    """Cubo con las filas nuevas del almacenamiento (se guarda si cambió)"""
+    cube = get_cube()
+    try:
+        if cube.sync(get_store()):
+            cube.save(CUBE_PATH)
+    except Exception as e:
+        st.error(f"❌ Error al actualizar el cubo de franjas: {str(e)}")
+    return cube
+
+
+def load_overview():
+    """
+    Últimas filas y resumen del historial
+
+    Usa los agregados precalculados si existen; si no, recurre al historial.
+    """
+    rollups = get_rollups()
+    if rollups.exists():
+        summary = rollups.summary()
+        if summary['rows']:
+            return rollups.latest(RECENT_ROWS), summary
+
+    df = load_data()
+    if df.empty:
+        return df, {'rows': 0, 'first_timestamp': None, 'last_timestamp': None}
+    return df.tail(RECENT_ROWS), {
+        'rows': len(df),
+        'first_timestamp': df['TIMESTAMP'].min(),
+        'last_timestamp': df['TIMESTAMP'].max(),
+    }
+
+
+def load_current(recent):
+    """
+    Última y penúltima lectura para las métricas y los gráficos actuales
+
+    Se leen del ring del Orchestrator (sin parsear el historial y antes de
+    que la escritura termine); sin ring, o si quedó atrás del historial (otro
+    proceso escribió sin publicarlo), se usan las últimas filas guardadas.
+    """
+    current = get_ring().latest_frame(2)
+    if current.empty or current['TIMESTAMP'].iloc[-1] < recent['TIMESTAMP'].iloc[-1]:
+        return recent.tail(2)
+    return current
+
+
+def load_timeline(span, summary):
+    """
+    Datos para el gráfico temporal del rango pedido
+
+    Rangos anchos se leen de los agregados por hora/día, como envolvente
+    mínimo/máximo de cada bucket (no el promedio, que aplana los picos);
+    rangos cortos del historial en memoria.
+    """
+    full_span = span or (summary['last_timestamp'] - summary['first_timestamp'])
+    resolution = choose_rollup(full_span)
+    rollups = get_rollups()
+    if resolution and rollups.exists():
+        start = summary['last_timestamp'] - span if span else None
+        lows = rollups.series(RESAMPLE_RULES[resolution], start, stat='min')
+        if lows.empty:
+            return lows
+        highs = rollups.series(RESAMPLE_RULES[resolution], start, stat='max')
+        return envelope(lows, highs, resolution)
+    df = load_data()
+    store = get_store()
+    if isinstance(store, TieredStore) and (
+            df.empty or span is None or df['TIMESTAMP'].iloc[0] > summary['last_timestamp'] - span):
+        # El frame en memoria cubre solo la ventana caliente: leer los
+        # segmentos archivados que se solapan con el rango pedido
+        df = store.read(start=summary['last_timestamp'] - span if span else None)
+    return filter_time_range(df, span)
+
+
+def load_share_base(recent, mode):
+    """Ratings base del gráfico de share: actuales o promedio histórico"""
+    if mode == 'Actual':
+        return recent
+    rollups = get_rollups()
+    if rollups.exists():
+        averages = rollups.running_share()
+    else:
+        averages = load_data().drop(columns='TIMESTAMP').mean().to_dict()
+    return pd.DataFrame([averages])
+
+
 def get_latest_ratings(df):
     """Obtiene los ratings más recientes"""
     if df.empty:
@@ -130,24 +308,38 @@ def create_current_ratings_chart(df):
     return fig
 
 
-def create_timeline_chart(df):
+def filter_time_range(df, span):
+    """Recorta el historial a las últimas `span` horas/días (None = todo)"""
+    if df.empty or span is None:
+        return df
+    return df[df['TIMESTAMP'] >= df['TIMESTAMP'].iloc[-1] - span]
+
+
+def create_timeline_chart(df, max_points=MAX_CHART_POINTS, method=CHART_DOWNSAMPLING):
     """Crea gráfico de líneas con evolución temporal"""
     if df.empty or len(df) < 2:
         return None
     
+    # Rangos anchos se grafican como envolvente mínimo/máximo por hora/día
+    resolution = choose_rollup(df['TIMESTAMP'].iloc[-1] - df['TIMESTAMP'].iloc[0])
+    if resolution:
+        df = rollup_envelope(df, resolution)
+    
+    # Limitar los puntos enviados al navegador (ver CHART_DOWNSAMPLING)
+    series = downsample_series(df, max_points, method)
+    
     fig = go.Figure()
     
-    for col in df.columns:
-        if col != 'TIMESTAMP':
-            fig.add_trace(go.Scatter(
-                x=df['TIMESTAMP'],
-                y=df[col],
-                mode='lines+markers',
-                name=CHANNEL_NAMES.get(col, col),
-                line=dict(color=CHANNEL_COLORS.get(col, '#999'), width=3),
-                marker=dict(size=8),
-                hovertemplate='<b>%{fullData.name}</b><br>%{x}<br>Rating: %{y}<extra></extra>'
-            ))
+    for col, (x, y) in series.items():
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines+markers' if len(x) <= 200 else 'lines',
+            name=CHANNEL_NAMES.get(col, col),
+            line=dict(color=CHANNEL_COLORS.get(col, '#999'), width=3),
+            marker=dict(size=8),
+            hovertemplate='<b>%{fullData.name}</b><br>%{x}<br>Rating: %{y}<extra></extra>'
+        ))
     
     fig.update_layout(
         title={
@@ -181,7 +373,8 @@ def create_share_pie_chart(df):
     if df.empty:
         return None
     
-    latest_ratings = get_latest_ratings(df)
+    # Los canales sin lectura (nulos) no entran al share
+    latest_ratings = {ch: value for ch, value in get_latest_ratings(df).items() if pd.notna(value)}
     total = sum(latest_ratings.values())
     
     if total == 0:
@@ -226,43 +419,207 @@ def create_share_pie_chart(df):
     return fig
 
 
+def create_slot_heatmap(means, channel):
+    """Crea mapa de calor del rating promedio por día de la semana y franja"""
+    if means.isna().all().all():
+        return None
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=means.to_numpy(),
+        x=list(means.columns),
+        y=list(means.index),
+        colorscale='Viridis',
+        colorbar=dict(title='Rating'),
+        hovertemplate='<b>%{y} %{x}</b><br>Rating promedio: %{z:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title={
+            'text': f'🗓️ {CHANNEL_NAMES.get(channel, channel)}: Rating por Día y Franja',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 24, 'color': 'white'}
+        },
+        xaxis_title="Franja",
+        yaxis=dict(autorange='reversed'),
+        template="plotly_dark",
+        height=450,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    
+    return fig
+
+
+def create_ranking_chart(ranking):
+    """Crea gráfico de barras horizontales con el ranking de una franja"""
+    if ranking.empty:
+        return None
+    
+    ranking = ranking.iloc[::-1]
+    fig = go.Figure(data=[
+        go.Bar(
+            x=ranking['rating'],
+            y=[f"#{rank} {CHANNEL_NAMES.get(ch, ch)}"
+               for ch, rank in zip(ranking['channel'], ranking['rank'])],
+            orientation='h',
+            marker_color=[CHANNEL_COLORS.get(ch, '#999') for ch in ranking['channel']],
+            text=[f"{value:.2f}" for value in ranking['rating']],
+            textposition='outside',
+            customdata=ranking['samples'],
+            hovertemplate=('<b>%{y}</b><br>Rating promedio: %{x:.2f}<br>'
+                           'Lecturas: %{customdata}<extra></extra>')
+        )
+    ])
+    
+    fig.update_layout(
+        title={
+            'text': '🏆 Ranking de la Franja',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 24, 'color': 'white'}
+        },
+        xaxis_title="Rating promedio",
+        template="plotly_dark",
+        height=400,
+        showlegend=False,
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    
+    return fig
+
+
+def create_weekly_share_chart(df):
+    """Crea gráfico de líneas con el share semanal de cada canal"""
+    if df.empty:
+        return None
+    
+    fig = go.Figure()
+    for col in df.columns:
+        if col == 'TIMESTAMP':
+            continue
+        fig.add_trace(go.Scatter(
+            x=df['TIMESTAMP'],
+            y=df[col],
+            mode='lines+markers' if len(df) <= 60 else 'lines',
+            name=CHANNEL_NAMES.get(col, col),
+            line=dict(color=CHANNEL_COLORS.get(col, '#999'), width=3),
+            hovertemplate=('<b>%{fullData.name}</b><br>Semana del %{x|%d/%m/%Y}<br>'
+                           'Share: %{y:.1f}%<extra></extra>')
+        ))
+    
+    fig.update_layout(
+        title={
+            'text': '📆 Share Semanal',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 24, 'color': 'white'}
+        },
+        xaxis_title="Semana",
+        yaxis_title="Share (%)",
+        template="plotly_dark",
+        height=450,
+        hovermode='x unified',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(color='white')
+    )
+    
+    return fig
+
+
+# Grupos de días para el ranking por franja (lunes = 0)
+DAY_GROUPS = {
+    'Todos los días': None,
+    'Lunes a viernes': [0, 1, 2, 3, 4],
+    'Fin de semana': [5, 6],
+    **{name: [i] for i, name in enumerate(WEEKDAY_NAMES)},
+}
+
+
+def wait_for_updates(watcher, service, seen_version):
+    """
+    Mantiene la sesión en vivo hasta que el vigilante anuncie datos nuevos
+
+    Al llegar el aviso la página se vuelve a ejecutar; las figuras de la
+    versión nueva se construyen una sola vez (DataService) y el loader lee
+    solo las filas agregadas.
+    """
+    status = st.empty()
+    while True:
+        if watcher.wait_for_change(seen_version, timeout=LIVE_HEARTBEAT) != seen_version:
+            service.refresh(force=True)
+            st.rerun()
+        # Cada latido devuelve el control a Streamlit, que así puede atender
+        # clics o cerrar la sesión si el navegador se desconectó
+        status.caption(f"🟢 En vivo · última revisión {datetime.now():%H:%M:%S}")
+
+
 def main():
     # Header
     st.title("📺 Ratings TV Chile - Dashboard en Vivo")
     
+    service = get_data_service()
+    watcher = get_change_watcher()
+    # Versión vista antes de leer: un cambio durante el render no se pierde
+    seen_version = watcher.version
+    service.refresh()
+    
     # Sidebar
     with st.sidebar:
         st.header("⚙️ Configuración")
         
-        st.info("🔄 Los datos se actualizan automáticamente cada 30 minutos")
+        st.info("🔄 Cada actualización lee solo los registros nuevos del scraper")
+        
+        live = st.toggle("🔴 En vivo", value=True, key="live",
+                         help="Actualiza la página apenas el scraper guarda datos nuevos")
         
         st.markdown("---")
         
         # Información del archivo
-        if Path(CSV_FILE).exists():
-            file_size = Path(CSV_FILE).stat().st_size
-            st.success(f"✅ Archivo CSV encontrado")
+        store = get_store()
+        if store.exists():
+            file_size = store.size_bytes()
+            st.success(f"✅ Datos encontrados ({STORAGE_BACKEND})")
             st.caption(f"Tamaño: {file_size:,} bytes")
         else:
             st.error(f"❌ Archivo no encontrado")
         
         st.markdown("---")
         
+        # Rango del gráfico temporal
+        range_label = st.selectbox("🕒 Rango temporal", list(TIME_RANGES.keys()), index=1)
+        
+        st.markdown("---")
+        
         # Manual refresh
         if st.button("🔄 Actualizar Ahora", use_container_width=True):
-            st.cache_data.clear()
+            # Revisar el almacenamiento sin esperar el intervalo de la caché compartida
+            service.refresh(force=True)
             st.rerun()
+        
+        st.caption(f"Versión de datos: {service.version}")
     
-    # Cargar datos
-    df = load_data()
+    # Cargar datos (una vez por versión para todas las sesiones)
+    recent, summary = service.get('overview', load_overview)
     
-    if df.empty:
+    if recent.empty:
         st.warning("⚠️ No hay datos disponibles. Asegúrate de que el scraper esté ejecutándose.")
+        if live:
+            wait_for_updates(watcher, service, seen_version)
         st.stop()
     
+    current = load_current(recent)
+    # El ring puede ir un ciclo adelante del historial (escritura en segundo plano)
+    current_key = current['TIMESTAMP'].iloc[-1]
+    
     # Información de última actualización
-    last_update = df['TIMESTAMP'].iloc[-1]
-    total_records = len(df)
+    last_update = max(summary['last_timestamp'], current_key)
+    total_records = summary['rows']
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -270,7 +627,7 @@ def main():
     with col2:
         st.metric("📊 Total de Registros", f"{total_records:,}")
     with col3:
-        time_range = df['TIMESTAMP'].max() - df['TIMESTAMP'].min()
+        time_range = summary['last_timestamp'] - summary['first_timestamp']
         hours = time_range.total_seconds() / 3600
         st.metric("⏱️ Rango de Datos", f"{hours:.1f} horas")
     
@@ -278,20 +635,21 @@ def main():
     
     # Métricas de ratings actuales
     st.subheader("🎯 Ratings Actuales")
-    latest_ratings = get_latest_ratings(df)
+    latest_ratings = get_latest_ratings(current)
     
     cols = st.columns(len(latest_ratings))
     for idx, (channel, rating) in enumerate(latest_ratings.items()):
         with cols[idx]:
             # Calcular delta si hay datos previos
             delta = None
-            if len(df) > 1:
-                prev_rating = df.iloc[-2][channel]
-                delta = rating - prev_rating
+            if len(current) > 1:
+                prev_rating = current.iloc[-2][channel]
+                if pd.notna(rating) and pd.notna(prev_rating):
+                    delta = rating - prev_rating
             
             st.metric(
                 label=CHANNEL_NAMES.get(channel, channel),
-                value=f"{rating}",
+                value=f"{rating}" if pd.notna(rating) else "—",
                 delta=f"{delta:+.1f}" if delta is not None else None,
                 delta_color="normal"
             )
@@ -299,34 +657,93 @@ def main():
     st.markdown("---")
     
     # Gráficos
-    tab1, tab2, tab3 = st.tabs(["📊 Ratings Actuales", "📈 Evolución Temporal", "🥧 Share de Audiencia"])
+    tab1, tab2, tab3, tab4 = st.tabs(["📊 Ratings Actuales", "📈 Evolución Temporal",
+                                      "🥧 Share de Audiencia", "🗓️ Franjas Horarias"])
     
     with tab1:
-        chart1 = create_current_ratings_chart(df)
+        chart1 = service.get(('current_chart', current_key),
+                             lambda: create_current_ratings_chart(current))
         if chart1:
             st.plotly_chart(chart1, use_container_width=True)
     
     with tab2:
-        chart2 = create_timeline_chart(df)
+        chart2 = service.get(
+            ('timeline_chart', range_label),
+            lambda: create_timeline_chart(load_timeline(TIME_RANGES[range_label], summary))
+        )
         if chart2:
             st.plotly_chart(chart2, use_container_width=True)
         else:
             st.info("📊 Se necesitan al menos 2 registros para mostrar la evolución temporal")
     
     with tab3:
-        chart3 = create_share_pie_chart(df)
+        share_mode = st.radio("Base del share", ["Actual", "Promedio histórico"], horizontal=True)
+        chart3 = service.get(
+            ('share_chart', share_mode, current_key),
+            lambda: create_share_pie_chart(load_share_base(current, share_mode))
+        )
         if chart3:
             st.plotly_chart(chart3, use_container_width=True)
         else:
             st.warning("⚠️ No hay datos suficientes para calcular el share")
     
+    with tab4:
+        cube = service.get('cube', load_cube)
+        if not cube.rows:
+            st.info("🗓️ El cubo de franjas se llena a medida que llegan datos")
+        else:
+            channel_by_name = {CHANNEL_NAMES.get(ch, ch): ch for ch in cube.channels}
+            heat_channel = channel_by_name[st.selectbox("Canal", list(channel_by_name))]
+            heatmap = service.get(
+                ('slot_heatmap', heat_channel),
+                lambda: create_slot_heatmap(cube.weekday_slot_means(heat_channel), heat_channel)
+            )
+            if heatmap:
+                st.plotly_chart(heatmap, use_container_width=True)
+            
+            col_slots, col_days = st.columns([2, 1])
+            with col_slots:
+                bounds = cube.slot_labels + ['24:00']
+                prime_time = '20:00' in bounds and '23:00' in bounds
+                slot_from, slot_to = st.select_slider(
+                    "Franja", options=bounds,
+                    value=('20:00', '23:00') if prime_time else (bounds[0], bounds[-1])
+                )
+            with col_days:
+                day_group = st.selectbox("Días", list(DAY_GROUPS.keys()), index=1)
+            if bounds.index(slot_from) >= bounds.index(slot_to):
+                st.info("Elige una franja de al menos un bloque")
+            else:
+                ranking_chart = service.get(
+                    ('ranking_chart', slot_from, slot_to, day_group),
+                    lambda: create_ranking_chart(cube.slot_ranking(
+                        bounds.index(slot_from), bounds.index(slot_to),
+                        weekdays=DAY_GROUPS[day_group]
+                    ))
+                )
+                if ranking_chart:
+                    st.plotly_chart(ranking_chart, use_container_width=True)
+            
+            weekly_chart = service.get('weekly_share_chart',
+                                       lambda: create_weekly_share_chart(cube.weekly_share()))
+            if weekly_chart:
+                st.plotly_chart(weekly_chart, use_container_width=True)
+            
+            stats = cube.summary()
+            st.caption(f"Cubo: {stats['days']} días × {stats['slots']} franjas × "
+                       f"{stats['channels']} canales "
+                       f"({stats['bytes'] / 1024:.0f} KB, {stats['rows']:,} lecturas)")
+    
     st.markdown("---")
     
     # Tabla de datos recientes
     with st.expander("📋 Ver Datos Recientes (últimos 10 registros)"):
-        recent_df = df.tail(10).copy()
+        recent_df = recent.tail(RECENT_ROWS).copy()
         recent_df['TIMESTAMP'] = recent_df['TIMESTAMP'].dt.strftime('%d/%m/%Y %H:%M:%S')
         st.dataframe(recent_df.iloc[::-1], use_container_width=True, hide_index=True)
+    
+    if live:
+        wait_for_updates(watcher, service, seen_version)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+"""
+IncrementalLoader - Mantiene en memoria el historial leyendo solo lo nuevo
+"""
+from typing import Any, Optional
+import logging
+import threading
+import time
+
+import pandas as pd
+
+from storage import RatingStore
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalLoader:
+    """
+    Frame en memoria compartido por todas las sesiones del dashboard
+
+    Cada load() pide al almacenamiento solo las filas posteriores al último
+    cursor y las concatena al frame cacheado, de modo que refrescar cuesta
+    O(filas nuevas) en parseo en vez de releer todo el historial.
+    """
+
+    def __init__(self, store: RatingStore):
+        """
+        Args:
+            store: Almacenamiento de donde se leen los ratings
+        """
+        self.store = store
+        self._frame = pd.DataFrame()
+        self._cursor: Any = None
+        self._lock = threading.Lock()
+        # Se incrementa cada vez que el frame cambia
+        self.version = 0
+        self.last_refresh: Optional[float] = None
+
+    def load(self) -> pd.DataFrame:
+        """
+        Devuelve el historial actualizado
+
+        El DataFrame devuelto es compartido entre sesiones: no debe modificarse
+        en el lugar (usar .copy() antes de alterarlo).
+
+        Returns:
+            DataFrame con TIMESTAMP como datetime64
+        """
+        with self._lock:
+            start = time.perf_counter()
+            new_rows, cursor, reset = self.store.read_incremental(self._cursor)
+            self._cursor = cursor
+
+            if reset:
+                self._frame = new_rows
+                self.version += 1
+                logger.info(f"Historial cargado completo: {len(new_rows):,} filas "
+                            f"en {time.perf_counter() - start:.3f}s")
+            elif not new_rows.empty:
+                self._frame = self._extend(self._frame, new_rows)
+                self.version += 1
+                logger.info(f"{len(new_rows)} filas nuevas leídas en "
+                            f"{time.perf_counter() - start:.3f}s")
+
+            self.last_refresh = time.time()
+            return self._frame
+
+    @staticmethod
+    def _extend(frame: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+        """
+        Concatena las filas nuevas combinando la que repite el último TIMESTAMP
+
+        Si una lectura alcanzó un append a medias (sin lock entre procesos,
+        ej: en Windows), el resto de esa fila llega en la lectura siguiente
+        con el mismo TIMESTAMP: se completa la fila en vez de duplicarla.
+        """
+        if frame.empty:
+            return new_rows
+        last = frame['TIMESTAMP'].iloc[-1]
+        if new_rows['TIMESTAMP'].iloc[0] != last:
+            return pd.concat([frame, new_rows], ignore_index=True)
+        split = new_rows['TIMESTAMP'] == last
+        row = (pd.concat([frame.iloc[-1:], new_rows[split]], ignore_index=True)
+                 .groupby('TIMESTAMP', sort=False).last().reset_index())
+        return pd.concat([frame.iloc[:-1], row, new_rows[~split]], ignore_index=True)
+
+    def reset(self):
+        """Descarta el frame cacheado; la próxima carga relee todo"""
+        with self._lock:
+            self._frame = pd.DataFrame()
+            self._cursor = None
+            self.version += 1
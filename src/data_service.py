@@ -0,0 +1,147 @@
+"""
+DataService - Datos y figuras del dashboard compartidos entre sesiones, uno por versión de datos
+"""
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import logging
+import os
+import threading
+import time
+
+from rollups import RollupStore
+from storage import RatingStore
+
+logger = logging.getLogger(__name__)
+
+
+class DataService:
+    """
+    Caché de proceso para lo que todas las sesiones de Streamlit calculan igual
+
+    Cada valor (frame, resumen, figuras) se construye una sola vez por
+    versión de datos y se entrega por referencia a todas las sesiones. La
+    versión sube solo cuando cambia el almacenamiento o los agregados; en
+    ese momento se descarta todo lo construido con la versión anterior.
+
+    Si varias sesiones piden el mismo valor a la vez, solo una lo construye
+    y las demás esperan su resultado. Los valores entregados son
+    compartidos: quien los use no debe modificarlos.
+    """
+
+    def __init__(self, store: RatingStore, rollups: Optional[RollupStore] = None,
+                 check_interval: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            store: Backend con el historial
+            rollups: Agregados que mantiene el Orchestrator (opcional)
+            check_interval: Segundos mínimos entre revisiones del almacenamiento;
+                las sesiones que corren dentro de ese intervalo no tocan el disco
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.store = store
+        self.rollups = rollups
+        self.check_interval = check_interval
+        self.clock = clock
+        self.version = 0
+        self.stats: Dict[str, float] = {'hits': 0, 'builds': 0, 'build_seconds': 0.0,
+                                        'invalidations': 0}
+
+        self._token: Optional[Tuple] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        # clave -> (versión, valor)
+        self._cache: Dict[Hashable, Tuple[int, Any]] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def _data_token(self) -> Tuple:
+        """Huella barata del estado de los datos (tamaños, mtimes y resumen de agregados)"""
+        parts = []
+        if self.store.exists():
+            parts.append(self.store.size_bytes())
+            # SQLite reutiliza el WAL tras un checkpoint: el tamaño puede no cambiar
+            for path in (self.store.location, f"{self.store.location}-wal"):
+                try:
+                    parts.append(os.stat(path).st_mtime_ns)
+                except OSError:
+                    parts.append(None)
+        else:
+            parts.append(None)
+        if self.rollups is not None and self.rollups.exists():
+            summary = self.rollups.summary()
+            parts.append((summary['rows'], summary['last_timestamp']))
+        return tuple(parts)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        Revisa si llegaron datos nuevos e invalida la caché si es así
+
+        Args:
+            force: Si True, revisa aunque no haya pasado check_interval
+
+        Returns:
+            Versión de datos vigente
+        """
+        now = self.clock()
+        with self._lock:
+            if (not force and self._checked_at is not None
+                    and now - self._checked_at < self.check_interval):
+                return self.version
+            self._checked_at = now
+        token = self._data_token()
+        with self._lock:
+            if token != self._token:
+                if self._token is not None:
+                    self.stats['invalidations'] += 1
+                    logger.info(f"Datos nuevos, versión {self.version + 1}")
+                self._token = token
+                self.version += 1
+                self._cache.clear()
+            return self.version
+
+    def get(self, key: Hashable, builder: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor de la clave para la versión vigente, construyéndolo si falta
+
+        Args:
+            key: Identificador del valor (por ejemplo ('timeline', rango))
+            builder: Función sin argumentos que construye el valor
+
+        Returns:
+            Valor compartido; si builder lanza una excepción, se propaga y no
+            se guarda nada
+        """
+        with self._lock:
+            version = self.version
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == version:
+                self.stats['hits'] += 1
+                return cached[1]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Otra sesión pudo construirlo mientras se esperaba el lock
+            with self._lock:
+                cached = self._cache.get(key)
+                if cached is not None and cached[0] == self.version:
+                    self.stats['hits'] += 1
+                    return cached[1]
+                version = self.version
+
+            start = time.perf_counter()
+            value = builder()
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.stats['builds'] += 1
+                self.stats['build_seconds'] += elapsed
+                # Si la versión cambió durante la construcción, el valor ya es viejo
+                if self.version == version:
+                    self._cache[key] = (version, value)
+            logger.debug(f"{key} construido en {elapsed * 1000:.1f} ms (versión {version})")
+            return value
+
+    def invalidate(self):
+        """Descarta todo lo construido y fuerza una revisión en la próxima sesión"""
+        with self._lock:
+            self._cache.clear()
+            self._checked_at = None
+            self._token = None
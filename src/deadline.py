@@ -0,0 +1,276 @@
+"""
+Deadline - Presupuesto por ciclo, reintentos, hedging y circuit breaker por canal
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Optional, Tuple
+import logging
+import threading
+import time
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Estado de la lectura de un canal en un ciclo
+STATUS_OK = 'ok'
+STATUS_MISSING = 'missing'            # la página respondió pero sin rating
+STATUS_TIMEOUT = 'timeout'            # se agotó el tiempo del intento
+STATUS_ERROR = 'error'                # error de red / navegador
+STATUS_CIRCUIT_OPEN = 'circuit_open'  # no se consultó: el canal viene fallando
+STATUS_DEADLINE = 'deadline'          # no se consultó: se acabó el presupuesto del ciclo
+STATUSES = (STATUS_OK, STATUS_MISSING, STATUS_TIMEOUT, STATUS_ERROR, STATUS_CIRCUIT_OPEN,
+            STATUS_DEADLINE)
+
+# Un intento recibe un slug y un timeout en segundos y devuelve (rating, estado)
+Attempt = Callable[[str, float], Tuple[Optional[float], str]]
+
+
+def is_timeout(error: BaseException) -> bool:
+    """
+    True si la excepción es un timeout (socket, asyncio o Playwright)
+
+    Playwright define su propio TimeoutError; se reconoce por nombre para
+    no importar Playwright en el camino HTTP.
+    """
+    return isinstance(error, TimeoutError) or type(error).__name__ == 'TimeoutError'
+
+
+class Deadline:
+    """Tiempo restante de un ciclo con presupuesto fijo"""
+
+    def __init__(self, budget: Optional[float], clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            budget: Segundos disponibles para el ciclo (None = sin límite)
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.budget = budget
+        self.clock = clock
+        self.started = clock()
+
+    def remaining(self) -> float:
+        """Segundos que quedan (infinito si no hay presupuesto)"""
+        if self.budget is None:
+            return float('inf')
+        return max(0.0, self.budget - (self.clock() - self.started))
+
+    @property
+    def expired(self) -> bool:
+        """True si ya no queda tiempo"""
+        return self.remaining() <= 0
+
+    def share(self, pending: int, cap: float) -> float:
+        """
+        Timeout para el próximo intento
+
+        Reparte lo que queda entre los intentos pendientes que corren en
+        serie, sin superar el timeout máximo de un intento.
+
+        Args:
+            pending: Intentos que todavía compiten por el tiempo restante
+            cap: Timeout máximo de un intento en segundos
+
+        Returns:
+            Segundos asignados al intento
+        """
+        return min(cap, self.remaining() / max(1, pending))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por canal
+
+    Tras `threshold` fallos seguidos el canal queda abierto: no se consulta
+    durante `cooldown` segundos y su lectura se registra como circuit_open.
+    Vencido el cooldown se permite un intento de prueba (semiabierto); si
+    funciona el canal se cierra y si falla vuelve a abrirse.
+    """
+
+    def __init__(self, threshold: int = 3, cooldown: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            threshold: Fallos seguidos que abren el circuito (0 = deshabilitado)
+            cooldown: Segundos que el circuito queda abierto
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.clock = clock
+        self._failures: Dict[str, int] = {}
+        self._opened_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def state(self, key: str) -> str:
+        """'closed', 'open' o 'half_open'"""
+        with self._lock:
+            opened_at = self._opened_at.get(key)
+        if opened_at is None:
+            return 'closed'
+        return 'open' if self.clock() - opened_at < self.cooldown else 'half_open'
+
+    def allow(self, key: str) -> bool:
+        """True si el canal se puede consultar ahora"""
+        return self.state(key) != 'open'
+
+    def record(self, key: str, ok: bool):
+        """
+        Registra el resultado de una consulta
+
+        Args:
+            key: Canal
+            ok: True si se obtuvo el rating
+        """
+        with self._lock:
+            if ok:
+                self._failures.pop(key, None)
+                if self._opened_at.pop(key, None) is not None:
+                    logger.info(f"Circuito de {key} cerrado: el canal volvió a responder")
+                return
+            failures = self._failures.get(key, 0) + 1
+            self._failures[key] = failures
+            if self.threshold and failures >= self.threshold:
+                reopened = key in self._opened_at
+                self._opened_at[key] = self.clock()
+                if not reopened:
+                    logger.warning(f"Circuito de {key} abierto tras {failures} fallos seguidos; "
+                                   f"se omite por {self.cooldown:.0f}s")
+        METRICS.set_gauge('ratings_channel_circuit_open', 1.0 if self.state(key) == 'open' else 0.0,
+                          channel=key)
+
+    def open_channels(self) -> Iterable[str]:
+        """Canales con el circuito abierto"""
+        return [key for key in list(self._opened_at) if self.state(key) == 'open']
+
+
+class DeadlineRunner:
+    """
+    Ejecuta los intentos de un ciclo dentro de un presupuesto de tiempo
+
+    Cada canal se consulta en su propio hilo. Un intento recibe como timeout
+    su parte del tiempo restante; si no responde en `hedge_after` segundos
+    se lanza un segundo request idéntico y gana el primero que trae rating.
+    Los fallos rápidos (error, rating ausente) se reintentan mientras quede
+    presupuesto, hasta `retries` veces.
+    """
+
+    def __init__(self, attempt: Attempt, budget: Optional[float] = None,
+                 attempt_timeout: float = 10.0, retries: int = 1,
+                 hedge_after: Optional[float] = None, max_workers: int = 6):
+        """
+        Args:
+            attempt: Función que hace un intento (ver Attempt); debe respetar el timeout
+            budget: Segundos totales del ciclo (None = sin límite)
+            attempt_timeout: Timeout máximo de un intento
+            retries: Reintentos por canal después del primer intento
+            hedge_after: Segundos tras los que se duplica un intento lento (None = sin hedging)
+            max_workers: Hilos para intentos en paralelo (incluye los duplicados)
+        """
+        self.attempt = attempt
+        self.budget = budget
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Segundos, intentos y duplicados de cada canal en el último run()
+        self.last_timings: Dict[str, float] = {}
+        self.last_attempts: Dict[str, int] = {}
+        self.last_hedged: Dict[str, int] = {}
+
+    def _submit(self, slug: str, timeout: float) -> Future:
+        """Lanza un intento en el pool"""
+        return self._executor.submit(self.attempt, slug, timeout)
+
+    @staticmethod
+    def _outcome(future: Future) -> Tuple[Optional[float], str]:
+        """Resultado de un intento terminado (las excepciones cuentan como error)"""
+        try:
+            return future.result()
+        except Exception as e:
+            return None, STATUS_TIMEOUT if is_timeout(e) else STATUS_ERROR
+
+    def _attempt_hedged(self, slug: str, timeout: float) -> Tuple[Optional[float], str, int]:
+        """
+        Un intento, duplicado si tarda más que hedge_after
+
+        Returns:
+            Tupla (rating, estado, requests lanzados)
+        """
+        started = time.monotonic()
+        futures = [self._submit(slug, timeout)]
+        if self.hedge_after is not None and self.hedge_after < timeout:
+            done, _ = wait(futures, timeout=self.hedge_after)
+            if not done:
+                METRICS.inc('ratings_hedged_requests_total', channel=slug)
+                futures.append(self._submit(slug, max(0.0, timeout - (time.monotonic() - started))))
+
+        outcome: Tuple[Optional[float], str] = (None, STATUS_TIMEOUT)
+        pending = set(futures)
+        while pending:
+            left = timeout - (time.monotonic() - started)
+            if left <= 0:
+                break
+            done, pending = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+            for future in done:
+                rating, status = self._outcome(future)
+                if rating is not None:
+                    return rating, status, len(futures)
+                # Un fallo de uno de los duplicados no descarta al otro
+                outcome = (rating, status)
+        # Los intentos que siguen corriendo terminan solos por su propio timeout
+        return outcome[0], outcome[1], len(futures)
+
+    def _run_channel(self, slug: str, deadline: Deadline) -> Tuple[Optional[float], str]:
+        """Intentos de un canal hasta obtener rating, agotar reintentos o el presupuesto"""
+        started = time.monotonic()
+        rating, status = None, STATUS_DEADLINE
+        attempts = hedged = 0
+        try:
+            for attempt in range(self.retries + 1):
+                # Los canales corren en paralelo: cada intento puede usar todo lo que queda
+                timeout = deadline.share(1, self.attempt_timeout)
+                if timeout <= 0:
+                    break
+                rating, status, launched = self._attempt_hedged(slug, timeout)
+                attempts += 1
+                hedged += launched - 1
+                if rating is not None:
+                    break
+                logger.warning(f"Intento {attempt + 1} de {slug} sin rating ({status})")
+            return rating, status
+        finally:
+            self.last_timings[slug] = time.monotonic() - started
+            self.last_attempts[slug] = attempts
+            self.last_hedged[slug] = hedged
+
+    def run(self, slugs: Iterable[str],
+            deadline: Optional[Deadline] = None) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Consulta varios canales dentro del presupuesto del ciclo
+
+        Args:
+            slugs: Slugs a consultar
+            deadline: Presupuesto ya en curso (por defecto uno nuevo de `budget` segundos)
+
+        Returns:
+            Diccionario slug -> (rating o None, estado)
+        """
+        slugs = list(slugs)
+        deadline = deadline or Deadline(self.budget)
+        self.last_timings, self.last_attempts, self.last_hedged = {}, {}, {}
+        if self._executor is None:
+            # Cada canal puede tener hasta dos intentos en vuelo (original y duplicado)
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers * 2,
+                                                thread_name_prefix="deadline")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(slugs))),
+                                thread_name_prefix="deadline-channel") as channels:
+            futures = {slug: channels.submit(self._run_channel, slug, deadline) for slug in slugs}
+            return {slug: future.result() for slug, future in futures.items()}
+
+    def close(self):
+        """Cierra el pool de intentos sin esperar a los que quedaron colgados"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,211 @@
+"""
+Downsampling - Reduce series temporales para graficarlas sin perder los picos
+"""
+from datetime import timedelta
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Rangos más anchos que estos umbrales se grafican desde agregados
+ROLLUP_THRESHOLDS = (
+    (timedelta(days=60), 'D'),
+    (timedelta(days=3), 'h'),
+)
+
+
+def minmax_indices(x: np.ndarray, y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Índices del mínimo y el máximo de cada bucket de igual ancho en x
+
+    Conserva los picos y valles de la serie: con n_buckets igual al ancho en
+    pixeles del gráfico, el resultado es visualmente idéntico al original.
+
+    Args:
+        x: Eje x numérico y ordenado (ej: timestamps en ns)
+        y: Valores (los NaN se ignoran)
+        n_buckets: Cantidad de buckets
+
+    Returns:
+        Índices ordenados de los puntos a conservar
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) <= 2 * n_buckets:
+        return valid
+
+    xv = x[valid].astype(np.float64)
+    span = xv[-1] - xv[0]
+    if span <= 0:
+        return valid[[0, -1]]
+    buckets = np.minimum(((xv - xv[0]) / span * n_buckets).astype(np.int64), n_buckets - 1)
+
+    # x está ordenado, así que cada bucket es un tramo contiguo
+    yv = y[valid]
+    is_start = np.r_[True, buckets[1:] != buckets[:-1]]
+    starts = np.flatnonzero(is_start)
+    bucket_of = np.cumsum(is_start) - 1
+    mins = np.minimum.reduceat(yv, starts)
+    maxs = np.maximum.reduceat(yv, starts)
+
+    keep = []
+    for extremes in (mins, maxs):
+        hits = np.flatnonzero(yv == extremes[bucket_of])
+        # Primera ocurrencia del extremo en cada bucket
+        _, first = np.unique(bucket_of[hits], return_index=True)
+        keep.append(hits[first])
+
+    keep = np.union1d(keep[0], keep[1])
+    # Siempre conservar los extremos del rango
+    keep = np.union1d(keep, [0, len(valid) - 1])
+    return valid[keep]
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: elige n_out puntos que preservan la forma
+
+    Args:
+        x: Eje x numérico y ordenado
+        y: Valores (los NaN se ignoran)
+        n_out: Puntos a conservar (mínimo 3)
+
+    Returns:
+        Índices ordenados de los puntos a conservar
+    """
+    valid = np.flatnonzero(~np.isnan(y))
+    n = len(valid)
+    if n <= n_out or n_out < 3:
+        return valid
+
+    xv = x[valid].astype(np.float64)
+    yv = y[valid].astype(np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Promedio del bucket siguiente como tercer vértice del triángulo
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xv[next_start:next_end].mean()
+        avg_y = yv[next_start:next_end].mean()
+        area = np.abs(
+            (xv[prev] - avg_x) * (yv[start:end] - yv[prev])
+            - (xv[prev] - xv[start:end]) * (avg_y - yv[prev])
+        )
+        prev = start + int(np.argmax(area))
+        selected[i + 1] = prev
+
+    return valid[selected]
+
+
+def choose_rollup(span: timedelta) -> Optional[str]:
+    """
+    Resolución de agregado adecuada para un rango de tiempo
+
+    Args:
+        span: Ancho del rango a graficar
+
+    Returns:
+        Regla de resample de pandas ('D', 'h') o None para datos crudos
+    """
+    for threshold, rule in ROLLUP_THRESHOLDS:
+        if span > threshold:
+            return rule
+    return None
+
+
+def rollup(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    Promedia el historial por hora o día
+
+    Args:
+        df: Historial con TIMESTAMP y una columna por canal
+        rule: Regla de resample ('h', 'D')
+
+    Returns:
+        DataFrame agregado con el mismo formato
+    """
+    return (df.set_index('TIMESTAMP')
+              .resample(rule)
+              .mean()
+              .dropna(how='all')
+              .reset_index())
+
+
+def envelope(lows: pd.DataFrame, highs: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    Une el mínimo y el máximo de cada bucket en una sola serie por canal
+
+    Cada bucket aporta dos puntos: el mínimo en su inicio y el máximo a
+    mitad del bucket, así la línea recorre todo el rango del bucket y los
+    picos se ven aunque el bucket sea de un día.
+
+    Args:
+        lows: Mínimo por bucket (TIMESTAMP = inicio del bucket y una columna por canal)
+        highs: Máximo por bucket, mismo formato
+        rule: Regla de resample de los buckets ('h', 'D')
+
+    Returns:
+        DataFrame ordenado con el formato del historial (dos filas por bucket)
+    """
+    half = pd.Timedelta(pd.tseries.frequencies.to_offset(rule)) / 2
+    highs = highs.assign(TIMESTAMP=highs['TIMESTAMP'] + half)
+    return (pd.concat([lows, highs], ignore_index=True, sort=False)
+              .sort_values('TIMESTAMP', kind='stable')
+              .reset_index(drop=True))
+
+
+def rollup_envelope(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    Envolvente mínimo/máximo del historial por hora o día (para graficar)
+
+    A diferencia de rollup(), no promedia: conserva los picos. Aplicarla a
+    su propio resultado con la misma regla devuelve lo mismo.
+
+    Args:
+        df: Historial con TIMESTAMP y una columna por canal
+        rule: Regla de resample ('h', 'D')
+
+    Returns:
+        DataFrame con dos filas por bucket (ver envelope)
+    """
+    buckets = df.set_index('TIMESTAMP').resample(rule)
+    lows = buckets.min().dropna(how='all').reset_index()
+    highs = buckets.max().dropna(how='all').reset_index()
+    return envelope(lows, highs, rule)
+
+
+def downsample_series(df: pd.DataFrame, max_points: int,
+                      method: str = 'minmax') -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Reduce cada canal a lo sumo a max_points puntos
+
+    Args:
+        df: Historial con TIMESTAMP y una columna por canal
+        max_points: Puntos máximos por canal
+        method: 'minmax' (conserva picos) o 'lttb' (conserva la forma)
+
+    Returns:
+        Diccionario canal -> (timestamps, valores)
+
+    Raises:
+        ValueError: si method no es 'minmax' ni 'lttb'
+    """
+    if method not in ('minmax', 'lttb'):
+        raise ValueError(f"Método de reducción desconocido: {method}")
+    timestamps = df['TIMESTAMP'].to_numpy()
+    x = timestamps.astype('datetime64[ns]').astype(np.int64)
+    series = {}
+    for col in df.columns:
+        if col == 'TIMESTAMP':
+            continue
+        y = df[col].to_numpy(dtype=np.float64)
+        if method == 'lttb':
+            idx = lttb_indices(x, y, max_points)
+        else:
+            idx = minmax_indices(x, y, max(1, max_points // 2))
+        series[col] = (timestamps[idx], y[idx])
+    return series
@@ -0,0 +1,151 @@
+"""
+FetchCache - Caché por canal de las páginas de rating con validadores HTTP y TTL
+"""
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+import hashlib
+import threading
+import time
+
+from metrics import METRICS
+
+
+@dataclass
+class CacheEntry:
+    """Última lectura válida de un canal"""
+    rating: float
+    fetched_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+
+def content_hash(body: bytes) -> str:
+    """
+    Huella del cuerpo de una respuesta
+
+    Args:
+        body: Cuerpo ya descomprimido
+
+    Returns:
+        Digest hexadecimal (blake2b de 16 bytes)
+    """
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+class FetchCache:
+    """
+    Caché de lecturas por slug compartida por los backends del scraper
+
+    Tres niveles, del más barato al más caro:
+        - fresh: la entrada tiene menos de ttl segundos y se usa sin red
+          (varios consumidores del mismo scraper comparten una lectura)
+        - not_modified: el servidor respondió 304 a If-None-Match /
+          If-Modified-Since y no se transfirió ni parseó la página
+        - same_content: respuesta 200 con el mismo hash que la anterior;
+          se evita parsear el HTML
+    Todo lo demás cuenta como miss. Las lecturas fallidas (None) nunca se
+    guardan, así que un canal caído se vuelve a consultar en el ciclo siguiente.
+    """
+
+    RESULTS = ('fresh', 'not_modified', 'same_content', 'miss')
+
+    def __init__(self, ttl: float = 0.0, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            ttl: Segundos durante los que una lectura se reutiliza sin consultar
+                (0 = siempre se consulta, con request condicional si se puede)
+            clock: Reloj monotónico (inyectable para pruebas)
+        """
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: Dict[str, CacheEntry] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {result: 0 for result in self.RESULTS}
+
+    def get(self, slug: str) -> Optional[CacheEntry]:
+        """Entrada vigente o vencida de un slug (None si nunca se leyó)"""
+        with self._lock:
+            return self._entries.get(slug)
+
+    def fresh(self, slug: str) -> Optional[CacheEntry]:
+        """
+        Entrada del slug si todavía está dentro del TTL
+
+        Args:
+            slug: Slug del canal
+
+        Returns:
+            Entrada reutilizable sin consultar, o None
+        """
+        if self.ttl <= 0:
+            return None
+        entry = self.get(slug)
+        if entry is not None and self.clock() - entry.fetched_at < self.ttl:
+            return entry
+        return None
+
+    def conditional_headers(self, slug: str) -> Dict[str, str]:
+        """
+        Headers de validación para la próxima consulta del slug
+
+        Args:
+            slug: Slug del canal
+
+        Returns:
+            If-None-Match y/o If-Modified-Since según lo que envió el servidor
+        """
+        entry = self.get(slug)
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, slug: str, rating: Optional[float], etag: Optional[str] = None,
+              last_modified: Optional[str] = None, body_hash: Optional[str] = None) -> bool:
+        """
+        Guarda una lectura nueva
+
+        Args:
+            slug: Slug del canal
+            rating: Rating leído (None no se guarda)
+            etag: Header ETag de la respuesta
+            last_modified: Header Last-Modified de la respuesta
+            body_hash: Hash del cuerpo (ver content_hash)
+
+        Returns:
+            True si el rating cambió respecto de la lectura anterior
+        """
+        with self._lock:
+            previous = self._entries.get(slug)
+            if rating is None:
+                return True
+            self._entries[slug] = CacheEntry(rating, self.clock(), etag, last_modified, body_hash)
+        return previous is None or previous.rating != rating
+
+    def touch(self, slug: str):
+        """Renueva el TTL de una entrada que el servidor confirmó como vigente"""
+        with self._lock:
+            entry = self._entries.get(slug)
+            if entry is not None:
+                entry.fetched_at = self.clock()
+
+    def record(self, result: str):
+        """Cuenta el resultado de una búsqueda (ver RESULTS)"""
+        with self._lock:
+            self.stats[result] += 1
+        METRICS.inc('ratings_fetch_cache_total', result=result)
+
+    @property
+    def hit_rate(self) -> float:
+        """Fracción de lecturas que no requirieron parsear una página nueva"""
+        total = sum(self.stats.values())
+        return (total - self.stats['miss']) / total if total else 0.0
+
+    def clear(self):
+        """Descarta todas las entradas (las estadísticas se conservan)"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,356 @@
+"""
+HttpRatingFetcher - Obtiene ratings con un cliente HTTP liviano (sin navegador)
+"""
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+import http.client
+import gzip
+import json
+import logging
+import queue
+import threading
+import time
+
+from deadline import STATUS_ERROR, STATUS_MISSING, STATUS_OK, STATUS_TIMEOUT, is_timeout
+from fetch_cache import FetchCache, content_hash
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+RATING_ELEMENT_ID = "channel_rating"
+
+# Elementos HTML sin etiqueta de cierre
+_VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+    'link', 'meta', 'source', 'track', 'wbr'
+}
+
+
+class _RatingElementParser(HTMLParser):
+    """Extrae el texto del elemento con id="channel_rating" """
+
+    def __init__(self, element_id: str = RATING_ELEMENT_ID):
+        super().__init__(convert_charrefs=True)
+        self.element_id = element_id
+        self.depth = 0
+        self.found = False
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.depth:
+            if tag not in _VOID_ELEMENTS:
+                self.depth += 1
+        elif not self.found and dict(attrs).get('id') == self.element_id:
+            self.found = True
+            if tag not in _VOID_ELEMENTS:
+                self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth and tag not in _VOID_ELEMENTS:
+            self.depth -= 1
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+
+def extract_rating_text(html: str) -> Optional[str]:
+    """
+    Obtiene el texto de #channel_rating desde el HTML de la página
+
+    Args:
+        html: HTML de la página de rating
+
+    Returns:
+        Texto del elemento, o None si el elemento no existe
+    """
+    parser = _RatingElementParser()
+    parser.feed(html)
+    parser.close()
+    if not parser.found:
+        return None
+    return ''.join(parser.parts).strip()
+
+
+def extract_rating(html: str) -> Optional[float]:
+    """
+    Obtiene el rating desde el HTML de la página (misma regla que el scraper)
+
+    Args:
+        html: HTML de la página de rating
+
+    Returns:
+        Rating como float, o None si no está en el HTML del servidor
+    """
+    rating_text = extract_rating_text(html)
+    if not rating_text:
+        return None
+    try:
+        return float(rating_text)
+    except ValueError:
+        return None
+
+
+class HttpRatingFetcher:
+    """Cliente HTTP con conexiones keep-alive reutilizables para las páginas de rating"""
+
+    def __init__(self, base_url: str, timeout: float = 10.0, pool_size: int = 6,
+                 data_url_template: Optional[str] = None, json_field: str = "rating",
+                 cache: Optional[FetchCache] = None):
+        """
+        Inicializa el cliente
+
+        Args:
+            base_url: URL base de las páginas de rating (sin el slug)
+            timeout: Timeout por request en segundos
+            pool_size: Máximo de conexiones abiertas (y requests en paralelo)
+            data_url_template: URL opcional de un endpoint JSON con '{slug}'; si se
+                define se consulta antes que el HTML
+            json_field: Campo del JSON que contiene el rating
+            cache: Caché de lecturas; si se indica, las páginas se piden con
+                requests condicionales y no se parsean si no cambiaron
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.data_url_template = data_url_template
+        self.json_field = json_field
+        self.cache = cache
+        self._pools: Dict[str, queue.LifoQueue] = {}
+        self._pools_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Segundos que tardó cada slug en el último fetch_many() y estado de su lectura
+        self.last_timings: Dict[str, float] = {}
+        self.last_status: Dict[str, str] = {}
+
+    def _pool_for(self, origin: str) -> queue.LifoQueue:
+        """Devuelve el pool de conexiones para un origen (scheme://host:port)"""
+        with self._pools_lock:
+            if origin not in self._pools:
+                self._pools[origin] = queue.LifoQueue()
+            return self._pools[origin]
+
+    def _new_connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        """Crea una conexión nueva según el esquema"""
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    @staticmethod
+    def _set_timeout(conn: http.client.HTTPConnection, timeout: float):
+        """Ajusta el timeout de una conexión (también el del socket si ya está abierto)"""
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None) -> http.client.HTTPResponse:
+        """
+        Hace un GET reutilizando una conexión del pool
+
+        El cuerpo ya viene leído (y descomprimido) en el atributo ``body``.
+
+        Args:
+            url: URL absoluta
+            headers: Headers adicionales
+            timeout: Timeout de este request en segundos (por defecto self.timeout)
+
+        Returns:
+            Respuesta HTTP con el atributo body
+        """
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        pool = self._pool_for(f"{parts.scheme}://{parts.netloc}")
+        request_headers = {
+            'User-Agent': 'Mozilla/5.0 (rating-scraper)',
+            'Accept-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        }
+        request_headers.update(headers or {})
+
+        # Un segundo intento cubre conexiones keep-alive que el servidor cerró
+        for attempt in range(2):
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                conn = self._new_connection(parts.scheme, parts.netloc)
+            self._set_timeout(conn, timeout if timeout is not None else self.timeout)
+            try:
+                conn.request('GET', path, headers=request_headers)
+                response = conn.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, ConnectionError, OSError) as e:
+                conn.close()
+                # Un timeout no es una conexión vencida: reintentarlo duplicaría la espera
+                if attempt or is_timeout(e):
+                    raise
+                continue
+
+            if response.getheader('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            response.body = body
+
+            if response.will_close or pool.qsize() >= self.pool_size:
+                conn.close()
+            else:
+                pool.put(conn)
+            return response
+
+    def fetch_html(self, channel_slug: str, timeout: Optional[float] = None) -> Optional[str]:
+        """
+        Descarga el HTML de la página de un canal
+
+        Args:
+            channel_slug: Slug del canal
+            timeout: Timeout del request en segundos (por defecto self.timeout)
+
+        Returns:
+            HTML como string, o None si la respuesta no es 200
+        """
+        response = self.get(f"{self.base_url}/{channel_slug}", timeout=timeout)
+        if response.status != 200:
+            logger.warning(f"HTTP {response.status} al obtener {channel_slug}")
+            return None
+        charset = response.headers.get_content_charset() or 'utf-8'
+        return response.body.decode(charset, errors='replace')
+
+    def _fetch_page_rating(self, channel_slug: str,
+                           timeout: Optional[float] = None) -> Optional[float]:
+        """
+        Obtiene el rating de la página HTML validando contra la caché
+
+        Con una lectura previa se envían If-None-Match / If-Modified-Since; un
+        304 o un cuerpo con el mismo hash reutilizan el rating anterior sin
+        parsear el HTML.
+        """
+        entry = self.cache.get(channel_slug)
+        response = self.get(f"{self.base_url}/{channel_slug}",
+                            headers=self.cache.conditional_headers(channel_slug), timeout=timeout)
+        if response.status == 304 and entry is not None:
+            self.cache.touch(channel_slug)
+            self.cache.record('not_modified')
+            return entry.rating
+        if response.status != 200:
+            logger.warning(f"HTTP {response.status} al obtener {channel_slug}")
+            return None
+
+        body_hash = content_hash(response.body)
+        if entry is not None and entry.content_hash == body_hash:
+            self.cache.touch(channel_slug)
+            self.cache.record('same_content')
+            return entry.rating
+
+        charset = response.headers.get_content_charset() or 'utf-8'
+        rating = extract_rating(response.body.decode(charset, errors='replace'))
+        self.cache.record('miss')
+        if rating is None:
+            logger.info(f"El HTML de {channel_slug} no trae el rating renderizado")
+        self.cache.store(channel_slug, rating, etag=response.getheader('ETag'),
+                         last_modified=response.getheader('Last-Modified'), body_hash=body_hash)
+        return rating
+
+    def _fetch_from_endpoint(self, channel_slug: str,
+                             timeout: Optional[float] = None) -> Optional[float]:
+        """Consulta el endpoint JSON configurado"""
+        response = self.get(self.data_url_template.format(slug=channel_slug),
+                            headers={'Accept': 'application/json'}, timeout=timeout)
+        if response.status != 200:
+            return None
+        value = json.loads(response.body).get(self.json_field)
+        return float(value) if value is not None else None
+
+    def _fetch(self, channel_slug: str, timeout: Optional[float]) -> Optional[float]:
+        """Endpoint JSON (si hay), luego la página HTML; las excepciones se propagan"""
+        if self.data_url_template:
+            rating = self._fetch_from_endpoint(channel_slug, timeout)
+            if rating is not None:
+                return rating
+
+        if self.cache is not None:
+            return self._fetch_page_rating(channel_slug, timeout)
+
+        html = self.fetch_html(channel_slug, timeout)
+        if html is None:
+            return None
+        rating = extract_rating(html)
+        if rating is None:
+            logger.info(f"El HTML de {channel_slug} no trae el rating renderizado")
+        return rating
+
+    def fetch_rating_status(self, channel_slug: str,
+                            timeout: Optional[float] = None) -> Tuple[Optional[float], str]:
+        """
+        Obtiene el rating de un canal junto con el estado de la lectura
+
+        Args:
+            channel_slug: Slug del canal (ej: 'mega', 'chv')
+            timeout: Timeout del intento en segundos (por defecto self.timeout)
+
+        Returns:
+            Tupla (rating o None, estado): 'ok', 'missing' si la página
+            respondió sin rating, 'timeout' o 'error' (ver deadline.STATUSES)
+        """
+        try:
+            rating = self._fetch(channel_slug, timeout)
+            return rating, STATUS_OK if rating is not None else STATUS_MISSING
+        except Exception as e:
+            status = STATUS_TIMEOUT if is_timeout(e) else STATUS_ERROR
+            logger.warning(f"Error HTTP al obtener rating de {channel_slug} ({status}): {str(e)}")
+            METRICS.inc('ratings_fetch_errors_total', channel=channel_slug, backend='http')
+            return None, status
+
+    def fetch_rating(self, channel_slug: str) -> Optional[float]:
+        """
+        Obtiene el rating de un canal sin navegador
+
+        Args:
+            channel_slug: Slug del canal (ej: 'mega', 'chv')
+
+        Returns:
+            Rating como float, o None si no se pudo obtener por HTTP
+        """
+        return self.fetch_rating_status(channel_slug)[0]
+
+    def _timed_fetch(self, channel_slug: str) -> Tuple[Optional[float], str, float]:
+        """Obtiene un rating, el estado de la lectura y los segundos que tomó"""
+        start = time.perf_counter()
+        with METRICS.span('http_fetch', channel=channel_slug):
+            rating, status = self.fetch_rating_status(channel_slug)
+        return rating, status, time.perf_counter() - start
+
+    def fetch_many(self, channel_slugs: Iterable[str]) -> Dict[str, Optional[float]]:
+        """
+        Obtiene varios canales en paralelo (hasta pool_size a la vez)
+
+        Args:
+            channel_slugs: Slugs a consultar
+
+        Returns:
+            Diccionario slug -> rating
+        """
+        slugs = list(channel_slugs)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size,
+                                                thread_name_prefix="http-fetcher")
+        results = list(self._executor.map(self._timed_fetch, slugs))
+        self.last_timings = {slug: elapsed for slug, (_, _, elapsed) in zip(slugs, results)}
+        self.last_status = {slug: status for slug, (_, status, _) in zip(slugs, results)}
+        return {slug: rating for slug, (rating, _, _) in zip(slugs, results)}
+
+    def close(self):
+        """Cierra las conexiones abiertas y el pool de threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._pools_lock:
+            for pool in self._pools.values():
+                while True:
+                    try:
+                        pool.get_nowait().close()
+                    except queue.Empty:
+                        break
+            self._pools.clear()
@@ -0,0 +1,342 @@
+"""
+LatestRing - Últimas lecturas compartidas entre el Orchestrator y el dashboard
+en un ring buffer mapeado en memoria
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+
+from lazy_imports import lazy_import
+
+# Solo el lector arma DataFrames; el Orchestrator no carga pandas por publicar
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'RTRING1\0'
+# magic, capacidad, canales, bytes por slot, secuencia de la última muestra publicada
+HEADER = struct.Struct('<8sIIIQ')
+# Nombre de cada canal, ASCII con relleno de ceros
+NAME_SIZE = 16
+# Secuencia y timestamp (segundos desde 1970, hora local sin zona) al inicio de cada slot
+SLOT_HEAD = struct.Struct('<Qd')
+SEQUENCE_OFFSET = HEADER.size - 8
+EPOCH = datetime(1970, 1, 1)
+# Los float32 se redondean al leer para que 5.3 no se muestre como 5.300000190734863
+DECIMALS = 4
+
+# Una muestra leída: (secuencia, timestamp, {canal: rating o None})
+Sample = Tuple[int, datetime, Dict[str, Optional[float]]]
+
+
+def ring_path_for(location: str) -> str:
+    """
+    Archivo del ring asociado a un almacenamiento
+
+    Args:
+        location: Ubicación del RatingStore (store.location)
+
+    Returns:
+        Ruta <ubicación>.ring
+    """
+    return f"{location}.ring"
+
+
+def _layout(capacity: int, channels: int) -> Tuple[int, int]:
+    """
+    Desplazamiento del primer slot y tamaño de cada slot (alineados a 8 bytes)
+
+    Returns:
+        Tupla (offset de los slots, bytes por slot)
+    """
+    names_end = HEADER.size + NAME_SIZE * channels
+    slots_offset = (names_end + 7) // 8 * 8
+    slot_size = (SLOT_HEAD.size + 4 * channels + 7) // 8 * 8
+    return slots_offset, slot_size
+
+
+def _read_header(buffer) -> Optional[Tuple[int, List[str], int, int]]:
+    """
+    Cabecera de un ring
+
+    Returns:
+        Tupla (capacidad, canales, bytes por slot, secuencia) o None si el
+        buffer no es un ring válido
+    """
+    if len(buffer) < HEADER.size:
+        return None
+    magic, capacity, channels, slot_size, sequence = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or capacity == 0:
+        return None
+    slots_offset, expected_size = _layout(capacity, channels)
+    if slot_size != expected_size or len(buffer) < slots_offset + capacity * slot_size:
+        return None
+    names_at = HEADER.size
+    names = [bytes(buffer[names_at + i * NAME_SIZE:names_at + (i + 1) * NAME_SIZE])
+             .rstrip(b'\0').decode('ascii') for i in range(channels)]
+    return capacity, names, slot_size, sequence
+
+
+class RingPublisher:
+    """
+    Lado del escritor: publica cada muestra en un archivo de tamaño fijo
+
+    El archivo tiene una cabecera (capacidad, canales y secuencia de la
+    última muestra) y `capacity` slots con secuencia, timestamp y un float32
+    por canal (NaN = sin lectura). Cada muestra ocupa el slot
+    secuencia % capacity y se escribe como un seqlock: el slot se marca en
+    curso (secuencia 0), se escriben los valores, se anota su secuencia y
+    recién entonces se avanza la de la cabecera. Un lector que copia el slot
+    y encuentra la misma secuencia antes y después sabe que no lo leyó a
+    medio escribir.
+
+    Si aparece un canal nuevo, el ring se recrea con el catálogo ampliado
+    (archivo temporal + rename); los lectores lo detectan y lo vuelven a
+    mapear.
+    """
+
+    def __init__(self, path: str, capacity: int = 256):
+        """
+        Args:
+            path: Archivo del ring (ver ring_path_for)
+            capacity: Muestras que se conservan antes de sobrescribir las más viejas
+        """
+        self.path = path
+        self.capacity = capacity
+        self.channels: List[str] = []
+        self.sequence = 0
+        self._index: Dict[str, int] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        self._slots_offset = 0
+        self._slot_size = 0
+        self._lock = threading.Lock()
+        self._open_existing()
+
+    def _open_existing(self):
+        """Retoma un ring existente con la misma capacidad (la secuencia continúa)"""
+        try:
+            with open(self.path, 'r+b') as f:
+                mapped = mmap.mmap(f.fileno(), 0)
+        except (OSError, ValueError):
+            return
+        header = _read_header(mapped)
+        if header is None or header[0] != self.capacity:
+            mapped.close()
+            if header is not None:
+                self.sequence = header[3]
+            return
+        _, self.channels, self._slot_size, self.sequence = header
+        self._slots_offset = _layout(self.capacity, len(self.channels))[0]
+        self._index = {channel: i for i, channel in enumerate(self.channels)}
+        self._mmap = mapped
+
+    def _create(self, channels: Sequence[str]):
+        """Crea un ring vacío para el catálogo indicado y lo reemplaza de forma atómica"""
+        slots_offset, slot_size = _layout(self.capacity, len(channels))
+        size = slots_offset + self.capacity * slot_size
+        buffer = bytearray(size)
+        # La secuencia continúa: los lectores no confunden el ring nuevo con uno sin muestras
+        HEADER.pack_into(buffer, 0, MAGIC, self.capacity, len(channels), slot_size, self.sequence)
+        for i, channel in enumerate(channels):
+            name = channel.encode('ascii')
+            if len(name) > NAME_SIZE:
+                raise ValueError(f"Nombre de canal demasiado largo para el ring: {channel}")
+            buffer[HEADER.size + i * NAME_SIZE:HEADER.size + i * NAME_SIZE + len(name)] = name
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer)
+        os.replace(tmp_path, self.path)
+        if self._mmap is not None:
+            self._mmap.close()
+        with open(self.path, 'r+b') as f:
+            self._mmap = mmap.mmap(f.fileno(), size)
+        self.channels = list(channels)
+        self._index = {channel: i for i, channel in enumerate(self.channels)}
+        self._slots_offset, self._slot_size = slots_offset, slot_size
+        logger.info(f"Ring de últimas lecturas creado en {self.path} "
+                    f"({self.capacity} muestras × {len(channels)} canales, {size:,} bytes)")
+
+    def publish(self, row: Dict[str, Optional[float]]):
+        """
+        Publica una muestra
+
+        Args:
+            row: Fila transformada (TIMESTAMP y un rating o None por canal)
+        """
+        with self._lock:
+            try:
+                new_channels = [ch for ch in row if ch != 'TIMESTAMP' and ch not in self._index]
+                if self._mmap is None or new_channels:
+                    self._create(self.channels + new_channels)
+
+                sequence = self.sequence + 1
+                offset = self._slots_offset + (sequence % self.capacity) * self._slot_size
+                values = [math.nan] * len(self.channels)
+                for channel, rating in row.items():
+                    if channel != 'TIMESTAMP' and rating is not None:
+                        values[self._index[channel]] = rating
+                timestamp = (datetime.fromisoformat(str(row['TIMESTAMP'])) - EPOCH).total_seconds()
+
+                mapped = self._mmap
+                SLOT_HEAD.pack_into(mapped, offset, 0, timestamp)
+                struct.pack_into(f'<{len(values)}f', mapped, offset + SLOT_HEAD.size, *values)
+                struct.pack_into('<Q', mapped, offset, sequence)
+                struct.pack_into('<Q', mapped, SEQUENCE_OFFSET, sequence)
+                self.sequence = sequence
+                # msync: además deja el mtime al día para quien vigila el archivo (ChangeWatcher)
+                mapped.flush()
+            except (OSError, ValueError) as e:
+                # El ring es opcional: la fila igual se guarda en el almacenamiento
+                logger.warning(f"No se pudo publicar en el ring {self.path}: {str(e)}")
+
+    def close(self):
+        """Libera el mapeo (el archivo queda para los lectores)"""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+
+class RingReader:
+    """
+    Lado del lector: últimas muestras del ring sin parsear archivos
+
+    Mapea el archivo en solo lectura y copia únicamente los slots pedidos.
+    Un stat por lectura detecta si el escritor recreó el ring (canal nuevo)
+    para volver a mapearlo.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Archivo del ring (ver ring_path_for)
+        """
+        self.path = path
+        self._mmap: Optional[mmap.mmap] = None
+        self._inode: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _mapped(self) -> Optional[mmap.mmap]:
+        """Mapeo vigente del archivo, rehecho si el escritor lo reemplazó"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        inode = (stat.st_ino, stat.st_size)
+        if self._mmap is None or inode != self._inode:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            try:
+                with open(self.path, 'rb') as f:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return None
+            self._inode = inode
+        return self._mmap
+
+    def exists(self) -> bool:
+        """True si hay un ring con al menos una muestra"""
+        return self.sequence() > 0
+
+    def sequence(self) -> int:
+        """Secuencia de la última muestra publicada (0 si no hay ring)"""
+        with self._lock:
+            mapped = self._mapped()
+            if mapped is None or len(mapped) < HEADER.size or mapped[:8] != MAGIC:
+                return 0
+            return struct.unpack_from('<Q', mapped, SEQUENCE_OFFSET)[0]
+
+    def _snapshot(self, count: int) -> Tuple[List[str], List[int], List[float], bytes]:
+        """
+        Copia consistente de las últimas `count` muestras
+
+        Se omiten los slots cuya secuencia no es la esperada: los que el
+        escritor está sobrescribiendo mientras se copian (solo puede pasar con
+        el más viejo) y los que quedaron vacíos al recrearse el ring.
+
+        Returns:
+            Tupla (canales, secuencias, timestamps en segundos, bytes con los
+            float32 de cada slot uno tras otro), de la más vieja a la más nueva
+        """
+        mapped = self._mapped()
+        header = _read_header(mapped) if mapped is not None else None
+        if header is None:
+            return [], [], [], b''
+        capacity, channels, slot_size, last = header
+        slots_offset = _layout(capacity, len(channels))[0]
+        sequences, timestamps, values = [], [], []
+        for sequence in range(max(1, last - min(count, capacity) + 1), last + 1):
+            offset = slots_offset + (sequence % capacity) * slot_size
+            slot_sequence, timestamp = SLOT_HEAD.unpack_from(mapped, offset)
+            start = offset + SLOT_HEAD.size
+            data = mapped[start:start + 4 * len(channels)]
+            # Releída después de copiar: si cambió, el escritor pasó por el slot
+            if slot_sequence != sequence or struct.unpack_from('<Q', mapped, offset)[0] != sequence:
+                continue
+            sequences.append(sequence)
+            timestamps.append(timestamp)
+            values.append(data)
+        return channels, sequences, timestamps, b''.join(values)
+
+    def latest(self, count: int = 2) -> List[Sample]:
+        """
+        Últimas muestras publicadas
+
+        Args:
+            count: Muestras a devolver (como máximo la capacidad del ring)
+
+        Returns:
+            Lista de (secuencia, timestamp, {canal: rating o None}), de la más
+            vieja a la más nueva
+        """
+        with self._lock:
+            channels, sequences, timestamps, data = self._snapshot(count)
+        width = 4 * len(channels)
+        samples = []
+        for i, (sequence, timestamp) in enumerate(zip(sequences, timestamps)):
+            values = struct.unpack_from(f'<{len(channels)}f', data, i * width)
+            samples.append((sequence, EPOCH + timedelta(seconds=timestamp), {
+                channel: None if math.isnan(value) else round(value, DECIMALS)
+                for channel, value in zip(channels, values)
+            }))
+        return samples
+
+    def latest_frame(self, count: int = 2) -> pd.DataFrame:
+        """
+        Últimas muestras como DataFrame con el formato del historial
+
+        Los valores se toman con numpy.frombuffer sobre la copia de los slots,
+        sin pasar por texto.
+
+        Args:
+            count: Muestras a devolver
+
+        Returns:
+            DataFrame con TIMESTAMP y una columna por canal (NaN = sin lectura);
+            vacío si no hay ring
+        """
+        with self._lock:
+            channels, _, timestamps, data = self._snapshot(count)
+        if not timestamps:
+            return pd.DataFrame()
+        values = np.frombuffer(data, dtype='<f4').reshape(len(timestamps), len(channels))
+        df = pd.DataFrame(values.astype('float64').round(DECIMALS), columns=channels)
+        df.insert(0, 'TIMESTAMP', pd.to_datetime(np.array(timestamps), unit='s').round('us'))
+        return df
+
+    def close(self):
+        """Libera el mapeo"""
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
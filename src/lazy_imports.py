@@ -0,0 +1,65 @@
+"""
+LazyImports - Importación diferida de dependencias pesadas (pandas, numpy, plotly)
+"""
+import importlib
+import importlib.util
+import sys
+import threading
+from types import ModuleType
+
+_load_lock = threading.Lock()
+
+
+class _LazyModule(ModuleType):
+    """
+    Representante de un módulo que se importa en el primer acceso a un atributo
+
+    No usa importlib.util.LazyLoader: en Python 3.11 dos hilos que tocan el
+    módulo a la vez pueden ver su ejecución a medias (gh-114763). Acá la carga
+    es un import normal bajo un lock, y el representante nunca entra en
+    sys.modules.
+    """
+
+    def _load(self) -> ModuleType:
+        """Importa el módulo real una sola vez"""
+        module = self.__dict__.get('_module')
+        if module is None:
+            with _load_lock:
+                module = self.__dict__.get('_module')
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Devuelve un módulo que se carga recién en el primer acceso a un atributo
+
+    Permite escribir ``pd = lazy_import('pandas')`` a nivel de módulo sin
+    pagar el import al cargar el archivo: el scraper y el Orchestrator solo
+    cargan pandas si llegan a leer el historial. Las anotaciones de tipo que
+    mencionan el módulo deben quedar sin evaluar (``from __future__ import
+    annotations``) para no disparar la carga al definir las funciones. Es
+    seguro usarlo desde varios hilos.
+
+    Args:
+        name: Nombre del módulo (ej: 'pandas', 'plotly.graph_objects')
+
+    Returns:
+        El módulo, ya cargado si alguien lo importó antes
+
+    Raises:
+        ModuleNotFoundError: si el módulo no está instalado
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if importlib.util.find_spec(name) is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    return _LazyModule(name)
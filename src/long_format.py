@@ -0,0 +1,191 @@
+"""
+LongFormat - Esquema largo (ts, channel, rating) con tipos compactos y conversión al CSV ancho
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+import math
+import struct
+
+from lazy_imports import lazy_import
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Columnas del formato largo
+LONG_COLUMNS = ['ts', 'channel', 'rating']
+
+# Registro binario de ancho fijo (14 bytes): epoch en µs, código de canal, rating.
+# RECORD_FORMAT empaqueta un registro sin numpy (el camino de escritura del
+# scraper); RECORD_DTYPE es el mismo layout para leer con np.fromfile
+RECORD_FORMAT = struct.Struct('<qHf')
+RECORD_SIZE = RECORD_FORMAT.size
+
+# float32 guarda ~7 dígitos significativos; al volver a float64 se redondea
+# para que 14.4 no aparezca como 14.399999618530273 (los ratings se publican
+# con a lo sumo dos decimales)
+RATING_DECIMALS = 4
+
+# ts es el TIMESTAMP local (sin zona horaria) en microsegundos desde 1970-01-01,
+# la misma resolución que datetime.isoformat() del scraper: la conversión ida y
+# vuelta es exacta (un TIMESTAMP leído del CSV se cruza con el guardado acá) y
+# no depende del huso del equipo
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+
+
+def timestamp_to_epoch_us(timestamp: str) -> int:
+    """
+    Convierte un TIMESTAMP ISO 8601 (como el de transform_ratings) a epoch en µs
+
+    Args:
+        timestamp: Fecha ISO 8601 sin zona horaria
+
+    Returns:
+        Microsegundos desde 1970-01-01 en hora local
+    """
+    return (datetime.fromisoformat(timestamp) - _EPOCH) // _US
+
+
+def rows_to_records(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Convierte filas anchas (TIMESTAMP + una columna por canal) a registros largos
+
+    Args:
+        rows: Filas transformadas
+
+    Returns:
+        Registros {'ts', 'channel', 'rating'}; rating None se conserva como nulo
+    """
+    records = []
+    for row in rows:
+        ts = timestamp_to_epoch_us(row['TIMESTAMP'])
+        for channel, rating in row.items():
+            if channel == 'TIMESTAMP':
+                continue
+            missing = rating is None or math.isnan(float(rating))
+            records.append({'ts': ts, 'channel': channel,
+                            'rating': None if missing else float(rating)})
+    return records
+
+
+def pack_records(records: List[Dict[str, Any]], codes: Dict[str, int]) -> bytes:
+    """
+    Serializa registros largos al formato binario sin cargar numpy
+
+    Args:
+        records: Registros {'ts', 'channel', 'rating'} (ver rows_to_records)
+        codes: Código de cada nombre de canal
+
+    Returns:
+        Bytes con un registro de RECORD_SIZE por elemento; rating None se guarda como NaN
+    """
+    return b''.join(
+        RECORD_FORMAT.pack(r['ts'], codes[r['channel']],
+                           math.nan if r['rating'] is None else r['rating'])
+        for r in records
+    )
+
+
+def compact(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica los tipos compactos del formato largo
+
+    Args:
+        df: DataFrame con ts, channel y rating
+
+    Returns:
+        DataFrame con ts int64, channel category y rating float32 (NaN = nulo)
+    """
+    return df.astype({'ts': np.int64, 'channel': 'category', 'rating': np.float32})
+
+
+def wide_to_long(df: pd.DataFrame, zero_as_null: bool = False) -> pd.DataFrame:
+    """
+    Convierte un historial ancho al formato largo
+
+    Args:
+        df: Historial con TIMESTAMP (str ISO o datetime64) y una columna por canal
+        zero_as_null: Si True, los 0.0 se tratan como lecturas faltantes (así
+            guardaba transform_ratings los canales sin rating)
+
+    Returns:
+        DataFrame largo con tipos compactos, ordenado por ts y canal
+    """
+    timestamps = df['TIMESTAMP']
+    if not pd.api.types.is_datetime64_any_dtype(timestamps):
+        timestamps = pd.to_datetime(timestamps, format='ISO8601')
+    channels = [col for col in df.columns if col != 'TIMESTAMP']
+
+    ts = timestamps.to_numpy(dtype='datetime64[us]').astype(np.int64)
+    values = df[channels].to_numpy(dtype=np.float32)
+    if zero_as_null:
+        values = np.where(values == 0, np.nan, values).astype(np.float32)
+
+    # Formato largo fila por fila: cada timestamp repetido una vez por canal
+    long = pd.DataFrame({
+        'ts': np.repeat(ts, len(channels)),
+        'channel': pd.Categorical.from_codes(
+            np.tile(np.arange(len(channels)), len(ts)), categories=channels
+        ),
+        'rating': values.reshape(-1),
+    })
+    return long
+
+
+def long_to_wide(long: pd.DataFrame, channels: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Convierte el formato largo al historial ancho que usa el dashboard
+
+    Args:
+        long: DataFrame con ts, channel y rating
+        channels: Orden de columnas deseado (por defecto el de las categorías)
+
+    Returns:
+        DataFrame con TIMESTAMP datetime64 y una columna float por canal
+    """
+    if long.empty:
+        return pd.DataFrame(columns=['TIMESTAMP'] + list(channels or []))
+    channel = long['channel']
+    if not isinstance(channel.dtype, pd.CategoricalDtype):
+        channel = channel.astype('category')
+    categories = [str(c) for c in channel.cat.categories]
+    channels = list(channels) if channels is not None else categories
+
+    # Matriz timestamps x canales; ante duplicados gana el último registro
+    ts_values, ts_index = np.unique(long['ts'].to_numpy(dtype=np.int64), return_inverse=True)
+    matrix = np.full((len(ts_values), len(categories)), np.nan)
+    codes = channel.cat.codes.to_numpy()
+    valid = codes >= 0
+    matrix[ts_index[valid], codes[valid]] = np.round(
+        long['rating'].to_numpy(dtype=np.float64)[valid], RATING_DECIMALS
+    )
+
+    wide = pd.DataFrame(matrix, columns=categories).reindex(columns=channels)
+    wide.insert(0, 'TIMESTAMP', pd.to_datetime(ts_values, unit='us'))
+    return wide
+
+
+def write_wide_csv(wide: pd.DataFrame, filepath: str):
+    """
+    Escribe un historial ancho con el formato de ratings_data.csv
+
+    Args:
+        wide: DataFrame con TIMESTAMP datetime64 y una columna por canal
+        filepath: CSV destino
+    """
+    timestamps = wide['TIMESTAMP']
+    # Igual que datetime.isoformat(): sin fracción si todos los instantes son exactos
+    has_fraction = (timestamps.dt.microsecond != 0).any()
+    date_format = '%Y-%m-%dT%H:%M:%S.%f' if has_fraction else '%Y-%m-%dT%H:%M:%S'
+    wide.to_csv(filepath, index=False, date_format=date_format)
+
+
+def __getattr__(name: str):
+    """RECORD_DTYPE se construye al primer uso para no cargar numpy al escribir"""
+    if name == 'RECORD_DTYPE':
+        dtype = np.dtype([('ts', '<i8'), ('channel', '<u2'), ('rating', '<f4')])
+        globals()['RECORD_DTYPE'] = dtype
+        return dtype
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
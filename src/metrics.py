@@ -0,0 +1,239 @@
+"""
+Metrics - Spans de tiempo, contadores y endpoint Prometheus del pipeline de scraping
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+import bisect
+import json
+import logging
+import threading
+import time
+
+if TYPE_CHECKING:
+    from metrics_http import MetricsServer
+
+logger = logging.getLogger(__name__)
+
+# Límites (segundos) de los buckets del histograma de duración de etapas
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    """Normaliza etiquetas a una tupla ordenada e inmutable"""
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Dict[str, str]] = None) -> str:
+    """Formatea etiquetas como {k="v",...} en el formato de texto de Prometheus"""
+    items = list(key) + sorted((extra or {}).items())
+    if not items:
+        return ''
+    escaped = (k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in items)
+    return '{' + ','.join(escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    Contadores, gauges e histogramas en memoria, seguros entre hilos
+
+    Los spans se registran en el histograma ratings_stage_seconds con la
+    etiqueta stage; si hay una ejecución abierta (begin_run) además se
+    acumulan para el log JSON de esa ejecución.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: Límites superiores de los buckets de duración
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        # nombre -> etiquetas -> [conteos por bucket..., conteo sobre el último límite,
+        # suma, cantidad]
+        self._histograms: Dict[str, Dict[LabelKey, List[float]]] = {}
+        self._help: Dict[str, str] = {}
+        self._run_spans: Optional[List[Dict[str, Any]]] = None
+
+    def describe(self, name: str, help_text: str):
+        """Texto de ayuda (# HELP) de una métrica"""
+        self._help[name] = help_text
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        """
+        Incrementa un contador
+
+        Args:
+            name: Nombre de la métrica (ej: ratings_channel_results_total)
+            value: Incremento
+            **labels: Etiquetas de la serie
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels):
+        """Fija el valor actual de un gauge"""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        """
+        Registra una observación en un histograma
+
+        Args:
+            name: Nombre de la métrica
+            value: Valor observado (segundos)
+            **labels: Etiquetas de la serie
+        """
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                # bisect_left devuelve len(buckets) para valores sobre el último
+                # límite: ese slot es el de +Inf, separado de la suma
+                state = series[key] = [0.0] * (len(self.buckets) + 3)
+            state[bisect.bisect_left(self.buckets, value)] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def span(self, stage: str, **labels) -> Iterator[None]:
+        """
+        Mide la duración de una etapa (se registra aunque la etapa falle)
+
+        Args:
+            stage: Nombre de la etapa (ej: 'goto', 'csv_append')
+            **labels: Etiquetas adicionales (ej: channel='mega')
+        """
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe('ratings_stage_seconds', elapsed, stage=stage, **labels)
+            with self._lock:
+                if self._run_spans is not None:
+                    entry = {'stage': stage, 'seconds': round(elapsed, 6), **labels}
+                    if error:
+                        entry['error'] = error
+                    self._run_spans.append(entry)
+
+    def begin_run(self):
+        """Empieza a acumular los spans de una ejecución para el log JSON"""
+        with self._lock:
+            self._run_spans = []
+
+    def end_run(self) -> List[Dict[str, Any]]:
+        """
+        Termina la ejecución en curso
+
+        Returns:
+            Spans registrados desde begin_run
+        """
+        with self._lock:
+            spans, self._run_spans = self._run_spans or [], None
+        return spans
+
+    def render_prometheus(self) -> str:
+        """
+        Exporta todas las métricas en el formato de texto de Prometheus
+
+        Returns:
+            Texto listo para servir en /metrics
+        """
+        lines = []
+        with self._lock:
+            for kind, metrics in (('counter', self._counters), ('gauge', self._gauges)):
+                for name, series in sorted(metrics.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {name} {self._help[name]}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(key)} {float(value)!r}")
+
+            for name, series in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, state in sorted(series.items()):
+                    cumulative = 0.0
+                    for bound, count in zip(self.buckets, state):
+                        cumulative += count
+                        labels = _format_labels(key, {'le': f'{bound:g}'})
+                        lines.append(f"{name}_bucket{labels} {int(cumulative)}")
+                    labels = _format_labels(key, {'le': '+Inf'})
+                    lines.append(f"{name}_bucket{labels} {int(state[-1])}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {state[-2]:.6f}")
+                    lines.append(f"{name}_count{_format_labels(key)} {int(state[-1])}")
+        return '\n'.join(lines) + '\n'
+
+
+# Registro global usado por el scraper, el transformer y el orquestador
+METRICS = MetricsRegistry()
+METRICS.describe('ratings_stage_seconds', 'Duración de cada etapa del pipeline')
+METRICS.describe('ratings_channel_results_total', 'Lecturas por canal y resultado (ok/none)')
+METRICS.describe('ratings_fetch_errors_total', 'Excepciones al obtener el rating de un canal')
+METRICS.describe('ratings_cycles_total', 'Ciclos de scraping por resultado (ok/error)')
+METRICS.describe('ratings_last_value', 'Último rating leído por canal')
+METRICS.describe('ratings_last_cycle_timestamp_seconds', 'Epoch del último ciclo completado')
+METRICS.describe('ratings_fetch_cache_total',
+                 'Lecturas por resultado de la caché (fresh/not_modified/same_content/miss)')
+
+
+def start_metrics_server(port: int = 9108, host: str = '127.0.0.1',
+                         registry: MetricsRegistry = METRICS) -> 'MetricsServer':
+    """
+    Inicia el endpoint /metrics en un hilo de fondo
+
+    Args:
+        port: Puerto local (0 para uno libre)
+        host: Interfaz donde escuchar
+        registry: Registro a exportar
+
+    Returns:
+        Servidor iniciado (llamar shutdown() para detenerlo)
+    """
+    # http.server se carga solo si se pide el endpoint
+    from metrics_http import MetricsServer
+
+    server = MetricsServer((host, port), registry)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Métricas disponibles en {server.url}")
+    return server
+
+
+class RunLog:
+    """Log JSON lines con una entrada por ciclo de scraping"""
+
+    def __init__(self, filepath: str):
+        """
+        Args:
+            filepath: Archivo .jsonl donde se agregan las entradas
+        """
+        self.filepath = filepath
+        self._lock = threading.Lock()
+
+    def write(self, entry: Dict[str, Any]):
+        """
+        Agrega una entrada al log
+
+        Args:
+            entry: Datos del ciclo (se agrega 'logged_at' si falta)
+        """
+        entry.setdefault('logged_at', datetime.now().isoformat())
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            with open(self.filepath, 'a', encoding='utf-8') as f:
+                f.write(line)
@@ -0,0 +1,41 @@
+"""
+MetricsHttp - Servidor HTTP local que expone el registro de métricas en formato Prometheus
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Tuple
+
+from metrics import MetricsRegistry
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Sirve /metrics desde el registro del servidor"""
+
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/metrics', '/'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Los scrapes de Prometheus no deben llenar el log del orquestador
+        pass
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Servidor HTTP local del endpoint /metrics"""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], registry: MetricsRegistry):
+        super().__init__(address, _MetricsHandler)
+        self.registry = registry
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
@@ -1,11 +1,24 @@
 """
 Orchestrator - Clase para coordinar el scraping y almacenamiento de datos
 """
-import time
 import logging
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
+from typing import Any, Dict, Optional
+from adaptive import AdaptivePoller
+from change_feed import ChangeNotifier, notify_path_for
+from channel_registry import load_channels
+from latest_ring import RingPublisher, ring_path_for
+from metrics import METRICS, RunLog, start_metrics_server
 from rating_scraper import RatingScraper
+from rollups import RollupStore
+from scheduler import AlignedScheduler
+from sharded_scraper import ShardedScraper
+from storage import CsvStore, RatingStore
 from transformer import Transformer
+from write_buffer import WriteBehindBuffer
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -14,69 +27,426 @@ logger = logging.getLogger(__name__)
 class Orchestrator:
     """Orquesta el proceso de scraping, transformación y almacenamiento"""
     
-    def __init__(self, csv_filepath: str = "ratings_data.csv", headless: bool = True):
+    def __init__(self, csv_filepath: str = "ratings_data.csv", headless: bool = True,
+                 fsync: bool = False, max_concurrency: int = 1, persistent_browser: bool = False,
+                 max_cycles_per_browser: int = 50, backend: str = "playwright",
+                 base_url: str = None, scraper_options: Optional[Dict[str, Any]] = None,
+                 storage: Optional[RatingStore] = None,
+                 rollups_filepath: Optional[str] = None,
+                 metrics_port: Optional[int] = None, run_log_path: Optional[str] = None,
+                 channels: Optional[Dict[str, str]] = None, workers: int = 1,
+                 write_behind: bool = False, write_behind_options: Optional[Dict[str, Any]] = None,
+                 skip_unchanged: bool = False, ring_capacity: Optional[int] = None,
+                 live_updates: bool = False):
         """
         Inicializa el orquestador
         
         Args:
             csv_filepath: Ruta del archivo CSV donde se guardarán los datos
             headless: Si True, ejecuta el navegador en modo headless
+            fsync: Si True, fuerza cada escritura del CSV a disco
+            max_concurrency: Páginas en paralelo usadas por el scraper (1 = en serie)
+            persistent_browser: Si True, mantiene el navegador abierto entre ciclos
+                y solo recicla el contexto
+            max_cycles_per_browser: Ciclos tras los cuales se relanza el navegador
+                persistente para acotar el uso de memoria
+            backend: Backend de RatingScraper ('playwright', 'http' o 'auto')
+            base_url: URL base alternativa para el scraper
+            scraper_options: Argumentos adicionales para RatingScraper
+                (ej: {'block_resources': True, 'wait_for': 'selector'})
+            storage: Backend de almacenamiento; por defecto CsvStore(csv_filepath)
+            rollups_filepath: Archivo SQLite de agregados que lee el dashboard
+                (None para no mantenerlos). Sobre un historial existente hay que
+                sembrarlos antes con scripts/rebuild_rollups.py
+            metrics_port: Puerto local del endpoint Prometheus /metrics (None para no exponerlo)
+            run_log_path: Archivo JSON lines con los spans de cada ciclo (None para no escribirlo)
+            channels: Catálogo de canales (nombre -> slug); por defecto se lee de
+                channels.json (ver channel_registry) o RatingScraper.CHANNELS
+            workers: Procesos de scraping; con más de uno el catálogo se reparte
+                entre workers con su propio navegador (ver ShardedScraper)
+            write_behind: Si True, las filas se guardan desde un hilo de fondo con
+                journal write-ahead, sin frenar el scraping (ver WriteBehindBuffer).
+                El journal pendiente de una corrida anterior se recupera al crear
+                el orquestador
+            write_behind_options: Argumentos de WriteBehindBuffer
+                (ej: {'batch_size': 20, 'flush_interval': 10})
+            skip_unchanged: Si True, un ciclo en el que ningún canal cambió
+                respecto de su lectura anterior no escribe fila (el historial
+                deja de tener una fila por cada tick de la grilla). Requiere
+                persistent_browser, que conserva la caché del scraper entre ciclos
+            ring_capacity: Muestras del ring en memoria compartida del que el
+                dashboard lee los ratings actuales (<ubicación>.ring, ver
+                latest_ring); None para no publicarlo
+            live_updates: Si True, publica un aviso tras cada escritura
+                (<ubicación>.notify, ver change_feed) para que el dashboard en
+                vivo se actualice sin esperar a revisar el almacenamiento
         """
         self.csv_filepath = csv_filepath
         self.headless = headless
+        self.fsync = fsync
+        self.max_concurrency = max_concurrency
+        self.persistent_browser = persistent_browser
+        self.max_cycles_per_browser = max_cycles_per_browser
+        self.backend = backend
+        self.base_url = base_url
+        self.scraper_options = scraper_options or {}
+        self.channels = (channels if channels is not None
+                         else load_channels(default=RatingScraper.CHANNELS))
+        self.workers = workers
+        self.skip_unchanged = skip_unchanged
         self.scraper = None
+        self.scheduler: Optional[AlignedScheduler] = None
+        self.poller: Optional[AdaptivePoller] = None
+        self._stop_adaptive = threading.Event()
+        self._cycles_on_browser = 0
         self.transformer = Transformer()
+        self.storage = storage or CsvStore(csv_filepath, fsync=fsync)
+        self.rollups = RollupStore(rollups_filepath) if rollups_filepath else None
+        if self.rollups and not self.rollups.seeded() and self.storage.exists():
+            # Sembrarlos exige leer todo el historial con pandas; se hace aparte
+            logger.warning(f"Los agregados de {rollups_filepath} no incluyen el historial previo; "
+                           f"sembrarlos con scripts/rebuild_rollups.py")
+        # Aviso para que el dashboard se actualice apenas hay filas nuevas
+        self.notifier = (ChangeNotifier(notify_path_for(self.storage.location))
+                         if live_updates else None)
+        # Últimas lecturas para el dashboard, sin releer el historial
+        self.ring = (RingPublisher(ring_path_for(self.storage.location), ring_capacity)
+                     if ring_capacity else None)
+        self.writer = WriteBehindBuffer(self.storage, self.rollups, notifier=self.notifier,
+                                        **(write_behind_options or {})) if write_behind else None
+        if self.writer:
+            # Las filas que quedaron en el journal tras un corte se guardan ya,
+            # no recién con la primera fila del próximo ciclo
+            self.writer.start()
+        self.run_log = RunLog(run_log_path) if run_log_path else None
+        self.metrics_server = (start_metrics_server(metrics_port)
+                               if metrics_port is not None else None)
+        
+    def _new_scraper(self):
+        """Crea un RatingScraper (o un ShardedScraper si hay varios workers)"""
+        options = dict(headless=self.headless, max_concurrency=self.max_concurrency,
+                       backend=self.backend, base_url=self.base_url, **self.scraper_options)
+        if self.workers > 1:
+            return ShardedScraper(channels=self.channels, workers=self.workers, **options)
+        return RatingScraper(channels=self.channels, **options)
+
+    def _acquire_scraper(self) -> RatingScraper:
+        """
+        Devuelve el scraper persistente, relanzándolo si está caído o agotado
+
+        Returns:
+            RatingScraper (o ShardedScraper) iniciado y con un contexto limpio
+        """
+        if self.scraper is not None:
+            if not self.scraper.is_healthy():
+                logger.warning("Navegador no saludable, relanzando...")
+                self.close_scraper()
+            elif self._cycles_on_browser >= self.max_cycles_per_browser:
+                logger.info(f"Navegador alcanzó {self._cycles_on_browser} ciclos, relanzando...")
+                self.close_scraper()
+
+        if self.scraper is None:
+            scraper = self._new_scraper()
+            try:
+                scraper.start()
+            except Exception:
+                # start() pudo dejar el driver de Playwright corriendo
+                try:
+                    scraper.close()
+                except Exception as e:
+                    logger.warning(f"Error al cerrar el navegador: {str(e)}")
+                raise
+            self.scraper = scraper
+            self._cycles_on_browser = 0
+        else:
+            self.scraper.recycle_context()
+
+        return self.scraper
+
+    def close_scraper(self):
+        """Cierra el scraper persistente si existe"""
+        if self.scraper is None:
+            return
+        try:
+            self.scraper.close()
+        except Exception as e:
+            logger.warning(f"Error al cerrar el navegador: {str(e)}")
+        finally:
+            self.scraper = None
+            self._cycles_on_browser = 0
+
+    def _is_unchanged(self, scraper) -> bool:
+        """True si se pidió omitir ciclos sin cambios y ningún canal cambió"""
+        if not self.skip_unchanged:
+            return False
+        changed = getattr(scraper, 'last_changed', None)
+        return bool(changed) and not any(changed.values())
+
+    def _process_ratings(self, ratings, timestamp: Optional[str] = None):
+        """Transforma y almacena los ratings de un ciclo"""
+        # 2. Transformación
+        with METRICS.span('transform'):
+            transformed_data = self.transformer.transform_ratings(ratings, timestamp)
+        
+        # Los ratings actuales quedan visibles antes de que termine la escritura
+        if self.ring:
+            with METRICS.span('ring_publish'):
+                self.ring.publish(transformed_data)
+        
+        if self.writer:
+            # 3-4. Almacenamiento y agregados en segundo plano
+            with METRICS.span('write_enqueue'):
+                self.writer.put(transformed_data)
+            logger.info(f"Ciclo completado exitosamente. "
+                        f"Fila encolada para {self.storage.location}")
+            return
+
+        # 3. Almacenamiento
+        with METRICS.span('storage_append', backend=type(self.storage).__name__):
+            self.storage.append([transformed_data])
         
-    def run_single_scrape(self):
-        """Ejecuta un ciclo de scraping completo"""
+        # 4. Agregados (se pueden reconstruir desde el historial si fallan)
+        if self.rollups:
+            try:
+                with METRICS.span('rollups_update'):
+                    self.rollups.update(transformed_data)
+            except Exception as e:
+                logger.error(f"Error al actualizar agregados: {str(e)}")
+        
+        if self.notifier:
+            self.notifier.publish(1, transformed_data['TIMESTAMP'])
+        logger.info(f"Ciclo completado exitosamente. Datos guardados en {self.storage.location}")
+
+    def run_single_scrape(self, scheduled_at: Optional[float] = None):
+        """
+        Ejecuta un ciclo de scraping completo
+        
+        Args:
+            scheduled_at: Instante planificado del ciclo (epoch). Si se indica, se
+                usa como TIMESTAMP para que las muestras queden en la grilla
+        """
         logger.info("=" * 60)
         logger.info("Iniciando ciclo de scraping...")
+        timestamp = datetime.fromtimestamp(scheduled_at).isoformat() if scheduled_at else None
+        cycle_start = time.perf_counter()
+        ratings = None
+        statuses = None
+        error = None
+        METRICS.begin_run()
         
         try:
-            # Usar context manager para manejar el scraper
-            with RatingScraper(headless=self.headless) as scraper:
-                # 1. Scraping
-                ratings = scraper.scrape_all_channels()
-                
-                # 2. Transformación
-                transformed_data = self.transformer.transform_ratings(ratings)
-                
-                # 3. Almacenamiento
-                self.transformer.append_to_csv(transformed_data, self.csv_filepath)
-                
-                logger.info(f"Ciclo completado exitosamente. Datos guardados en {self.csv_filepath}")
+            with METRICS.span('cycle'):
+                if self.persistent_browser:
+                    with METRICS.span('acquire_scraper'):
+                        scraper = self._acquire_scraper()
+                    try:
+                        # 1. Scraping
+                        with METRICS.span('scrape'):
+                            ratings = scraper.scrape_all_channels()
+                        statuses = scraper.last_status
+                    except Exception:
+                        # Forzar un navegador nuevo en el próximo ciclo
+                        self.close_scraper()
+                        raise
+                    self._cycles_on_browser += 1
+                    if self._is_unchanged(scraper):
+                        logger.info("Ningún canal cambió desde la lectura anterior; "
+                                    "no se guarda fila")
+                    else:
+                        self._process_ratings(ratings, timestamp)
+                else:
+                    # Usar context manager para manejar el scraper
+                    with self._new_scraper() as scraper:
+                        # 1. Scraping
+                        with METRICS.span('scrape'):
+                            ratings = scraper.scrape_all_channels()
+                        statuses = scraper.last_status
+                        self._process_ratings(ratings, timestamp)
                 
         except Exception as e:
+            error = str(e)
             logger.error(f"Error durante el ciclo de scraping: {str(e)}")
             raise
+        finally:
+            self._record_cycle(timestamp, ratings, error, time.perf_counter() - cycle_start,
+                               statuses)
+
+    def _record_cycle(self, timestamp: Optional[str],
+                      ratings: Optional[Dict[str, Optional[float]]], error: Optional[str],
+                      duration: float, statuses: Optional[Dict[str, str]] = None):
+        """
+        Actualiza los contadores del ciclo y escribe su entrada en el log JSON
+
+        Los canales sin lectura se guardan como nulos en el historial; el log
+        JSON conserva el estado de cada uno (ok, missing, timeout, error,
+        circuit_open o deadline) para distinguir por qué faltó.
+        """
+        spans = METRICS.end_run()
+        METRICS.inc('ratings_cycles_total', result='error' if error else 'ok')
+        METRICS.set_gauge('ratings_last_cycle_timestamp_seconds', time.time())
+        if not self.run_log:
+            return
+        try:
+            self.run_log.write({
+                'timestamp': timestamp or datetime.now().isoformat(),
+                'result': 'error' if error else 'ok',
+                'error': error,
+                'duration_seconds': round(duration, 6),
+                'ratings': ratings,
+                'status': statuses,
+                'spans': spans,
+            })
+        except Exception as e:
+            logger.warning(f"No se pudo escribir el log de ejecución: {str(e)}")
             
-    def run_continuous(self, interval_minutes: int = 30):
+    def run_continuous(self, interval_minutes: int = 30, align: bool = True,
+                       overlap_policy: str = 'skip'):
         """
         Ejecuta el scraping de forma continua con un intervalo específico
         
         Args:
             interval_minutes: Intervalo en minutos entre cada scraping
+            align: Si True, los ciclos caen en múltiplos del intervalo en hora
+                local (ej: :00 y :30) y llevan ese instante como TIMESTAMP
+            overlap_policy: Qué hacer con ticks que se solapan con un ciclo lento
+                ('skip' o 'queue', ver AlignedScheduler)
         """
-        interval_seconds = interval_minutes * 60
+        self.scheduler = AlignedScheduler(interval_minutes * 60, align=align,
+                                          overlap_policy=overlap_policy)
         
         logger.info(f"Iniciando scraping continuo cada {interval_minutes} minutos...")
-        logger.info(f"Los datos se guardarán en: {Path(self.csv_filepath).absolute()}")
+        logger.info(f"Los datos se guardarán en: {Path(self.storage.location).absolute()}")
         logger.info("Presiona Ctrl+C para detener")
         
         try:
-            while True:
-                self.run_single_scrape()
-                logger.info(f"Esperando {interval_minutes} minutos hasta el próximo scraping...")
-                time.sleep(interval_seconds)
+            self.scheduler.run(lambda scheduled_at: self.run_single_scrape(
+                scheduled_at if align else None
+            ))
                 
         except KeyboardInterrupt:
             logger.info("\nScraping detenido por el usuario")
         except Exception as e:
             logger.error(f"Error fatal: {str(e)}")
             raise
+        finally:
+            stats = self.scheduler.stats
+            logger.info(f"Ciclos: {stats['runs']} | fallos: {stats['failures']} | "
+                        f"omitidos: {stats['skipped']} | "
+                        f"lag promedio: {self.scheduler.mean_lag:.2f}s")
+            self.close_scraper()
+            if self.writer is not None:
+                # Guardar lo que quede en la cola antes de salir
+                self.writer.close()
+
+    def run_adaptive(self, events_filepath: str = "ratings_events.csv",
+                     min_interval_minutes: float = 1, max_interval_minutes: float = 30,
+                     max_fetches_per_minute: float = 12, change_threshold: float = 0.0,
+                     max_iterations: Optional[int] = None):
+        """
+        Consulta cada canal con su propio intervalo adaptativo
+
+        Los canales cuyo rating cambia se consultan más seguido y los que se
+        mantienen planos se espacian. Solo las lecturas que cambiaron se guardan,
+        como eventos en formato largo (TIMESTAMP, CHANNEL, RATING).
+
+        Args:
+            events_filepath: CSV donde se guardan los eventos de cambio
+            min_interval_minutes: Intervalo mínimo por canal
+            max_interval_minutes: Intervalo máximo por canal
+            max_fetches_per_minute: Tope global de consultas por minuto
+            change_threshold: Diferencia mínima para registrar un cambio
+            max_iterations: Límite opcional de rondas de consulta (útil en pruebas)
+        """
+        self.poller = AdaptivePoller(
+            self.channels,
+            min_interval=min_interval_minutes * 60,
+            max_interval=max_interval_minutes * 60,
+            max_fetches_per_minute=max_fetches_per_minute,
+            change_threshold=change_threshold,
+        )
+        self._stop_adaptive.clear()
+        fetches = events = iterations = 0
+
+        logger.info(f"Iniciando scraping adaptativo ({min_interval_minutes}-"
+                    f"{max_interval_minutes} min por canal, "
+                    f"máx. {max_fetches_per_minute} consultas/min)...")
+        logger.info(f"Los eventos se guardarán en: {Path(events_filepath).absolute()}")
+        logger.info("Presiona Ctrl+C para detener")
+
+        try:
+            while not self._stop_adaptive.is_set():
+                now = time.time()
+                due = self.poller.due_channels(now)
+                if due:
+                    try:
+                        scraper = self._acquire_scraper()
+                        ratings = scraper.scrape_channels(due)
+                        self._cycles_on_browser += 1
+                    except Exception as e:
+                        logger.error(f"Error al consultar {', '.join(due)}: {str(e)}")
+                        self.close_scraper()
+                        ratings = {name: None for name in due}
+
+                    fetches += len(due)
+                    changed = {name: value for name, value in ratings.items()
+                               if self.poller.record(name, value, now)}
+                    if changed:
+                        rows = self.transformer.to_change_events(
+                            changed, datetime.fromtimestamp(now).isoformat()
+                        )
+                        Transformer.append_rows_to_csv(rows, events_filepath, fsync=self.fsync)
+                        events += len(rows)
+                        logger.info(f"Cambios: {changed}")
+
+                    iterations += 1
+                    if max_iterations is not None and iterations >= max_iterations:
+                        break
+
+                # Dormir hasta que venza el próximo canal (o se libere cupo de consultas)
+                wait = max(1.0, self.poller.next_wakeup() - time.time())
+                if self._stop_adaptive.wait(min(wait, 60)):
+                    break
+
+        except KeyboardInterrupt:
+            logger.info("\nScraping detenido por el usuario")
+        finally:
+            intervals = ', '.join(f"{name}: {seconds / 60:.1f}m"
+                                  for name, seconds in self.poller.intervals().items())
+            logger.info(f"Consultas: {fetches} | eventos guardados: {events} | "
+                        f"intervalos: {intervals}")
+            self.close_scraper()
+
+    def stop_adaptive(self):
+        """Pide a run_adaptive que termine tras la ronda en curso"""
+        self._stop_adaptive.set()
+
+    def close(self):
+        """Cierra el scraper persistente, guarda las filas pendientes, libera el ring
+        y cierra el endpoint de métricas"""
+        self.close_scraper()
+        if self.writer is not None:
+            self.writer.close()
+        if self.ring is not None:
+            self.ring.close()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
 
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scraper de ratings en modo continuo")
+    parser.add_argument("--dashboard", action="store_true",
+                        help="Publica el ring y el aviso de cambios que lee el dashboard en vivo")
+    parser.add_argument("--persistent-browser", action="store_true",
+                        help="Mantiene el navegador abierto entre ciclos")
+    args = parser.parse_args()
+
     # Para testing: ejecutar cada 1 minuto
-    orchestrator = Orchestrator(csv_filepath="ratings_data.csv", headless=True)
+    orchestrator = Orchestrator(csv_filepath="ratings_data.csv", headless=True,
+                                persistent_browser=args.persistent_browser,
+                                ring_capacity=256 if args.dashboard else None,
+                                live_updates=args.dashboard)
     orchestrator.run_continuous(interval_minutes=1)
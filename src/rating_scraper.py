@@ -1,9 +1,23 @@
 """
 RatingScraper - Clase para extraer ratings de TV desde Zapping
 """
-from playwright.sync_api import sync_playwright, Page
-from typing import Dict, Optional
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
 import logging
+import math
+import time
+
+from deadline import (STATUS_CIRCUIT_OPEN, STATUS_DEADLINE, STATUS_ERROR, STATUS_MISSING, STATUS_OK,
+                      STATUS_TIMEOUT, CircuitBreaker, Deadline, DeadlineRunner, is_timeout)
+from fetch_cache import FetchCache
+from http_fetcher import HttpRatingFetcher
+from metrics import METRICS
+
+if TYPE_CHECKING:
+    from playwright.async_api import Page as AsyncPage
+    from playwright.sync_api import Page
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -23,17 +37,113 @@ class RatingScraper:
         'MEGA': 'mega'
     }
     
-    def __init__(self, headless: bool = True):
+    # playwright: siempre con navegador
+    # http: solo cliente HTTP, sin navegador
+    # auto: HTTP primero y Playwright solo para los canales que fallen
+    BACKENDS = ('playwright', 'http', 'auto')
+
+    # Tipos de recurso que no hacen falta para leer #channel_rating
+    DEFAULT_BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font', 'stylesheet', 'manifest',
+                                      'texttrack')
+
+    RATING_SELECTOR = "#channel_rating"
+
+    # Espera hasta que el elemento tenga texto (el valor puede llegar por JS)
+    _RATING_READY_JS = (
+        "() => { const el = document.querySelector('#channel_rating');"
+        " return !!el && el.innerText.trim().length > 0; }"
+    )
+    
+    def __init__(self, headless: bool = True, max_concurrency: int = 1,
+                 backend: str = 'playwright', base_url: Optional[str] = None,
+                 http_pool_size: int = 6, data_url_template: Optional[str] = None,
+                 block_resources: bool = False,
+                 blocked_resource_types: Iterable[str] = DEFAULT_BLOCKED_RESOURCE_TYPES,
+                 allowed_domains: Optional[Iterable[str]] = None,
+                 blocked_domains: Iterable[str] = (),
+                 wait_for: str = 'networkidle', timeout_ms: int = 30000,
+                 channels: Optional[Dict[str, str]] = None, cache_ttl: float = 0.0,
+                 cycle_budget: Optional[float] = None, retries: int = 0,
+                 hedge_after: Optional[float] = None, breaker_threshold: int = 3,
+                 breaker_cooldown: float = 300.0):
         """
         Inicializa el scraper
         
         Args:
             headless: Si True, ejecuta el navegador en modo headless
+            max_concurrency: Máximo de páginas consultando en paralelo. Con 1 se
+                usa la API síncrona y los canales se recorren en serie; con más
+                se usa la API asíncrona sobre un pool acotado de páginas
+            backend: 'playwright', 'http' o 'auto' (ver BACKENDS)
+            base_url: URL base alternativa (ej: un servidor stub local)
+            http_pool_size: Conexiones keep-alive del cliente HTTP
+            data_url_template: Endpoint JSON opcional para el backend HTTP
+            block_resources: Si True, intercepta los requests del contexto y aborta
+                los recursos no esenciales y los dominios de terceros
+            blocked_resource_types: Tipos de recurso de Playwright a bloquear
+            allowed_domains: Dominios permitidos (con sus subdominios); por defecto
+                el dominio de base_url. Todo lo demás se considera de terceros
+            blocked_domains: Dominios bloqueados siempre (lista de denegación)
+            wait_for: 'networkidle' espera a que la red quede inactiva; 'selector'
+                navega hasta DOMContentLoaded y espera a que #channel_rating tenga texto
+            timeout_ms: Timeout de navegación y espera por canal
+            channels: Canales que recorre scrape_all_channels (nombre -> slug);
+                por defecto CHANNELS (ver channel_registry.load_channels)
+            cache_ttl: Segundos durante los que una lectura se reutiliza sin
+                volver a consultar (0 = consultar siempre; el backend HTTP igual
+                usa requests condicionales y evita parsear páginas sin cambios)
+            cycle_budget: Segundos máximos por ciclo; cada intento recibe como
+                timeout su parte de lo que queda (None = solo timeout_ms por canal)
+            retries: Reintentos por canal cuando un intento no trae rating
+            hedge_after: Segundos tras los que un request HTTP lento se duplica;
+                gana la primera respuesta con rating (None = sin duplicar)
+            breaker_threshold: Fallos seguidos tras los que un canal deja de
+                consultarse por breaker_cooldown segundos (0 = nunca)
+            breaker_cooldown: Segundos que un canal con el circuito abierto se omite
         """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency debe ser al menos 1")
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend desconocido: {backend}. Opciones: {self.BACKENDS}")
+        if wait_for not in ('networkidle', 'selector'):
+            raise ValueError("wait_for debe ser 'networkidle' o 'selector'")
+        if retries < 0:
+            raise ValueError("retries no puede ser negativo")
         self.headless = headless
+        self.max_concurrency = max_concurrency
+        self.backend = backend
+        self.base_url = (base_url or self.BASE_URL).rstrip('/')
+        self.http_pool_size = http_pool_size
+        self.data_url_template = data_url_template
+        self.http: Optional[HttpRatingFetcher] = None
+        self.block_resources = block_resources
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.allowed_domains = tuple(allowed_domains) if allowed_domains is not None \
+            else (self._registrable_domain(urlsplit(self.base_url).hostname or ''),)
+        self.blocked_domains = tuple(blocked_domains)
+        self.wait_for = wait_for
+        self.timeout_ms = timeout_ms
+        self.channels = dict(channels) if channels is not None else dict(self.CHANNELS)
+        self.cache = FetchCache(ttl=cache_ttl)
+        self.cycle_budget = cycle_budget
+        self.retries = retries
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(threshold=breaker_threshold, cooldown=breaker_cooldown)
+        self._runner: Optional[DeadlineRunner] = None
+        # Estado de la lectura de cada canal en el último scrape (ver deadline.STATUSES)
+        self.last_status: Dict[str, str] = {}
+        # Si cada canal cambió respecto de su lectura anterior en el último scrape
+        self.last_changed: Dict[str, bool] = {}
+        self._previous_ratings: Dict[str, Optional[float]] = {}
         self.playwright = None
         self.browser = None
         self.context = None
+        self._loop = None
+        # Segundos que tardó cada canal en el último scrape_all_channels()
+        self.last_timings: Dict[str, float] = {}
+        # Requests, bloqueos y bytes (según Content-Length) por canal (solo Playwright)
+        self.last_stats: Dict[str, Dict[str, int]] = {}
+        self._page_stats: Dict[object, Dict[str, int]] = {}
         
     def __enter__(self):
         """Context manager entry"""
@@ -44,23 +154,241 @@ class RatingScraper:
         """Context manager exit"""
         self.close()
         
+    @property
+    def is_concurrent(self) -> bool:
+        """True si el scraper usa la API asíncrona con varias páginas"""
+        return self.max_concurrency > 1
+
     def start(self):
+        """Inicia el backend configurado (el navegador se lanza solo si hace falta)"""
+        if self.backend in ('http', 'auto'):
+            self.http = HttpRatingFetcher(self.base_url, pool_size=self.http_pool_size,
+                                          data_url_template=self.data_url_template,
+                                          cache=self.cache)
+            if self.cycle_budget is not None or self.retries or self.hedge_after is not None:
+                self._runner = DeadlineRunner(self.http.fetch_rating_status,
+                                              budget=self.cycle_budget,
+                                              attempt_timeout=self.timeout_ms / 1000,
+                                              retries=self.retries, hedge_after=self.hedge_after,
+                                              max_workers=self.http_pool_size)
+            logger.info(f"Cliente HTTP listo (backend: {self.backend})")
+        if self.backend == 'playwright':
+            self._start_browser()
+
+    def _start_browser(self):
         """Inicia el navegador"""
         logger.info("Iniciando navegador Playwright...")
-        self.playwright = sync_playwright().start()
-        self.browser = self.playwright.chromium.launch(headless=self.headless)
-        self.context = self.browser.new_context()
+        # Playwright (y asyncio) se importan recién aquí: el backend HTTP nunca los carga
+        from playwright.sync_api import sync_playwright
+        with METRICS.span('browser_launch'):
+            if self.is_concurrent:
+                import asyncio
+                # La API asíncrona corre en un event loop propio para que el resto
+                # del código (Orchestrator) siga siendo síncrono
+                self._loop = asyncio.new_event_loop()
+                self._loop.run_until_complete(self._start_async())
+            else:
+                self.playwright = sync_playwright().start()
+                self.browser = self.playwright.chromium.launch(headless=self.headless)
+                self.context = self._new_context()
         logger.info("Navegador iniciado correctamente")
+
+    def _new_context(self):
+        """Crea un contexto de navegación nuevo (API síncrona)"""
+        context = self.browser.new_context()
+        if self.block_resources:
+            context.route("**/*", self._route_handler)
+        return context
+
+    async def _new_context_async(self):
+        """Crea un contexto de navegación nuevo (API asíncrona)"""
+        context = await self.browser.new_context()
+        if self.block_resources:
+            await context.route("**/*", self._route_handler_async)
+        return context
+
+    @staticmethod
+    def _registrable_domain(hostname: str) -> str:
+        """Reduce un host a su dominio base (metrics.zappingtv.com -> zappingtv.com)"""
+        labels = hostname.split('.')
+        if len(labels) <= 2 or hostname.replace('.', '').isdigit():
+            return hostname
+        return '.'.join(labels[-2:])
+
+    @staticmethod
+    def _matches_domain(hostname: str, domains: Iterable[str]) -> bool:
+        """True si el host es alguno de los dominios o un subdominio de ellos"""
+        return any(hostname == d or hostname.endswith('.' + d) for d in domains)
+
+    def _should_block(self, url: str, resource_type: str) -> bool:
+        """
+        Decide si un request debe abortarse
+
+        Args:
+            url: URL del request
+            resource_type: Tipo de recurso según Playwright
+
+        Returns:
+            True si el request no es necesario para leer el rating
+        """
+        if resource_type == 'document':
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        hostname = urlsplit(url).hostname or ''
+        if self._matches_domain(hostname, self.blocked_domains):
+            return True
+        return not self._matches_domain(hostname, self.allowed_domains)
+
+    def _count_blocked(self, request):
+        """Suma un request bloqueado a las estadísticas de su página"""
+        try:
+            stats = self._page_stats.get(request.frame.page)
+        except Exception:
+            stats = None
+        if stats is not None:
+            stats['blocked'] += 1
+
+    def _route_handler(self, route):
+        """Intercepta requests del contexto (API síncrona)"""
+        request = route.request
+        if self._should_block(request.url, request.resource_type):
+            self._count_blocked(request)
+            route.abort()
+        else:
+            route.continue_()
+
+    async def _route_handler_async(self, route):
+        """Intercepta requests del contexto (API asíncrona)"""
+        request = route.request
+        if self._should_block(request.url, request.resource_type):
+            self._count_blocked(request)
+            await route.abort()
+        else:
+            await route.continue_()
+
+    def _track_page(self, page):
+        """Registra los listeners que cuentan requests y bytes de una página"""
+        def on_response(response):
+            stats = self._page_stats.get(page)
+            if stats is None:
+                return
+            stats['requests'] += 1
+            try:
+                stats['bytes'] += int(response.headers.get('content-length', 0))
+            except ValueError:
+                pass
+        page.on("response", on_response)
+
+    def _reset_page_stats(self, page) -> Dict[str, int]:
+        """Inicia contadores nuevos para la próxima navegación de la página"""
+        stats = {'requests': 0, 'blocked': 0, 'bytes': 0}
+        self._page_stats[page] = stats
+        return stats
+
+    async def _start_async(self):
+        """Inicia Playwright asíncrono, el navegador y el contexto"""
+        from playwright.async_api import async_playwright
+        self.playwright = await async_playwright().start()
+        self.browser = await self.playwright.chromium.launch(headless=self.headless)
+        self.context = await self._new_context_async()
         
     def close(self):
+        """Cierra el navegador y el cliente HTTP"""
+        if self._runner:
+            self._runner.close()
+            self._runner = None
+        if self.http:
+            self.http.close()
+            self.http = None
+        if self.browser or self.playwright:
+            self._close_browser()
+
+    def _close_browser(self):
         """Cierra el navegador"""
+        if self._loop:
+            try:
+                self._loop.run_until_complete(self._close_async())
+            finally:
+                self._loop.close()
+                self._loop = None
+        else:
+            if self.context:
+                self.context.close()
+            if self.browser:
+                self.browser.close()
+            if self.playwright:
+                self.playwright.stop()
+        self.context = None
+        self.browser = None
+        self.playwright = None
+        logger.info("Navegador cerrado")
+
+    async def _close_async(self):
+        """Cierra contexto, navegador y Playwright asíncronos"""
         if self.context:
-            self.context.close()
+            await self.context.close()
         if self.browser:
-            self.browser.close()
+            await self.browser.close()
         if self.playwright:
-            self.playwright.stop()
-        logger.info("Navegador cerrado")
+            await self.playwright.stop()
+
+    def is_healthy(self) -> bool:
+        """
+        Verifica que el navegador siga vivo y sin páginas huérfanas
+
+        Returns:
+            True si el navegador puede seguir usándose
+        """
+        if self.backend != 'playwright' and self.browser is None:
+            # El navegador del modo auto se lanza bajo demanda
+            return self.http is not None
+        if not self.browser or not self.context:
+            return False
+        try:
+            if not self.browser.is_connected():
+                return False
+            # Entre ciclos no debería quedar ninguna página abierta
+            leaked = len(self.context.pages)
+            if leaked:
+                logger.warning(f"{leaked} páginas quedaron abiertas en el contexto")
+                return False
+            return True
+        except Exception as e:
+            logger.warning(f"Health check del navegador falló: {str(e)}")
+            return False
+
+    def recycle_context(self):
+        """Reemplaza el contexto por uno limpio sin relanzar el navegador"""
+        if not self.browser:
+            if self.http is not None:
+                return
+            raise RuntimeError("El navegador no está iniciado. Llama a start() primero.")
+        if self._loop:
+            self._loop.run_until_complete(self._recycle_context_async())
+        else:
+            if self.context:
+                self.context.close()
+            self.context = self._new_context()
+
+    async def _recycle_context_async(self):
+        """Versión asíncrona de recycle_context"""
+        if self.context:
+            await self.context.close()
+        self.context = await self._new_context_async()
+
+    @staticmethod
+    def _parse_rating(rating_text: str) -> float:
+        """
+        Convierte el texto de #channel_rating a float
+
+        Args:
+            rating_text: Texto del elemento
+
+        Returns:
+            Rating como float
+        """
+        return float(rating_text.strip())
         
     def _fetch_channel_rating(self, page: Page, channel_slug: str) -> Optional[float]:
         """
@@ -73,27 +401,182 @@ class RatingScraper:
         Returns:
             Rating como float o None si hay error
         """
-        url = f"{self.BASE_URL}/{channel_slug}"
+        return self._fetch_channel_status(page, channel_slug)[0]
+
+    def _fetch_channel_status(self, page: Page, channel_slug: str,
+                              timeout_ms: Optional[float] = None) -> Tuple[Optional[float], str]:
+        """
+        Obtiene el rating de un canal y el estado de la lectura
+
+        Args:
+            page: Página de Playwright
+            channel_slug: Slug del canal (ej: 'mega', 'chv')
+            timeout_ms: Timeout de navegación y espera (por defecto self.timeout_ms)
+
+        Returns:
+            Tupla (rating o None, estado)
+        """
+        url = f"{self.base_url}/{channel_slug}"
+        timeout_ms = self.timeout_ms if timeout_ms is None else timeout_ms
         
         try:
             logger.info(f"Obteniendo rating de {channel_slug}...")
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            
-            # El rating está en un div con id="channel_rating"
-            rating_element = page.locator("#channel_rating")
-            
-            if rating_element.count() > 0:
-                rating_text = rating_element.inner_text().strip()
-                rating_value = float(rating_text)
-                logger.info(f"Rating de {channel_slug}: {rating_value}")
-                return rating_value
-            else:
-                logger.warning(f"No se encontró el elemento de rating para {channel_slug}")
-                return None
+            with METRICS.span('goto', channel=channel_slug):
+                page.goto(url, wait_until=self._wait_until, timeout=timeout_ms)
+
+            with METRICS.span('selector', channel=channel_slug):
+                if self.wait_for == 'selector':
+                    page.wait_for_function(self._RATING_READY_JS, timeout=timeout_ms)
+                # El rating está en un div con id="channel_rating"
+                rating_element = page.locator(self.RATING_SELECTOR)
+                rating_text = rating_element.inner_text() if rating_element.count() > 0 else None
+            return self._page_result(channel_slug, rating_text)
                 
         except Exception as e:
-            logger.error(f"Error al obtener rating de {channel_slug}: {str(e)}")
-            return None
+            return self._page_error(channel_slug, e)
+            
+    async def _fetch_channel_rating_async(
+            self, page: AsyncPage, channel_slug: str,
+            timeout_ms: Optional[float] = None) -> Tuple[Optional[float], str]:
+        """
+        Versión asíncrona de _fetch_channel_status
+
+        Args:
+            page: Página asíncrona de Playwright
+            channel_slug: Slug del canal (ej: 'mega', 'chv')
+            timeout_ms: Timeout de navegación y espera (por defecto self.timeout_ms)
+
+        Returns:
+            Tupla (rating o None, estado)
+        """
+        url = f"{self.base_url}/{channel_slug}"
+        timeout_ms = self.timeout_ms if timeout_ms is None else timeout_ms
+
+        try:
+            logger.info(f"Obteniendo rating de {channel_slug}...")
+            with METRICS.span('goto', channel=channel_slug):
+                await page.goto(url, wait_until=self._wait_until, timeout=timeout_ms)
+
+            with METRICS.span('selector', channel=channel_slug):
+                if self.wait_for == 'selector':
+                    await page.wait_for_function(self._RATING_READY_JS, timeout=timeout_ms)
+                rating_element = page.locator(self.RATING_SELECTOR)
+                found = await rating_element.count() > 0
+                rating_text = await rating_element.inner_text() if found else None
+            return self._page_result(channel_slug, rating_text)
+
+        except Exception as e:
+            return self._page_error(channel_slug, e)
+
+    @property
+    def _wait_until(self) -> str:
+        """Evento de carga que espera page.goto según wait_for"""
+        return "domcontentloaded" if self.wait_for == 'selector' else "networkidle"
+
+    def _page_result(self, channel_slug: str,
+                     rating_text: Optional[str]) -> Tuple[Optional[float], str]:
+        """
+        Rating y estado de una lectura con navegador (síncrona o asíncrona)
+
+        Args:
+            channel_slug: Slug del canal
+            rating_text: Texto de #channel_rating, o None si la página no lo trae
+
+        Returns:
+            Tupla (rating o None, estado)
+        """
+        if rating_text is None:
+            logger.warning(f"No se encontró el elemento de rating para {channel_slug}")
+            return None, STATUS_MISSING
+        rating_value = self._parse_rating(rating_text)
+        logger.info(f"Rating de {channel_slug}: {rating_value}")
+        return rating_value, STATUS_OK
+
+    def _page_error(self, channel_slug: str, error: Exception) -> Tuple[None, str]:
+        """
+        Registra una lectura con navegador que falló
+
+        Args:
+            channel_slug: Slug del canal
+            error: Excepción del intento
+
+        Returns:
+            Tupla (None, 'timeout' o 'error')
+        """
+        logger.error(f"Error al obtener rating de {channel_slug}: {str(error)}")
+        METRICS.inc('ratings_fetch_errors_total', channel=channel_slug, backend='playwright')
+        return None, STATUS_TIMEOUT if is_timeout(error) else STATUS_ERROR
+
+    def _attempt_timeout_ms(self, deadline: Deadline, pending: int) -> float:
+        """
+        Timeout en ms del próximo intento con navegador
+
+        Args:
+            deadline: Presupuesto del ciclo
+            pending: Intentos que todavía compiten en serie por el tiempo restante
+
+        Returns:
+            Milisegundos asignados (0 si ya no queda presupuesto)
+        """
+        timeout_ms = deadline.share(pending, self.timeout_ms / 1000) * 1000
+        return timeout_ms if timeout_ms >= 1 else 0.0
+
+    async def _scrape_concurrent(self, channels: Dict[str, str],
+                                 deadline: Deadline) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Obtiene los ratings usando un pool acotado de páginas en paralelo
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+            deadline: Presupuesto del ciclo
+
+        Returns:
+            Diccionario nombre -> (rating o None, estado), mismo orden que channels
+        """
+        import asyncio
+
+        pool_size = min(self.max_concurrency, len(channels))
+        pages = [await self.context.new_page() for _ in range(pool_size)]
+        available: asyncio.Queue = asyncio.Queue()
+        for page in pages:
+            self._track_page(page)
+            available.put_nowait(page)
+        waiting = len(channels)
+
+        async def fetch(channel_name: str, channel_slug: str) -> Tuple[Optional[float], str]:
+            nonlocal waiting
+            page = await available.get()
+            waiting -= 1
+            self.last_stats[channel_name] = self._reset_page_stats(page)
+            start = time.perf_counter()
+            rating, status = None, STATUS_DEADLINE
+            try:
+                for _ in range(self.retries + 1):
+                    # Cada página atiende en serie a los canales que siguen en cola
+                    queued = 1 + math.ceil(waiting / pool_size)
+                    timeout_ms = self._attempt_timeout_ms(deadline, queued)
+                    if not timeout_ms:
+                        break
+                    rating, status = await self._fetch_channel_rating_async(page, channel_slug,
+                                                                            timeout_ms)
+                    if rating is not None:
+                        break
+                return rating, status
+            finally:
+                self.last_timings[channel_name] = time.perf_counter() - start
+                available.put_nowait(page)
+
+        try:
+            results = await asyncio.gather(*(
+                fetch(channel_name, channel_slug)
+                for channel_name, channel_slug in channels.items()
+            ))
+        finally:
+            for page in pages:
+                self._page_stats.pop(page, None)
+                await page.close()
+
+        return dict(zip(channels.keys(), results))
             
     def scrape_all_channels(self) -> Dict[str, Optional[float]]:
         """
@@ -102,18 +585,211 @@ class RatingScraper:
         Returns:
             Diccionario con los ratings de cada canal
         """
-        if not self.context:
+        return self.scrape_channels(self.channels)
+
+    def scrape_channels(self, channels: Dict[str, str]) -> Dict[str, Optional[float]]:
+        """
+        Obtiene los ratings de un subconjunto de canales
+
+        Los canales sin lectura quedan en None; el motivo queda en last_status
+        ('missing', 'timeout', 'error', 'circuit_open' o 'deadline').
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+
+        Returns:
+            Diccionario con los ratings de cada canal pedido
+        """
+        if not self.context and not self.http:
             raise RuntimeError("El navegador no está iniciado. Llama a start() primero.")
-            
+
+        cycle_start = time.perf_counter()
+        deadline = Deadline(self.cycle_budget)
+        self.last_timings = {}
+        self.last_stats = {}
+
+        results = self._unfetched_results(channels)
+        cached = sum(status == STATUS_OK for _, status in results.values())
+        pending = {name: slug for name, slug in channels.items() if name not in results}
+
+        fetched: Dict[str, Tuple[Optional[float], str]] = {}
+        browser: Dict[str, str] = {}
+        if pending and self.http:
+            fetched = self._scrape_http(pending, deadline)
+            missing = {name: slug for name, slug in pending.items() if fetched[name][0] is None}
+            if missing and self.backend == 'auto' and not deadline.expired:
+                logger.info(f"Fallback a Playwright para: {', '.join(missing)}")
+                browser = missing
+        elif pending:
+            browser = pending
+        if browser:
+            fetched.update(self._scrape_browser(browser, deadline))
+        self._record_fetched(fetched, browser)
+        results.update(fetched)
+
+        ratings = {name: results[name][0] for name in channels}
+        self.last_status = {name: results[name][1] for name in channels}
+
+        self.last_changed = {
+            name: name not in self._previous_ratings or self._previous_ratings[name] != rating
+            for name, rating in ratings.items()
+        }
+        self._previous_ratings.update(ratings)
+
+        for channel_name, rating in ratings.items():
+            METRICS.inc('ratings_channel_results_total', channel=channel_name,
+                        result=self.last_status[channel_name])
+            if rating is not None:
+                METRICS.set_gauge('ratings_last_value', rating, channel=channel_name)
+
+        failed = {name: status for name, status in self.last_status.items() if status != STATUS_OK}
+        logger.info(
+            f"{len(ratings) - len(failed)}/{len(ratings)} canales obtenidos en "
+            f"{time.perf_counter() - cycle_start:.2f}s "
+            f"(backend: {self.backend}, concurrencia: {self.max_concurrency}, "
+            f"{cached} desde caché, {sum(self.last_changed.values())} con cambios)"
+        )
+        if failed:
+            detail = ', '.join(f'{n} ({s})' for n, s in failed.items())
+            logger.warning(f"Canales sin rating: {detail}")
+        self._log_channel_timings()
+        return ratings
+
+    def _unfetched_results(self,
+                           channels: Dict[str, str]) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Canales que no se consultan: lectura vigente en la caché o circuito abierto
+
+        Args:
+            channels: Canales pedidos (nombre -> slug)
+
+        Returns:
+            Diccionario nombre -> (rating o None, estado) solo de esos canales
+        """
+        results: Dict[str, Tuple[Optional[float], str]] = {}
+        for channel_name, channel_slug in channels.items():
+            entry = self.cache.fresh(channel_slug)
+            if entry is not None:
+                results[channel_name] = (entry.rating, STATUS_OK)
+                self.cache.record('fresh')
+            elif not self.breaker.allow(channel_name):
+                results[channel_name] = (None, STATUS_CIRCUIT_OPEN)
+        return results
+
+    def _record_fetched(self, fetched: Dict[str, Tuple[Optional[float], str]],
+                        browser: Dict[str, str]):
+        """
+        Actualiza el breaker y la caché con las lecturas consultadas
+
+        El cliente HTTP guarda y cuenta sus propias lecturas; las del navegador
+        se guardan acá y cuentan como miss solo si antes hubo una búsqueda real
+        en la caché (cache_ttl > 0) que el cliente HTTP no haya contado ya.
+
+        Args:
+            fetched: Lecturas consultadas, nombre -> (rating o None, estado)
+            browser: Canales leídos con el navegador (nombre -> slug)
+        """
+        for channel_name, (rating, _) in fetched.items():
+            self.breaker.record(channel_name, rating is not None)
+        for channel_name, channel_slug in browser.items():
+            self.cache.store(channel_slug, fetched[channel_name][0])
+            if self.cache.ttl > 0 and not self.http:
+                self.cache.record('miss')
+
+    def _log_channel_timings(self):
+        """Registra latencia, requests bloqueados y bytes recibidos por canal"""
+        for channel_name, elapsed in self.last_timings.items():
+            stats = self.last_stats.get(channel_name)
+            if stats:
+                logger.info(
+                    f"  {channel_name:<10} {elapsed:6.2f}s | {stats['requests']} requests"
+                    f" | {stats['blocked']} bloqueados | {stats['bytes'] / 1024:.1f} KB"
+                )
+            else:
+                logger.info(f"  {channel_name:<10} {elapsed:6.2f}s")
+
+    def _scrape_http(self, channels: Dict[str, str],
+                     deadline: Deadline) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Obtiene los ratings con el cliente HTTP
+
+        Sin presupuesto, reintentos ni hedging se usa fetch_many directamente;
+        si no, cada canal pasa por el DeadlineRunner.
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+            deadline: Presupuesto del ciclo
+
+        Returns:
+            Diccionario nombre -> (rating o None, estado)
+        """
+        if self._runner is None:
+            by_slug = self.http.fetch_many(channels.values())
+            by_slug = {slug: (rating, self.http.last_status[slug])
+                       for slug, rating in by_slug.items()}
+            timings = self.http.last_timings
+        else:
+            by_slug = self._runner.run(channels.values(), deadline)
+            timings = self._runner.last_timings
+        for channel_name, channel_slug in channels.items():
+            self.last_timings[channel_name] = timings[channel_slug]
+        return {name: by_slug[slug] for name, slug in channels.items()}
+
+    def _scrape_browser(self, channels: Dict[str, str],
+                        deadline: Deadline) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Obtiene los ratings con Playwright, lanzando el navegador si hace falta
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+            deadline: Presupuesto del ciclo
+
+        Returns:
+            Diccionario nombre -> (rating o None, estado)
+        """
+        if self.browser is None:
+            self._start_browser()
+        if self.is_concurrent:
+            return self._loop.run_until_complete(self._scrape_concurrent(channels, deadline))
+        return self._scrape_sequential(channels, deadline)
+
+    def _scrape_sequential(self, channels: Dict[str, str],
+                           deadline: Deadline) -> Dict[str, Tuple[Optional[float], str]]:
+        """
+        Obtiene los ratings canal por canal con una sola página
+
+        Cada intento recibe una parte igual de lo que queda del presupuesto
+        entre los canales pendientes, así un canal colgado no consume el
+        tiempo de los siguientes.
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+            deadline: Presupuesto del ciclo
+
+        Returns:
+            Diccionario nombre -> (rating o None, estado)
+        """
         page = self.context.new_page()
-        ratings = {}
+        self._track_page(page)
+        results = {}
         
         try:
-            for channel_name, channel_slug in self.CHANNELS.items():
-                rating = self._fetch_channel_rating(page, channel_slug)
-                ratings[channel_name] = rating
+            for index, (channel_name, channel_slug) in enumerate(channels.items()):
+                self.last_stats[channel_name] = self._reset_page_stats(page)
+                start = time.perf_counter()
+                rating, status = None, STATUS_DEADLINE
+                for _ in range(self.retries + 1):
+                    timeout_ms = self._attempt_timeout_ms(deadline, len(channels) - index)
+                    if not timeout_ms:
+                        break
+                    rating, status = self._fetch_channel_status(page, channel_slug, timeout_ms)
+                    if rating is not None:
+                        break
+                self.last_timings[channel_name] = time.perf_counter() - start
+                results[channel_name] = (rating, status)
                 
         finally:
+            self._page_stats.pop(page, None)
             page.close()
-            
-        return ratings
+
+        return results
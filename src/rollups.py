@@ -0,0 +1,298 @@
+"""
+RollupStore - Agregados por hora/día mantenidos al momento de ingerir cada fila
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import sqlite3
+from pathlib import Path
+
+from lazy_imports import lazy_import
+
+# Solo las lecturas del dashboard usan pandas; update() no lo necesita
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+# Formato del bucket de cada resolución (se deriva del TIMESTAMP de la fila)
+RESOLUTIONS = {
+    'hourly': '%Y-%m-%dT%H:00:00',
+    'daily': '%Y-%m-%d',
+}
+
+# Reglas de resample de pandas equivalentes a cada resolución
+RESAMPLE_RULES = {'h': 'hourly', 'D': 'daily'}
+
+
+class RollupStore:
+    """
+    Tablas pequeñas que el dashboard lee en vez de recorrer el historial
+
+    - rollup_hourly / rollup_daily: min, max, suma y cantidad por canal y bucket
+    - share_totals: suma y cantidad acumuladas por canal (share histórico)
+    - recent: ring buffer con las últimas N filas completas
+    - meta: total de filas, primer/último TIMESTAMP y si se sembraron desde
+      el historial (seeded)
+    """
+
+    def __init__(self, filepath: str, recent_capacity: int = 100):
+        """
+        Args:
+            filepath: Ruta del archivo SQLite
+            recent_capacity: Filas que guarda el ring buffer de recientes
+        """
+        self.filepath = filepath
+        self.recent_capacity = recent_capacity
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión en modo WAL y crea las tablas si faltan"""
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for resolution in RESOLUTIONS:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS rollup_{resolution} (
+                    bucket TEXT NOT NULL, channel TEXT NOT NULL,
+                    min REAL, max REAL, sum REAL, count INTEGER,
+                    PRIMARY KEY (bucket, channel)
+                )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS share_totals (
+                channel TEXT PRIMARY KEY, sum REAL, count INTEGER
+            )""")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS recent (
+                slot INTEGER PRIMARY KEY, seq INTEGER, timestamp TEXT, data TEXT
+            )""")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        return conn
+
+    def exists(self) -> bool:
+        """True si el archivo de agregados ya existe"""
+        return Path(self.filepath).exists()
+
+    def update(self, row: Dict[str, Any]):
+        """
+        Incorpora una fila transformada a todos los agregados
+
+        Args:
+            row: Fila con TIMESTAMP y un rating por canal
+        """
+        self.update_many([row])
+
+    def update_many(self, rows: List[Dict[str, Any]]):
+        """
+        Incorpora varias filas en una sola transacción
+
+        Args:
+            rows: Filas con TIMESTAMP y un rating por canal
+        """
+        if not rows:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                meta = dict(conn.execute("SELECT key, value FROM meta"))
+                seq = int(meta.get('rows', 0))
+                first_ts = meta.get('first_timestamp')
+                last_ts = meta.get('last_timestamp')
+
+                for row in rows:
+                    timestamp = row['TIMESTAMP']
+                    ts = datetime.fromisoformat(timestamp)
+                    values = {ch: float(v) for ch, v in row.items()
+                              if ch != 'TIMESTAMP' and v is not None}
+
+                    for resolution, fmt in RESOLUTIONS.items():
+                        bucket = ts.strftime(fmt)
+                        conn.executemany(f"""
+                            INSERT INTO rollup_{resolution} (bucket, channel, min, max, sum, count)
+                            VALUES (?, ?, ?, ?, ?, 1)
+                            ON CONFLICT (bucket, channel) DO UPDATE SET
+                                min = MIN(min, excluded.min),
+                                max = MAX(max, excluded.max),
+                                sum = sum + excluded.sum,
+                                count = count + 1
+                        """, [(bucket, ch, v, v, v) for ch, v in values.items()])
+
+                    conn.executemany("""
+                        INSERT INTO share_totals (channel, sum, count) VALUES (?, ?, 1)
+                        ON CONFLICT (channel) DO UPDATE SET
+                            sum = sum + excluded.sum, count = count + 1
+                    """, list(values.items()))
+
+                    conn.execute(
+                        "INSERT OR REPLACE INTO recent (slot, seq, timestamp, data) "
+                        "VALUES (?, ?, ?, ?)",
+                        (seq % self.recent_capacity, seq, timestamp, json.dumps(values))
+                    )
+                    seq += 1
+                    first_ts = timestamp if first_ts is None or timestamp < first_ts else first_ts
+                    last_ts = timestamp if last_ts is None or timestamp > last_ts else last_ts
+
+                conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                    ('rows', str(seq)), ('first_timestamp', first_ts), ('last_timestamp', last_ts)
+                ])
+        finally:
+            conn.close()
+
+    def rebuild(self, df: pd.DataFrame):
+        """
+        Reconstruye todos los agregados desde un historial completo
+
+        Args:
+            df: Historial con TIMESTAMP (datetime64) y una columna por canal
+        """
+        channels = [col for col in df.columns if col != 'TIMESTAMP']
+        long = df.melt(id_vars='TIMESTAMP', value_vars=channels,
+                       var_name='channel', value_name='rating').dropna(subset=['rating'])
+
+        conn = self._connect()
+        try:
+            with conn:
+                tables = [f"rollup_{r}" for r in RESOLUTIONS] + ['share_totals', 'recent', 'meta']
+                for table in tables:
+                    conn.execute(f"DELETE FROM {table}")
+
+                for resolution, fmt in RESOLUTIONS.items():
+                    grouped = (long.assign(bucket=long['TIMESTAMP'].dt.strftime(fmt))
+                                   .groupby(['bucket', 'channel'])['rating']
+                                   .agg(['min', 'max', 'sum', 'count'])
+                                   .reset_index())
+                    conn.executemany(
+                        f"INSERT INTO rollup_{resolution} VALUES (?, ?, ?, ?, ?, ?)",
+                        grouped.itertuples(index=False, name=None)
+                    )
+
+                totals = long.groupby('channel')['rating'].agg(['sum', 'count']).reset_index()
+                conn.executemany("INSERT INTO share_totals VALUES (?, ?, ?)",
+                                 totals.itertuples(index=False, name=None))
+
+                tail = df.tail(self.recent_capacity)
+                start_seq = len(df) - len(tail)
+                for offset, (_, row) in enumerate(tail.iterrows()):
+                    seq = start_seq + offset
+                    values = {ch: float(row[ch]) for ch in channels if pd.notna(row[ch])}
+                    conn.execute("INSERT INTO recent VALUES (?, ?, ?, ?)", (
+                        seq % self.recent_capacity, seq, row['TIMESTAMP'].isoformat(),
+                        json.dumps(values)
+                    ))
+
+                conn.execute("INSERT INTO meta VALUES ('seeded', '1')")
+                if len(df):
+                    conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+                        ('rows', str(len(df))),
+                        ('first_timestamp', df['TIMESTAMP'].min().isoformat()),
+                        ('last_timestamp', df['TIMESTAMP'].max().isoformat()),
+                    ])
+        finally:
+            conn.close()
+        logger.info(f"Agregados reconstruidos desde {len(df):,} filas en {self.filepath}")
+
+    def seeded(self) -> bool:
+        """
+        True si los agregados ya incluyen el historial previo
+
+        update() solo suma las filas que ve pasar; sin un rebuild() inicial,
+        en una instalación con historial los agregados empiezan vacíos.
+        """
+        if not self.exists():
+            return False
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'seeded'").fetchone()
+        finally:
+            conn.close()
+        return row is not None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Total de filas y rango de tiempo del historial
+
+        Returns:
+            Diccionario con rows, first_timestamp y last_timestamp
+        """
+        conn = self._connect()
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+        finally:
+            conn.close()
+        first, last = meta.get('first_timestamp'), meta.get('last_timestamp')
+        return {
+            'rows': int(meta.get('rows', 0)),
+            'first_timestamp': pd.Timestamp(first) if first else None,
+            'last_timestamp': pd.Timestamp(last) if last else None,
+        }
+
+    def latest(self, n: int = 2) -> pd.DataFrame:
+        """
+        Últimas n filas del ring buffer en el formato ancho del historial
+
+        Args:
+            n: Filas a devolver (como máximo recent_capacity)
+
+        Returns:
+            DataFrame ordenado por TIMESTAMP
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT timestamp, data FROM recent ORDER BY seq DESC LIMIT ?", (n,)
+            ).fetchall()
+        finally:
+            conn.close()
+        records = [{'TIMESTAMP': ts, **json.loads(data)} for ts, data in reversed(rows)]
+        df = pd.DataFrame(records)
+        if not df.empty:
+            df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        return df
+
+    def series(self, resolution: str, start: Optional[datetime] = None,
+               stat: str = 'mean') -> pd.DataFrame:
+        """
+        Serie agregada en formato ancho (una columna por canal)
+
+        Args:
+            resolution: 'hourly' o 'daily'
+            start: Bucket inicial opcional
+            stat: 'mean', 'min' o 'max'
+
+        Returns:
+            DataFrame con TIMESTAMP (inicio del bucket) y un valor por canal
+        """
+        expression = {'mean': 'sum / count', 'min': 'min', 'max': 'max'}[stat]
+        query = f"SELECT bucket, channel, {expression} FROM rollup_{resolution}"
+        params = []
+        if start is not None:
+            query += " WHERE bucket >= ?"
+            params.append(pd.Timestamp(start).strftime(RESOLUTIONS[resolution]))
+        conn = self._connect()
+        try:
+            long = pd.read_sql_query(query, conn, params=params)
+        finally:
+            conn.close()
+        if long.empty:
+            return pd.DataFrame(columns=['TIMESTAMP'])
+        long.columns = ['TIMESTAMP', 'channel', 'value']
+        wide = long.pivot(index='TIMESTAMP', columns='channel', values='value').reset_index()
+        wide.columns.name = None
+        wide['TIMESTAMP'] = pd.to_datetime(wide['TIMESTAMP'], format='ISO8601')
+        return wide.sort_values('TIMESTAMP').reset_index(drop=True)
+
+    def running_share(self) -> Dict[str, float]:
+        """
+        Rating promedio histórico por canal (base del share acumulado)
+
+        Returns:
+            Diccionario canal -> rating promedio
+        """
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT channel, sum / count FROM share_totals WHERE count > 0"
+            ).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
@@ -0,0 +1,173 @@
+"""
+AlignedScheduler - Ejecuta un trabajo en instantes fijos del reloj sin acumular deriva
+"""
+from typing import Callable, Dict, Optional
+import logging
+import math
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AlignedScheduler:
+    """
+    Planifica ejecuciones alineadas a múltiplos del intervalo en hora local
+
+    Con un intervalo de 30 minutos las ejecuciones caen en :00 y :30. El
+    próximo instante se calcula desde la grilla y no desde el fin de la
+    ejecución anterior, así la duración del scraping no desplaza las muestras.
+    """
+
+    # skip: descarta los ticks que se solaparon con una ejecución lenta
+    # queue: ejecuta de inmediato el último tick vencido y omite los anteriores
+    OVERLAP_POLICIES = ('skip', 'queue')
+
+    def __init__(self, interval_seconds: float, align: bool = True, overlap_policy: str = 'skip',
+                 backoff_base: float = 5.0, backoff_max: float = 300.0, jitter: float = 0.2,
+                 clock: Callable[[], float] = time.time):
+        """
+        Args:
+            interval_seconds: Período entre ejecuciones
+            align: Si True, alinea los ticks a múltiplos del intervalo en hora local;
+                si no, la grilla parte del momento de inicio
+            overlap_policy: 'skip' o 'queue' (ver OVERLAP_POLICIES)
+            backoff_base: Espera inicial antes de reintentar tras un fallo (segundos)
+            backoff_max: Espera máxima entre reintentos (segundos)
+            jitter: Fracción aleatoria (+/-) aplicada a cada espera de backoff
+            clock: Reloj de pared (inyectable para pruebas)
+        """
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds debe ser positivo")
+        if overlap_policy not in self.OVERLAP_POLICIES:
+            raise ValueError(f"overlap_policy debe ser uno de {self.OVERLAP_POLICIES}")
+        self.interval = interval_seconds
+        self.align = align
+        self.overlap_policy = overlap_policy
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self.clock = clock
+        self._stop = threading.Event()
+        self.stats: Dict[str, float] = {
+            'runs': 0, 'failures': 0, 'retries': 0, 'skipped': 0,
+            'last_lag': 0.0, 'max_lag': 0.0, 'total_lag': 0.0,
+        }
+
+    def next_tick(self, now: float, origin: Optional[float] = None) -> float:
+        """
+        Primer instante de la grilla estrictamente posterior a now
+
+        Args:
+            now: Instante actual (epoch)
+            origin: Inicio de la grilla cuando align es False
+
+        Returns:
+            Instante del próximo tick (epoch)
+        """
+        if self.align:
+            # Alinear en hora local (ej: medianoche de Chile, no UTC)
+            offset = time.localtime(now).tm_gmtoff
+            return (math.floor((now + offset) / self.interval) + 1) * self.interval - offset
+        origin = now if origin is None else origin
+        return origin + (math.floor((now - origin) / self.interval) + 1) * self.interval
+
+    def backoff_delay(self, failures: int) -> float:
+        """
+        Espera exponencial con jitter antes del reintento número `failures`
+
+        Args:
+            failures: Fallos consecutivos hasta ahora (>= 1)
+
+        Returns:
+            Segundos a esperar
+        """
+        delay = min(self.backoff_max, self.backoff_base * (2 ** (failures - 1)))
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def stop(self):
+        """Pide al loop que termine después de la ejecución en curso"""
+        self._stop.set()
+
+    def _sleep_until(self, target: float) -> bool:
+        """Duerme hasta target; devuelve False si se pidió detener"""
+        while True:
+            remaining = target - self.clock()
+            if remaining <= 0:
+                return True
+            # Despertar periódicamente por si el reloj de pared salta
+            if self._stop.wait(min(remaining, 60)):
+                return False
+
+    def run(self, job: Callable[[float], None], max_runs: Optional[int] = None):
+        """
+        Ejecuta job en cada tick hasta stop() (o max_runs ejecuciones)
+
+        Los errores del trabajo no detienen el loop: se reintenta con backoff
+        mientras el reintento quede antes del próximo tick.
+
+        Args:
+            job: Función que recibe el instante planificado (epoch) del tick
+            max_runs: Límite opcional de ejecuciones (útil en pruebas)
+        """
+        self._stop.clear()
+        origin = self.clock()
+        # Sin alineación la grilla parte ahora, con una primera ejecución inmediata
+        scheduled = self.next_tick(origin) if self.align else origin
+        logger.info(f"Próxima ejecución: {time.strftime('%H:%M:%S', time.localtime(scheduled))}")
+
+        while not self._stop.is_set():
+            if not self._sleep_until(scheduled):
+                break
+
+            lag = self.clock() - scheduled
+            self.stats['last_lag'] = lag
+            self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+            self.stats['total_lag'] += lag
+            next_scheduled = scheduled + self.interval
+
+            failures = 0
+            while True:
+                try:
+                    job(scheduled)
+                    break
+                except Exception as e:
+                    failures += 1
+                    self.stats['failures'] += 1
+                    retry_at = self.clock() + self.backoff_delay(failures)
+                    if retry_at >= next_scheduled:
+                        logger.error(f"Ejecución fallida ({str(e)}); se espera al próximo tick")
+                        break
+                    logger.warning(f"Ejecución fallida ({str(e)}); reintento en "
+                                   f"{retry_at - self.clock():.1f}s")
+                    self.stats['retries'] += 1
+                    if not self._sleep_until(retry_at):
+                        break
+
+            self.stats['runs'] += 1
+            if max_runs is not None and self.stats['runs'] >= max_runs:
+                break
+
+            # Ticks que pasaron mientras el trabajo seguía corriendo
+            finished = self.clock()
+            if finished >= next_scheduled:
+                overlapped = math.floor((finished - next_scheduled) / self.interval) + 1
+                if self.overlap_policy == 'queue':
+                    # Ejecutar de inmediato el último tick vencido, con su hora de grilla
+                    skipped = overlapped - 1
+                else:
+                    skipped = overlapped
+                next_scheduled += skipped * self.interval
+                if skipped:
+                    self.stats['skipped'] += skipped
+                    logger.warning(f"La ejecución se solapó con {skipped} tick(s); se omiten")
+
+            logger.info(f"Lag del tick: {lag:.2f}s | próxima ejecución: "
+                        f"{time.strftime('%H:%M:%S', time.localtime(next_scheduled))}")
+            scheduled = next_scheduled
+
+    @property
+    def mean_lag(self) -> float:
+        """Lag promedio entre el tick planificado y el inicio real"""
+        return self.stats['total_lag'] / self.stats['runs'] if self.stats['runs'] else 0.0
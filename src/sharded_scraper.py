@@ -0,0 +1,313 @@
+"""
+ShardedScraper - Reparte un catálogo grande de canales entre procesos con su propio navegador
+"""
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Optional
+import logging
+import multiprocessing
+import os
+import time
+
+from deadline import STATUS_ERROR
+from rating_scraper import RatingScraper
+
+logger = logging.getLogger(__name__)
+
+
+def _shard_worker(conn: Connection, channels: Dict[str, str], scraper_options: Dict[str, Any]):
+    """
+    Loop de un proceso worker: mantiene un RatingScraper propio y responde comandos
+
+    Cada mensaje es una tupla (comando, argumento) con comando 'scrape'
+    (argumento: subconjunto de canales o None para todos), 'recycle',
+    'health' o 'close'. Cada respuesta es una tupla (estado, datos) con
+    estado 'ok' o 'error'.
+    """
+    scraper = RatingScraper(channels=channels, **scraper_options)
+    try:
+        try:
+            scraper.start()
+        except Exception as e:
+            conn.send(('error', f"No se pudo iniciar el scraper: {str(e)}"))
+            return
+        conn.send(('ok', None))
+
+        while True:
+            command, argument = conn.recv()
+            if command == 'close':
+                break
+            try:
+                if command == 'scrape':
+                    ratings = scraper.scrape_channels(
+                        argument if argument is not None else channels)
+                    conn.send(('ok', (ratings, scraper.last_timings, scraper.last_changed,
+                                      scraper.last_status)))
+                elif command == 'recycle':
+                    scraper.recycle_context()
+                    conn.send(('ok', None))
+                elif command == 'health':
+                    conn.send(('ok', scraper.is_healthy()))
+                else:
+                    conn.send(('error', f"Comando desconocido: {command}"))
+            except Exception as e:
+                conn.send(('error', str(e)))
+    except (EOFError, KeyboardInterrupt):
+        # El proceso padre cerró la conexión o se interrumpió el programa
+        pass
+    finally:
+        scraper.close()
+        conn.close()
+
+
+class _Shard:
+    """Proceso worker y la porción del catálogo que le corresponde"""
+
+    def __init__(self, index: int, channels: Dict[str, str]):
+        self.index = index
+        self.channels = channels
+        self.process: Optional[multiprocessing.Process] = None
+        self.conn: Optional[Connection] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardedScraper:
+    """
+    Scraper con la misma interfaz que RatingScraper pero repartido en procesos
+
+    Cada worker lanza su propio navegador y atiende un subconjunto fijo de
+    slugs; en cada ciclo todos consultan en paralelo y los resultados se
+    combinan en un único diccionario, que el Orchestrator guarda como una
+    sola fila con un solo TIMESTAMP.
+    """
+
+    def __init__(self, channels: Optional[Dict[str, str]] = None, workers: Optional[int] = None,
+                 cycle_timeout: float = 300.0, start_timeout: float = 120.0,
+                 **scraper_options):
+        """
+        Args:
+            channels: Catálogo completo (nombre -> slug); por defecto RatingScraper.CHANNELS
+            workers: Procesos worker (por defecto uno por núcleo)
+            cycle_timeout: Segundos máximos de espera por los resultados de un ciclo
+            start_timeout: Segundos máximos para que un worker inicie su navegador
+            **scraper_options: Argumentos de RatingScraper para cada worker
+                (headless, backend, base_url, max_concurrency, ...)
+        """
+        self.channels = dict(channels) if channels is not None else dict(RatingScraper.CHANNELS)
+        self.workers = max(1, min(workers or os.cpu_count() or 1, len(self.channels)))
+        self.cycle_timeout = cycle_timeout
+        self.start_timeout = start_timeout
+        self.scraper_options = scraper_options
+        # Playwright no es seguro tras un fork: cada worker arranca un intérprete nuevo
+        self._mp = multiprocessing.get_context('spawn')
+        self.shards = [_Shard(i, shard) for i, shard in enumerate(self._partition())]
+        self.last_timings: Dict[str, float] = {}
+        self.last_changed: Dict[str, bool] = {}
+        self.last_status: Dict[str, str] = {}
+
+    def _partition(self) -> List[Dict[str, str]]:
+        """Reparte los canales en round-robin para equilibrar la carga de cada worker"""
+        shards: List[Dict[str, str]] = [{} for _ in range(self.workers)]
+        for i, (name, slug) in enumerate(self.channels.items()):
+            shards[i % self.workers][name] = slug
+        return shards
+
+    def __enter__(self):
+        """Context manager entry"""
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Context manager exit"""
+        self.close()
+
+    def _start_shard(self, shard: _Shard):
+        """Lanza el proceso de un shard (sin esperar a que esté listo)"""
+        parent_conn, child_conn = self._mp.Pipe()
+        process = self._mp.Process(
+            target=_shard_worker, args=(child_conn, shard.channels, self.scraper_options),
+            name=f"rating-shard-{shard.index}", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        shard.process, shard.conn = process, parent_conn
+
+    def _await_ready(self, shards: List[_Shard]):
+        """Espera la confirmación de inicio de los shards indicados"""
+        deadline = time.monotonic() + self.start_timeout
+        for shard in shards:
+            remaining = max(0.0, deadline - time.monotonic())
+            if not shard.conn.poll(remaining):
+                self._stop_shard(shard)
+                raise RuntimeError(f"El shard {shard.index} no inició en {self.start_timeout:.0f}s")
+            try:
+                status, detail = shard.conn.recv()
+            except (EOFError, OSError):
+                status, detail = 'error', "el proceso terminó durante el inicio"
+            if status != 'ok':
+                self._stop_shard(shard)
+                raise RuntimeError(f"Shard {shard.index}: {detail}")
+
+    def start(self):
+        """Lanza todos los workers en paralelo y espera a que estén listos"""
+        logger.info(f"Iniciando {self.workers} workers para {len(self.channels)} canales...")
+        t0 = time.perf_counter()
+        for shard in self.shards:
+            self._start_shard(shard)
+        try:
+            self._await_ready(self.shards)
+        except Exception:
+            self.close()
+            raise
+        logger.info(f"Workers listos en {time.perf_counter() - t0:.2f}s")
+
+    def _stop_shard(self, shard: _Shard, graceful: bool = False):
+        """Detiene el proceso de un shard"""
+        if shard.conn is not None:
+            if graceful and shard.alive:
+                try:
+                    shard.conn.send(('close', None))
+                except (BrokenPipeError, OSError):
+                    pass
+            shard.conn.close()
+        if shard.process is not None:
+            shard.process.join(timeout=10 if graceful else 0)
+            if shard.process.is_alive():
+                shard.process.terminate()
+                shard.process.join(timeout=5)
+        shard.process, shard.conn = None, None
+
+    def close(self):
+        """Cierra todos los workers (cada uno cierra su navegador)"""
+        for shard in self.shards:
+            self._stop_shard(shard, graceful=True)
+
+    def _ensure_running(self):
+        """Relanza los workers que murieron desde el último ciclo"""
+        dead = [shard for shard in self.shards if not shard.alive]
+        if not dead:
+            return
+        for shard in dead:
+            logger.warning(f"Shard {shard.index} caído, relanzando...")
+            self._stop_shard(shard)
+            self._start_shard(shard)
+        self._await_ready(dead)
+
+    def _broadcast(self, command: str, timeout: float,
+                   arguments: Optional[Dict[int, Any]] = None) -> Dict[int, Any]:
+        """
+        Envía un comando a los shards y junta las respuestas
+
+        Los shards que no responden a tiempo o fallan se detienen (se relanzan
+        en el próximo ciclo) y no aparecen en el resultado.
+
+        Args:
+            command: Comando del worker
+            timeout: Segundos máximos de espera
+            arguments: Argumento por índice de shard; si se indica, solo se
+                envía el comando a esos shards
+
+        Returns:
+            Diccionario índice de shard -> datos de la respuesta
+        """
+        targets = (self.shards if arguments is None
+                   else [s for s in self.shards if s.index in arguments])
+        pending: Dict[Connection, _Shard] = {}
+        for shard in targets:
+            try:
+                shard.conn.send((command, (arguments or {}).get(shard.index)))
+                pending[shard.conn] = shard
+            except (BrokenPipeError, OSError, AttributeError):
+                logger.error(f"Shard {shard.index} no disponible")
+                self._stop_shard(shard)
+
+        replies: Dict[int, Any] = {}
+        deadline = time.monotonic() + timeout
+        while pending:
+            remaining = deadline - time.monotonic()
+            ready = wait(list(pending), timeout=max(0.0, remaining)) if remaining > 0 else []
+            if not ready:
+                for shard in pending.values():
+                    logger.error(f"Shard {shard.index} no respondió '{command}' en {timeout:.0f}s")
+                    self._stop_shard(shard)
+                break
+            for conn in ready:
+                shard = pending.pop(conn)
+                try:
+                    status, detail = conn.recv()
+                except (EOFError, OSError):
+                    logger.error(f"Shard {shard.index} terminó inesperadamente")
+                    self._stop_shard(shard)
+                    continue
+                if status == 'ok':
+                    replies[shard.index] = detail
+                else:
+                    logger.error(f"Shard {shard.index} falló en '{command}': {detail}")
+        return replies
+
+    def scrape_all_channels(self) -> Dict[str, Optional[float]]:
+        """
+        Obtiene los ratings de todo el catálogo repartido entre los workers
+
+        Returns:
+            Diccionario con los ratings de cada canal, en el orden del catálogo
+            (None para los canales de un shard que falló)
+        """
+        return self.scrape_channels(self.channels)
+
+    def scrape_channels(self, channels: Dict[str, str]) -> Dict[str, Optional[float]]:
+        """
+        Obtiene los ratings de un subconjunto del catálogo
+
+        Cada canal se consulta en el worker al que pertenece; los shards sin
+        canales pedidos no reciben trabajo.
+
+        Args:
+            channels: Canales a consultar (nombre -> slug)
+
+        Returns:
+            Diccionario con los ratings de cada canal pedido
+            (None para los canales de un shard que falló)
+        """
+        self._ensure_running()
+        cycle_start = time.perf_counter()
+        subsets: Dict[int, Dict[str, str]] = {}
+        for shard in self.shards:
+            subset = {name: slug for name, slug in channels.items() if name in shard.channels}
+            if subset:
+                subsets[shard.index] = subset
+        replies = self._broadcast('scrape', self.cycle_timeout, arguments=subsets)
+
+        merged: Dict[str, Optional[float]] = {}
+        self.last_timings = {}
+        changed: Dict[str, bool] = {}
+        status: Dict[str, str] = {}
+        for ratings, timings, shard_changed, shard_status in replies.values():
+            merged.update(ratings)
+            self.last_timings.update(timings)
+            changed.update(shard_changed)
+            status.update(shard_status)
+
+        ratings = {name: merged.get(name) for name in channels}
+        # Un shard caído no sabe si su canal cambió: se asume que sí
+        self.last_changed = {name: changed.get(name, True) for name in channels}
+        self.last_status = {name: status.get(name, STATUS_ERROR) for name in channels}
+        obtained = sum(1 for value in ratings.values() if value is not None)
+        logger.info(f"{obtained}/{len(ratings)} canales obtenidos en "
+                    f"{time.perf_counter() - cycle_start:.2f}s con {self.workers} workers")
+        return ratings
+
+    def is_healthy(self) -> bool:
+        """True si todos los workers están vivos y sus navegadores responden"""
+        if not all(shard.alive for shard in self.shards):
+            return False
+        replies = self._broadcast('health', timeout=30)
+        return len(replies) == len(self.shards) and all(replies.values())
+
+    def recycle_context(self):
+        """Pide a cada worker un contexto de navegación limpio"""
+        replies = self._broadcast('recycle', timeout=60)
+        if len(replies) != len(self.shards):
+            raise RuntimeError("No todos los shards pudieron reciclar su contexto")
@@ -0,0 +1,1059 @@
+"""
+Storage - Backends intercambiables para el historial de ratings
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import csv
+import io
+import logging
+import os
+import sqlite3
+import time
+
+from lazy_imports import lazy_import
+from transformer import Transformer
+import long_format
+
+# pandas y numpy se cargan recién al leer: CsvStore.append y SQLiteStore.append
+# (el camino del scraper) no los necesitan
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+TimeBound = Optional[Union[str, datetime, 'pd.Timestamp']]
+DropCallback = Callable[['pd.DataFrame'], None]
+
+
+class RatingStore(ABC):
+    """
+    Interfaz común de almacenamiento
+
+    Las filas tienen el formato de Transformer.transform_ratings: una columna
+    TIMESTAMP (ISO 8601) y una columna por canal. read() siempre devuelve un
+    DataFrame ordenado con TIMESTAMP como datetime64.
+    """
+
+    # Ruta del archivo o directorio (para logs y el dashboard)
+    location: str = ""
+
+    @abstractmethod
+    def append(self, rows: List[Dict[str, Any]]):
+        """
+        Agrega filas al historial
+
+        Args:
+            rows: Filas transformadas
+        """
+
+    def append_frame(self, df: pd.DataFrame):
+        """
+        Agrega un DataFrame completo (carga masiva)
+
+        Args:
+            df: DataFrame con TIMESTAMP y una columna por canal
+        """
+        if df.empty:
+            return
+        df = df.copy()
+        timestamps = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        df['TIMESTAMP'] = timestamps.map(lambda ts: ts.isoformat())
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        self.append(records)
+
+    @abstractmethod
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """
+        Integra un lote histórico (backfill) con una sola pasada de escritura
+
+        Las lecturas se deduplican por TIMESTAMP + canal: una celda que ya
+        tiene rating en el historial se conserva y el lote solo completa las
+        vacías y agrega los TIMESTAMP que faltan, en orden.
+
+        Args:
+            df: DataFrame con TIMESTAMP datetime64 único y ordenado y una columna por canal
+
+        Returns:
+            Lecturas (TIMESTAMP + canal) nuevas
+        """
+
+    @abstractmethod
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Lee el historial en el rango [start, end)
+
+        Args:
+            start: Inicio del rango (inclusive), None = desde el principio
+            end: Fin del rango (exclusivo), None = hasta el final
+
+        Returns:
+            DataFrame ordenado por TIMESTAMP
+        """
+
+    def read_incremental(self, cursor: Any = None) -> Tuple[pd.DataFrame, Any, bool]:
+        """
+        Lee solo lo que llegó después de un cursor devuelto por una lectura previa
+
+        La implementación por defecto usa el último TIMESTAMP visto; los
+        backends pueden usar cursores más baratos (ej: offset en bytes).
+
+        Args:
+            cursor: Cursor de la lectura anterior, o None para leer todo
+
+        Returns:
+            Tupla (filas, cursor nuevo, reset). Si reset es True las filas son el
+            historial completo y reemplazan lo leído antes
+        """
+        if cursor is None:
+            df = self.read()
+            return df, (df['TIMESTAMP'].max() if not df.empty else None), True
+        df = self.read(start=cursor)
+        df = df[df['TIMESTAMP'] > cursor].reset_index(drop=True)
+        return df, (df['TIMESTAMP'].max() if not df.empty else cursor), False
+
+    @abstractmethod
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        """
+        Borra las filas anteriores a cutoff (ver archive.compact)
+
+        Args:
+            cutoff: Las filas con TIMESTAMP < cutoff se eliminan
+            on_drop: Recibe exactamente las filas que se eliminan (formato de
+                read()) antes de que desaparezcan del almacenamiento
+
+        Returns:
+            Filas eliminadas
+        """
+
+    @abstractmethod
+    def exists(self) -> bool:
+        """True si el almacenamiento ya tiene datos"""
+
+    @abstractmethod
+    def size_bytes(self) -> int:
+        """Tamaño en disco del almacenamiento"""
+
+    @staticmethod
+    def _filter_range(df: pd.DataFrame, start: TimeBound, end: TimeBound) -> pd.DataFrame:
+        """Recorta un DataFrame ya parseado al rango [start, end)"""
+        if start is not None:
+            df = df[df['TIMESTAMP'] >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df['TIMESTAMP'] < pd.Timestamp(end)]
+        return df.reset_index(drop=True)
+
+
+def merge_readings(existing: pd.DataFrame,
+                   incoming: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Cruza un lote con las filas del historial en sus mismos TIMESTAMP
+
+    Deduplica por TIMESTAMP + canal: gana la lectura que ya estaba.
+
+    Args:
+        existing: Filas del historial (al menos las del rango del lote)
+        incoming: Lote con TIMESTAMP único
+
+    Returns:
+        Tupla (filas que cambian, ya completas con lo existente; solo las
+        lecturas nuevas de esas filas), ambas ordenadas por TIMESTAMP
+    """
+    channels = [col for col in incoming.columns if col != 'TIMESTAMP']
+    incoming = incoming.set_index('TIMESTAMP')
+    if existing.empty:
+        current = pd.DataFrame(index=incoming.index)
+    else:
+        # Primera lectura no nula de cada canal si el historial repite un TIMESTAMP
+        current = existing.groupby('TIMESTAMP').first().reindex(incoming.index)
+    columns = list(current.columns) + [col for col in channels if col not in current.columns]
+    current = current.reindex(columns=columns).astype('float64')
+
+    new = incoming[channels].where(current[channels].isna())
+    changed = new.notna().any(axis=1).to_numpy()
+    new = new[changed]
+    merged = current[changed].fillna(new.reindex(columns=columns))
+    return merged.reset_index(), new.reset_index()
+
+
+def _count_readings(df: pd.DataFrame) -> int:
+    """Celdas con rating (sin contar TIMESTAMP)"""
+    return int(df.drop(columns='TIMESTAMP').count().sum()) if not df.empty else 0
+
+
+class CsvStore(RatingStore):
+    """CSV plano (formato original); escritura append-only, lectura completa"""
+
+    def __init__(self, filepath: str, fsync: bool = False):
+        """
+        Args:
+            filepath: Ruta del archivo CSV
+            fsync: Si True, fuerza cada escritura a disco
+        """
+        self.filepath = filepath
+        self.location = filepath
+        self.fsync = fsync
+
+    def append(self, rows: List[Dict[str, Any]]):
+        Transformer.append_rows_to_csv(rows, self.filepath, fsync=self.fsync)
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        df = pd.read_csv(self.filepath)
+        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        return self._filter_range(df, start, end)
+
+    def read_incremental(self, cursor: Any = None) -> Tuple[pd.DataFrame, Any, bool]:
+        """
+        Lee solo los bytes agregados desde la última lectura
+
+        El cursor es (st_dev, st_ino, offset, cabecera). Si el archivo fue
+        reemplazado (cambio de esquema, compactación) o truncado, se relee completo.
+        Una fila a medio escribir al final se deja para la próxima lectura.
+        """
+        stat = os.stat(self.filepath)
+        file_id = (stat.st_dev, stat.st_ino)
+
+        if cursor is not None and cursor[:2] == file_id and stat.st_size >= cursor[2]:
+            offset, header = cursor[2], cursor[3]
+            with open(self.filepath, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+            complete = chunk[:chunk.rfind(b'\n') + 1]
+            if not complete:
+                return pd.DataFrame(columns=header), cursor, False
+            df = pd.read_csv(io.BytesIO(complete), header=None, names=header)
+            df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+            return df, (*file_id, offset + len(complete), header), False
+
+        with open(self.filepath, 'rb') as f:
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        if not complete:
+            return pd.DataFrame(), None, True
+        df = pd.read_csv(io.BytesIO(complete))
+        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        return df, (*file_id, len(complete), list(df.columns)), True
+
+    def _read_tail(self, offset: int) -> bytes:
+        """Líneas completas desde un offset en bytes"""
+        with open(self.filepath, 'rb') as f:
+            f.seek(offset)
+            tail = f.read()
+        return tail[:tail.rfind(b'\n') + 1]
+
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        """
+        Reescribe el CSV sin las filas anteriores a cutoff
+
+        Las líneas se filtran por su primer campo sin pasar por pandas; solo
+        las eliminadas se parsean, y solo si hay on_drop.
+
+        Args:
+            cutoff: Las filas con TIMESTAMP < cutoff se eliminan
+            on_drop: Recibe las filas eliminadas antes del reemplazo
+
+        Returns:
+            Filas eliminadas
+        """
+        limit = pd.Timestamp(cutoff).to_pydatetime()
+        offset = 0
+        dropped = []
+
+        def chunks():
+            nonlocal offset
+            with open(self.filepath, 'rb') as f:
+                header = f.readline()
+                yield header
+                kept = []
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    timestamp = line.split(b',', 1)[0].decode('utf-8')
+                    if datetime.fromisoformat(timestamp) < limit:
+                        dropped.append(line)
+                        continue
+                    kept.append(line)
+                    if len(kept) >= 10000:
+                        yield b''.join(kept)
+                        kept = []
+                yield b''.join(kept)
+                # Filas agregadas mientras se filtraba
+                offset = f.tell()
+            if on_drop is not None and dropped:
+                df = pd.read_csv(io.BytesIO(header + b''.join(dropped)))
+                df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+                on_drop(df)
+            while True:
+                tail = self._read_tail(offset)
+                if not tail:
+                    return
+                offset += len(tail)
+                yield tail
+
+        Transformer._atomic_write(self.filepath, chunks(), fsync=self.fsync,
+                                  locked_tail=lambda: [self._read_tail(offset)])
+        Transformer._header_cache.pop(self.filepath, None)
+        logger.info(f"{len(dropped):,} filas anteriores a {limit.isoformat()} "
+                    f"eliminadas de {self.filepath}")
+        return len(dropped)
+
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """
+        Intercala el lote en el CSV en una sola pasada de merge
+
+        Solo se parsean las líneas con un TIMESTAMP del lote, para completar
+        sus celdas vacías; si el lote trae canales nuevos, las demás reciben
+        celdas vacías al final.
+
+        Args:
+            df: Lote con TIMESTAMP único y ordenado (ver RatingStore.merge_frame)
+
+        Returns:
+            Lecturas nuevas
+        """
+        # Una fila sin ninguna lectura no aporta nada: no se inserta vacía
+        df = df.dropna(how='all', subset=[col for col in df.columns if col != 'TIMESTAMP'])
+        if df.empty:
+            return 0
+        header = Transformer._validate_csv(self.filepath)
+        records = df.astype(object).where(df.notna(), None).to_dict('records')
+        for record in records:
+            record['TIMESTAMP'] = record['TIMESTAMP'].isoformat()
+
+        if header is None:
+            columns = list(df.columns)
+            Transformer._atomic_write(self.filepath, [Transformer._format_header(columns),
+                                                      Transformer._format_rows(records, columns)],
+                                      fsync=self.fsync)
+            Transformer._header_cache.pop(self.filepath, None)
+            added = _count_readings(df)
+            logger.info(f"{added:,} lecturas en {len(df):,} filas escritas en {self.filepath}")
+            return added
+
+        columns = header + [col for col in df.columns if col not in header]
+        # Columnas nuevas: las líneas existentes llevan celdas vacías al final
+        pad = b',' * (len(columns) - len(header))
+        lines = Transformer._format_rows(records, columns).splitlines(keepends=True)
+        timestamps = [ts.to_pydatetime() for ts in df['TIMESTAMP']]
+        added = filled = offset = 0
+
+        def padded(line: bytes) -> bytes:
+            return line[:-1] + pad + b'\n' if pad else line
+
+        def chunks():
+            nonlocal added, filled, offset
+            yield Transformer._format_header(columns)
+            i, out = 0, []
+            with open(self.filepath, 'rb') as f:
+                f.readline()
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    timestamp = datetime.fromisoformat(line.split(b',', 1)[0].decode('utf-8'))
+                    while i < len(lines) and timestamps[i] < timestamp:
+                        out.append(lines[i])
+                        added += sum(value is not None for value in records[i].values()) - 1
+                        i += 1
+                    if i < len(lines) and timestamps[i] == timestamp:
+                        fields = next(csv.reader([line.decode('utf-8')]))
+                        fields += [''] * (len(columns) - len(fields))
+                        for j, col in enumerate(columns[1:], start=1):
+                            value = records[i].get(col)
+                            if fields[j] == '' and value is not None:
+                                fields[j] = value
+                                filled += 1
+                        out.append(Transformer._format_rows([dict(zip(columns, fields))], columns))
+                        i += 1
+                    else:
+                        out.append(padded(line))
+                    if len(out) >= 10000:
+                        yield b''.join(out)
+                        out = []
+                out.extend(lines[i:])
+                added += sum(sum(value is not None for value in record.values()) - 1
+                             for record in records[i:])
+                yield b''.join(out)
+                offset = f.tell()
+            # Filas agregadas mientras se intercalaba
+            while True:
+                tail = self._read_tail(offset)
+                if not tail:
+                    return
+                offset += len(tail)
+                yield b''.join(padded(line) for line in tail.splitlines(keepends=True))
+
+        def locked_tail():
+            tail = self._read_tail(offset)
+            yield b''.join(padded(line) for line in tail.splitlines(keepends=True))
+
+        Transformer._atomic_write(self.filepath, chunks(), fsync=self.fsync,
+                                  locked_tail=locked_tail)
+        Transformer._header_cache.pop(self.filepath, None)
+        logger.info(f"{added + filled:,} lecturas nuevas en {self.filepath} "
+                    f"({filled:,} completaron filas existentes)")
+        return added + filled
+
+    def exists(self) -> bool:
+        return Path(self.filepath).exists()
+
+    def size_bytes(self) -> int:
+        return Path(self.filepath).stat().st_size if self.exists() else 0
+
+
+class SQLiteStore(RatingStore):
+    """Tabla SQLite con índice sobre TIMESTAMP; lecturas por rango vía índice"""
+
+    TABLE = "ratings"
+
+    def __init__(self, filepath: str):
+        """
+        Args:
+            filepath: Ruta del archivo .db
+        """
+        self.filepath = filepath
+        self.location = filepath
+
+    def _connect(self) -> sqlite3.Connection:
+        """Abre una conexión en modo WAL (lectores no bloquean al escritor)"""
+        conn = sqlite3.connect(self.filepath, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f'CREATE TABLE IF NOT EXISTS {self.TABLE} ("TIMESTAMP" TEXT NOT NULL)')
+        conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{self.TABLE}_ts '
+                     f'ON {self.TABLE} ("TIMESTAMP")')
+        return conn
+
+    def _columns(self, conn: sqlite3.Connection) -> List[str]:
+        """Columnas actuales de la tabla"""
+        return [row[1] for row in conn.execute(f'PRAGMA table_info({self.TABLE})')]
+
+    def append(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        columns = list(dict.fromkeys(col for row in rows for col in row))
+        conn = self._connect()
+        try:
+            with conn:
+                existing = self._columns(conn)
+                for col in columns:
+                    if col not in existing:
+                        conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "{col}" REAL')
+                        logger.info(f"Columna nueva {col} agregada a {self.filepath}")
+                placeholders = ', '.join('?' for _ in columns)
+                quoted = ', '.join(f'"{col}"' for col in columns)
+                conn.executemany(
+                    f'INSERT INTO {self.TABLE} ({quoted}) VALUES ({placeholders})',
+                    [tuple(row.get(col) for col in columns) for row in rows]
+                )
+        finally:
+            conn.close()
+        logger.info(f"{len(rows)} filas agregadas a {self.filepath}")
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('"TIMESTAMP" >= ?')
+            params.append(pd.Timestamp(start).isoformat())
+        if end is not None:
+            clauses.append('"TIMESTAMP" < ?')
+            params.append(pd.Timestamp(end).isoformat())
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        conn = self._connect()
+        try:
+            df = pd.read_sql_query(
+                f'SELECT * FROM {self.TABLE} {where} ORDER BY "TIMESTAMP"', conn, params=params
+            )
+        finally:
+            conn.close()
+        return self._parse(df)
+
+    @staticmethod
+    def _parse(df: pd.DataFrame) -> pd.DataFrame:
+        """Tipos de read() para filas tal como salen de la tabla"""
+        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        # Una columna solo con NULL (canal sin lecturas) llega como object
+        channels = [col for col in df.columns if col != 'TIMESTAMP']
+        df[channels] = df[channels].astype('float64')
+        return df
+
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        """
+        Lee y borra las filas anteriores a cutoff en una misma transacción
+
+        Args:
+            cutoff: Las filas con TIMESTAMP < cutoff se eliminan
+            on_drop: Recibe las filas eliminadas antes del DELETE
+
+        Returns:
+            Filas eliminadas
+        """
+        limit = pd.Timestamp(cutoff).isoformat()
+        conn = self._connect()
+        try:
+            with conn:
+                # Toma el lock de escritura ya en la lectura: nadie inserta entre ambos pasos
+                conn.execute("BEGIN IMMEDIATE")
+                if on_drop is not None:
+                    old = pd.read_sql_query(f'SELECT * FROM {self.TABLE} WHERE "TIMESTAMP" < ? '
+                                            f'ORDER BY "TIMESTAMP"', conn, params=(limit,))
+                    if not old.empty:
+                        on_drop(self._parse(old))
+                dropped = conn.execute(f'DELETE FROM {self.TABLE} WHERE "TIMESTAMP" < ?',
+                                       (limit,)).rowcount
+            # Devolver al sistema las páginas liberadas
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
+        logger.info(f"{dropped:,} filas eliminadas de {self.filepath}")
+        return dropped
+
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """
+        Completa las filas existentes y agrega las nuevas en una transacción
+
+        Solo se leen las filas del rango del lote (vía índice); las que
+        cambian se actualizan por TIMESTAMP y el resto se inserta en orden.
+
+        Args:
+            df: Lote con TIMESTAMP único y ordenado (ver RatingStore.merge_frame)
+
+        Returns:
+            Lecturas nuevas
+        """
+        if df.empty:
+            return 0
+        conn = self._connect()
+        try:
+            with conn:
+                existing_columns = self._columns(conn)
+                for col in df.columns:
+                    if col not in existing_columns:
+                        conn.execute(f'ALTER TABLE {self.TABLE} ADD COLUMN "{col}" REAL')
+                        logger.info(f"Columna nueva {col} agregada a {self.filepath}")
+                existing = pd.read_sql_query(
+                    f'SELECT * FROM {self.TABLE} WHERE "TIMESTAMP" >= ? AND "TIMESTAMP" <= ?', conn,
+                    params=(df['TIMESTAMP'].iloc[0].isoformat(),
+                            df['TIMESTAMP'].iloc[-1].isoformat())
+                )
+                # Texto tal como está guardado, para actualizar por igualdad
+                parsed = pd.to_datetime(existing['TIMESTAMP'], format='ISO8601')
+                stored = dict(zip(parsed, existing['TIMESTAMP']))
+                existing['TIMESTAMP'] = parsed
+                merged, new = merge_readings(existing, df)
+
+                channels = [col for col in merged.columns if col != 'TIMESTAMP']
+                quoted = ', '.join(f'"{col}"' for col in channels)
+                values = merged[channels].astype(object).where(merged[channels].notna(), None)
+                updates, inserts = [], []
+                for timestamp, row in zip(merged['TIMESTAMP'], values.itertuples(index=False)):
+                    if timestamp in stored:
+                        updates.append((*row, stored[timestamp]))
+                    else:
+                        inserts.append((timestamp.isoformat(), *row))
+                assignments = ', '.join(f'"{col}" = ?' for col in channels)
+                conn.executemany(
+                    f'UPDATE {self.TABLE} SET {assignments} WHERE "TIMESTAMP" = ?', updates)
+                conn.executemany(
+                    f'INSERT INTO {self.TABLE} ("TIMESTAMP", {quoted}) '
+                    f'VALUES ({", ".join("?" for _ in range(len(channels) + 1))})',
+                    inserts
+                )
+        finally:
+            conn.close()
+        added = _count_readings(new)
+        logger.info(f"{added:,} lecturas nuevas en {self.filepath} "
+                    f"({len(updates):,} filas completadas, {len(inserts):,} agregadas)")
+        return added
+
+    def exists(self) -> bool:
+        return Path(self.filepath).exists()
+
+    def size_bytes(self) -> int:
+        total = 0
+        for suffix in ('', '-wal'):
+            path = Path(self.filepath + suffix)
+            if path.exists():
+                total += path.stat().st_size
+        return total
+
+
+class ParquetStore(RatingStore):
+    """
+    Parquet particionado por día (directorio date=YYYY-MM-DD por partición)
+
+    Cada append escribe un archivo pequeño en su partición; cuando una
+    partición acumula demasiados archivos se compacta en uno solo. Las lecturas
+    por rango solo abren las particiones que se solapan con el rango.
+    Requiere pyarrow.
+    """
+
+    def __init__(self, directory: str, max_files_per_partition: int = 48):
+        """
+        Args:
+            directory: Directorio raíz del dataset
+            max_files_per_partition: Archivos por partición antes de compactar
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as e:
+            raise ImportError("ParquetStore requiere pyarrow: pip install pyarrow") from e
+        self.directory = Path(directory)
+        self.location = str(directory)
+        self.max_files_per_partition = max_files_per_partition
+
+    def _partition_dir(self, day: str) -> Path:
+        return self.directory / f"date={day}"
+
+    def _write_file(self, df: pd.DataFrame, partition: Path):
+        """Escribe un archivo Parquet en la partición de forma atómica"""
+        partition.mkdir(parents=True, exist_ok=True)
+        final_path = partition / f"part-{time.time_ns()}.parquet"
+        tmp_path = partition / f".{final_path.name}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, final_path)
+
+    def _lock(self):
+        """
+        Lock exclusivo del dataset (<directorio>.lock) para quien reemplaza archivos
+
+        Los append solo crean archivos nuevos y no lo toman; compactar,
+        recortar e integrar un lote borran los archivos que leyeron, así que se
+        excluyen entre sí (ver Transformer.file_lock).
+        """
+        self.directory.parent.mkdir(parents=True, exist_ok=True)
+        return Transformer.file_lock(str(self.directory), exclusive=True)
+
+    def _compact(self, partition: Path):
+        """Une todos los archivos de una partición en uno solo"""
+        if len(list(partition.glob("part-*.parquet"))) <= self.max_files_per_partition:
+            return
+        with self._lock():
+            files = sorted(partition.glob("part-*.parquet"))
+            if len(files) <= self.max_files_per_partition:
+                return
+            merged = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+            merged = merged.sort_values('TIMESTAMP', kind='stable')
+            self._write_file(merged, partition)
+            for f in files:
+                f.unlink()
+        logger.info(f"Partición {partition.name} compactada ({len(files)} archivos)")
+
+    def append(self, rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        self.append_frame(pd.DataFrame(rows))
+
+    def append_frame(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        df = df.copy()
+        df['TIMESTAMP'] = pd.to_datetime(df['TIMESTAMP'], format='ISO8601')
+        channels = [col for col in df.columns if col != 'TIMESTAMP']
+        df[channels] = df[channels].astype('float64')
+        for day, group in df.groupby(df['TIMESTAMP'].dt.strftime('%Y-%m-%d'), sort=True):
+            partition = self._partition_dir(day)
+            self._write_file(group, partition)
+            self._compact(partition)
+        logger.info(f"{len(df)} filas agregadas a {self.directory}")
+
+    def _partitions(self, start: TimeBound, end: TimeBound) -> List[Path]:
+        """Particiones que se solapan con el rango [start, end)"""
+        if not self.directory.exists():
+            return []
+        start_day = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+        end_day = pd.Timestamp(end).strftime('%Y-%m-%d') if end is not None else None
+        selected = []
+        for partition in sorted(self.directory.glob("date=*")):
+            day = partition.name[len("date="):]
+            if start_day is not None and day < start_day:
+                continue
+            if end_day is not None and day > end_day:
+                continue
+            selected.append(partition)
+        return selected
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        frames = []
+        for partition in self._partitions(start, end):
+            for f in sorted(partition.glob("part-*.parquet")):
+                try:
+                    frames.append(pd.read_parquet(f))
+                except FileNotFoundError:
+                    # Compactado mientras se leía: el archivo nuevo ya está en la lista
+                    continue
+        if not frames:
+            return pd.DataFrame(columns=['TIMESTAMP'])
+        df = pd.concat(frames, ignore_index=True)
+        # Una compactación en curso puede dejar la misma fila en el archivo
+        # compactado y en el original; gana la del archivo más nuevo
+        df = (df.sort_values('TIMESTAMP', kind='stable')
+                .drop_duplicates(subset='TIMESTAMP', keep='last'))
+        return self._filter_range(df, start, end)
+
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        """
+        Borra las particiones anteriores al día de cutoff y recorta la de ese día
+
+        Solo se borran los archivos leídos; un append concurrente escribe un
+        archivo nuevo que no se toca.
+
+        Args:
+            cutoff: Las filas con TIMESTAMP < cutoff se eliminan
+            on_drop: Recibe las filas eliminadas antes de borrar los archivos
+
+        Returns:
+            Filas eliminadas
+        """
+        cutoff = pd.Timestamp(cutoff)
+        changes, removed = [], []
+        with self._lock():
+            for partition in self._partitions(None, cutoff):
+                files = sorted(partition.glob("part-*.parquet"))
+                if not files:
+                    continue
+                df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+                old = df['TIMESTAMP'] < cutoff
+                if old.any():
+                    changes.append((partition, files, df[~old]))
+                    removed.append(df[old])
+            if on_drop is not None and removed:
+                on_drop(pd.concat(removed, ignore_index=True)
+                          .sort_values('TIMESTAMP', kind='stable').reset_index(drop=True))
+            for partition, files, keep in changes:
+                if not keep.empty:
+                    self._write_file(keep, partition)
+                for f in files:
+                    f.unlink()
+                if keep.empty and not any(partition.iterdir()):
+                    partition.rmdir()
+        dropped = sum(len(df) for df in removed)
+        logger.info(f"{dropped:,} filas eliminadas de {self.directory}")
+        return dropped
+
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """
+        Reescribe cada partición afectada una sola vez, ya combinada con el lote
+
+        Args:
+            df: Lote con TIMESTAMP único y ordenado (ver RatingStore.merge_frame)
+
+        Returns:
+            Lecturas nuevas
+        """
+        added = 0
+        with self._lock():
+            for day, group in df.groupby(df['TIMESTAMP'].dt.strftime('%Y-%m-%d'), sort=True):
+                partition = self._partition_dir(day)
+                files = sorted(partition.glob("part-*.parquet"))
+                existing = (pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+                              .sort_values('TIMESTAMP', kind='stable')
+                              .drop_duplicates(subset='TIMESTAMP', keep='last')
+                            if files else pd.DataFrame(columns=['TIMESTAMP']))
+                merged, new = merge_readings(existing, group)
+                if merged.empty:
+                    continue
+                kept = existing[~existing['TIMESTAMP'].isin(merged['TIMESTAMP'])]
+                combined = (pd.concat([frame for frame in (kept, merged) if not frame.empty],
+                                      ignore_index=True)
+                              .sort_values('TIMESTAMP', kind='stable'))
+                channels = [col for col in combined.columns if col != 'TIMESTAMP']
+                combined[channels] = combined[channels].astype('float64')
+                self._write_file(combined, partition)
+                for f in files:
+                    f.unlink()
+                added += _count_readings(new)
+        logger.info(f"{added:,} lecturas nuevas en {self.directory}")
+        return added
+
+    def exists(self) -> bool:
+        return any(self.directory.glob("date=*/part-*.parquet"))
+
+    def size_bytes(self) -> int:
+        return sum(f.stat().st_size for f in self.directory.glob("date=*/part-*.parquet"))
+
+
+class LongStore(RatingStore):
+    """
+    Registros binarios en formato largo: (ts int64 en µs, canal uint16, rating float32)
+
+    Cada lectura de un canal ocupa 14 bytes de ancho fijo, así que leer el
+    historial es un np.fromfile sin parseo de texto ni de fechas. Los nombres
+    de canal van en un archivo aparte (<archivo>.channels, un nombre por
+    línea cuyo número es el código); un canal nuevo solo agrega una línea
+    ahí, el historial nunca se reescribe. Los ratings faltantes son NaN.
+    """
+
+    def __init__(self, filepath: str, fsync: bool = False, zero_as_null: bool = False):
+        """
+        Args:
+            filepath: Ruta del archivo de registros
+            fsync: Si True, fuerza cada escritura a disco
+            zero_as_null: Si True, append_frame trata los 0.0 como nulos
+                (útil al migrar historiales donde None se guardaba como 0.0)
+        """
+        self.filepath = filepath
+        self.channels_path = f"{filepath}.channels"
+        self.location = filepath
+        self.fsync = fsync
+        self.zero_as_null = zero_as_null
+
+    def channels(self) -> List[str]:
+        """Diccionario de canales (el índice es el código guardado)"""
+        try:
+            with open(self.channels_path, encoding='utf-8') as f:
+                return [line.rstrip('\n') for line in f if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _codes_for(self, names: List[str]) -> Dict[str, int]:
+        """Códigos de los canales, registrando los nuevos antes de escribir registros"""
+        known = self.channels()
+        new = [name for name in dict.fromkeys(names) if name not in known]
+        if new:
+            with open(self.channels_path, 'a', encoding='utf-8') as f:
+                f.write(''.join(f"{name}\n" for name in new))
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+            known += new
+            logger.info(f"Canales nuevos registrados en {self.channels_path}: {new}")
+        return {name: code for code, name in enumerate(known)}
+
+    def _write_records(self, payload: bytes):
+        """Agrega registros ya serializados con una sola escritura O_APPEND"""
+        # Exclusivo: read_incremental lee con el compartido y nunca ve una fila a medias
+        with Transformer.file_lock(self.filepath, exclusive=True):
+            fd = os.open(self.filepath, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                # Un corte a mitad de escritura deja un registro parcial: descartarlo
+                # para que los siguientes queden alineados
+                size = os.fstat(fd).st_size
+                if size % long_format.RECORD_SIZE:
+                    logger.warning(f"Registro incompleto al final de {self.filepath}, se descarta")
+                    os.ftruncate(fd, size - size % long_format.RECORD_SIZE)
+                Transformer._write_all(fd, payload)
+                if self.fsync:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def append(self, rows: List[Dict[str, Any]]):
+        records = long_format.rows_to_records(rows)
+        if not records:
+            return
+        codes = self._codes_for([r['channel'] for r in records])
+        # struct en vez de numpy: el append de cada ciclo no carga numpy ni pandas
+        self._write_records(long_format.pack_records(records, codes))
+
+    def _to_records(self, df: pd.DataFrame) -> np.ndarray:
+        """Filas anchas -> registros binarios (registra los canales nuevos)"""
+        long = long_format.wide_to_long(df, zero_as_null=self.zero_as_null)
+        codes = self._codes_for(list(long['channel'].cat.categories))
+        array = np.empty(len(long), dtype=long_format.RECORD_DTYPE)
+        array['ts'] = long['ts'].to_numpy()
+        mapping = np.array([codes[name] for name in long['channel'].cat.categories],
+                           dtype=np.uint16)
+        array['channel'] = mapping[long['channel'].cat.codes.to_numpy()]
+        array['rating'] = long['rating'].to_numpy()
+        return array
+
+    def append_frame(self, df: pd.DataFrame):
+        if df.empty:
+            return
+        self._write_records(self._to_records(df).tobytes())
+
+    def _frame(self, records: np.ndarray) -> pd.DataFrame:
+        """Registros crudos -> DataFrame largo con channel categórico"""
+        return pd.DataFrame({
+            'ts': records['ts'],
+            'channel': pd.Categorical.from_codes(records['channel'].astype(np.int32),
+                                                 categories=self.channels()),
+            'rating': records['rating'],
+        })
+
+    def _read_records(self, offset: int = 0) -> np.ndarray:
+        """Registros completos desde un offset en bytes"""
+        count = (os.path.getsize(self.filepath) - offset) // long_format.RECORD_SIZE
+        return np.fromfile(self.filepath, dtype=long_format.RECORD_DTYPE, count=max(0, count),
+                           offset=offset)
+
+    def read_long(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        """
+        Lee el historial en formato largo con tipos compactos
+
+        Args:
+            start: Inicio del rango (inclusive)
+            end: Fin del rango (exclusivo)
+
+        Returns:
+            DataFrame con ts (int64, µs), channel (category) y rating (float32)
+        """
+        records = self._read_records()
+        if start is not None:
+            records = records[records['ts'] >= pd.Timestamp(start).value // 10**3]
+        if end is not None:
+            records = records[records['ts'] < pd.Timestamp(end).value // 10**3]
+        return self._frame(records)
+
+    def read(self, start: TimeBound = None, end: TimeBound = None) -> pd.DataFrame:
+        return long_format.long_to_wide(self.read_long(start, end), channels=self.channels())
+
+    def read_incremental(self, cursor: Any = None) -> Tuple[pd.DataFrame, Any, bool]:
+        """
+        Lee solo los registros agregados desde la última lectura
+
+        El cursor es (st_dev, st_ino, offset). Un append con varios registros
+        puede verse a medias si la lectura lo alcanza en curso; por eso se lee
+        con el lock compartido del archivo, que los append toman exclusivo, y
+        los registros leídos siempre forman filas anchas completas. El lector
+        no crea el archivo de lock: si no existe, nadie escribió con él.
+        """
+        with Transformer.file_lock(self.filepath, create=False):
+            stat = os.stat(self.filepath)
+            file_id = (stat.st_dev, stat.st_ino)
+            reset = cursor is None or cursor[:2] != file_id or stat.st_size < cursor[2]
+            offset = 0 if reset else cursor[2]
+            records = self._read_records(offset)
+        df = long_format.long_to_wide(self._frame(records), channels=self.channels())
+        return df, (*file_id, offset + len(records) * long_format.RECORD_SIZE), reset
+
+    def drop_before(self, cutoff: TimeBound, on_drop: Optional[DropCallback] = None) -> int:
+        """
+        Reescribe el archivo de registros sin los anteriores a cutoff
+
+        Args:
+            cutoff: Los registros con ts < cutoff se eliminan
+            on_drop: Recibe las filas anchas eliminadas antes del reemplazo
+
+        Returns:
+            Registros eliminados
+        """
+        limit = pd.Timestamp(cutoff).value // 10**3
+        records = self._read_records()
+        old = records['ts'] < limit
+        keep = records[~old]
+        offset = len(records) * long_format.RECORD_SIZE
+        if on_drop is not None and old.any():
+            on_drop(long_format.long_to_wide(self._frame(records[old]), channels=self.channels()))
+
+        def chunks():
+            yield keep.tobytes()
+            # Registros agregados mientras se filtraba
+            nonlocal offset
+            while True:
+                tail = self._read_records(offset)
+                if not len(tail):
+                    return
+                offset += len(tail) * long_format.RECORD_SIZE
+                yield tail.tobytes()
+
+        Transformer._atomic_write(self.filepath, chunks(), fsync=self.fsync,
+                                  locked_tail=lambda: [self._read_records(offset).tobytes()])
+        dropped = len(records) - len(keep)
+        logger.info(f"{dropped:,} registros eliminados de {self.filepath}")
+        return dropped
+
+    def merge_frame(self, df: pd.DataFrame) -> int:
+        """
+        Agrega solo las lecturas que faltan y reescribe los registros en orden
+
+        Completar una fila es agregar los registros de sus celdas vacías; el
+        archivo se reordena por ts con un sort estable.
+
+        Args:
+            df: Lote con TIMESTAMP único y ordenado (ver RatingStore.merge_frame)
+
+        Returns:
+            Lecturas nuevas
+        """
+        if df.empty:
+            return 0
+        exists = self.exists()
+        end = df['TIMESTAMP'].iloc[-1] + pd.Timedelta(1, 'us')
+        existing = (self.read(df['TIMESTAMP'].iloc[0], end) if exists
+                    else pd.DataFrame(columns=['TIMESTAMP']))
+        _, new = merge_readings(existing, df)
+        if new.empty:
+            return 0
+        incoming = self._to_records(new)
+        # Sin registros NaN: en la lectura gana el último y taparían los existentes
+        incoming = incoming[~np.isnan(incoming['rating'])]
+        records = self._read_records() if exists else np.empty(0, dtype=long_format.RECORD_DTYPE)
+        offset = len(records) * long_format.RECORD_SIZE
+        combined = np.concatenate([records, incoming])
+        combined = combined[np.argsort(combined['ts'], kind='stable')]
+
+        def chunks():
+            yield combined.tobytes()
+            # Registros agregados mientras se ordenaba
+            nonlocal offset
+            while self.exists():
+                tail = self._read_records(offset)
+                if not len(tail):
+                    return
+                offset += len(tail) * long_format.RECORD_SIZE
+                yield tail.tobytes()
+
+        def locked_tail():
+            if self.exists():
+                yield self._read_records(offset).tobytes()
+
+        Transformer._atomic_write(self.filepath, chunks(), fsync=self.fsync,
+                                  locked_tail=locked_tail)
+        logger.info(f"{len(incoming):,} lecturas nuevas en {self.filepath}")
+        return len(incoming)
+
+    def exists(self) -> bool:
+        return Path(self.filepath).exists()
+
+    def size_bytes(self) -> int:
+        return Path(self.filepath).stat().st_size if self.exists() else 0
+
+
+STORAGE_BACKENDS = {
+    'csv': CsvStore,
+    'long': LongStore,
+    'sqlite': SQLiteStore,
+    'parquet': ParquetStore,
+}
+
+
+def create_store(backend: str, path: str, **kwargs) -> RatingStore:
+    """
+    Crea un backend de almacenamiento por nombre
+
+    Args:
+        backend: 'csv', 'long', 'sqlite' o 'parquet'
+        path: Archivo (csv/long/sqlite) o directorio (parquet)
+        **kwargs: Opciones del backend
+
+    Returns:
+        Instancia de RatingStore
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"Backend de almacenamiento desconocido: {backend}. "
+                         f"Opciones: {list(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[backend](path, **kwargs)
+
+
+def migrate_csv(csv_path: str, target: RatingStore, chunksize: int = 100000) -> int:
+    """
+    Copia un CSV existente a otro backend por bloques
+
+    Args:
+        csv_path: CSV de origen
+        target: Almacenamiento destino
+        chunksize: Filas por bloque
+
+    Returns:
+        Número de filas migradas
+    """
+    total = 0
+    for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+        target.append_frame(chunk)
+        total += len(chunk)
+        logger.info(f"{total:,} filas migradas...")
+    return total
@@ -1,10 +1,27 @@
 """
 Transformer - Clase para transformar y formatear datos de ratings
 """
+from __future__ import annotations
+
+from contextlib import contextmanager, nullcontext
 from datetime import datetime
-from typing import Dict, Optional, List
-import pandas as pd
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, Tuple
+import csv
+import io
 import logging
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin locks entre procesos
+    fcntl = None
+
+from lazy_imports import lazy_import
+from metrics import METRICS
+
+# Solo to_dataframe usa pandas; el append del CSV usa el módulo csv
+pd = lazy_import('pandas')
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +45,7 @@ class Transformer:
         Transforma los datos de ratings al formato requerido:
         - Columnas en mayúsculas sin espacios
         - Rating como float (preserva decimales)
+        - Canales sin lectura como None (celda vacía / NULL), nunca 0.0
         - Timestamp agregado
         
         Args:
@@ -43,13 +61,101 @@ class Transformer:
         transformed = {'TIMESTAMP': timestamp}
         
         for channel, rating in ratings.items():
-            # Mantener rating como float (0.0 si es None)
-            rating_float = float(rating) if rating is not None else 0.0
-            transformed[channel] = rating_float
+            # Un 0.0 sería indistinguible de un rating real; el motivo del
+            # faltante queda en last_status del scraper
+            transformed[channel] = float(rating) if rating is not None else None
             
         logger.info(f"Datos transformados: {transformed}")
         return transformed
-    
+
+    @staticmethod
+    def transform_frame(df: pd.DataFrame, renames: Optional[Dict[str, str]] = None) -> pd.DataFrame:
+        """
+        Versión por bloques de transform_ratings para cargas masivas
+
+        Mismas reglas que una fila del scraper, aplicadas a un DataFrame:
+        - Columnas en mayúsculas sin espacios (o renombradas con renames)
+        - Rating como float; celdas vacías o no numéricas como NaN, nunca 0.0
+        - TIMESTAMP como datetime64; las filas sin fecha válida se descartan
+
+        Args:
+            df: Bloque con una columna de fecha (TIMESTAMP, sin importar
+                mayúsculas) y una columna por canal
+            renames: Columna normalizada -> nombre de canal (ej: {'CHILEVISION': 'CHV'})
+
+        Returns:
+            DataFrame con TIMESTAMP y una columna float64 por canal
+        """
+        renames = renames or {}
+        columns = {}
+        for col in df.columns:
+            name = ''.join(str(col).split()).upper()
+            columns[col] = renames.get(name, name)
+        df = df.rename(columns=columns)
+        df = df.loc[:, ~df.columns.duplicated()]
+
+        timestamps = Transformer._parse_local_timestamps(df['TIMESTAMP'])
+        transformed = pd.DataFrame({'TIMESTAMP': timestamps})
+        for channel in df.columns:
+            if channel != 'TIMESTAMP':
+                transformed[channel] = pd.to_numeric(df[channel], errors='coerce').astype('float64')
+
+        invalid = transformed['TIMESTAMP'].isna()
+        if invalid.any():
+            logger.warning(f"{int(invalid.sum())} filas sin TIMESTAMP válido descartadas")
+            transformed = transformed[~invalid]
+        return transformed.reset_index(drop=True)
+
+    @staticmethod
+    def _parse_local_timestamps(values: pd.Series) -> pd.Series:
+        """
+        Parsea fechas ISO 8601 a datetime64 en hora local sin zona
+
+        El historial guarda la hora local sin zona (generate_timestamp); las
+        fechas con desfase (Z, -03:00) se pasan a la zona local del sistema y
+        se les quita la zona, así un lote exportado en UTC se cruza con las
+        mismas filas del historial. Las fechas no válidas quedan como NaT.
+
+        Args:
+            values: Columna de fechas (texto o datetime64)
+
+        Returns:
+            Serie datetime64 sin zona
+        """
+        from dateutil.tz import tzlocal
+
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            return values.dt.tz_convert(tzlocal()).dt.tz_localize(None)
+        if pd.api.types.is_datetime64_dtype(values):
+            return values
+        text = values.astype(str).str.strip()
+        aware = text.str.contains(r'\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)$')
+        parsed = pd.to_datetime(text.where(~aware), format='ISO8601', errors='coerce')
+        if aware.any():
+            # utc=True admite desfases mixtos (cambio de horario dentro del lote)
+            aware_utc = pd.to_datetime(text[aware], format='ISO8601', errors='coerce', utc=True)
+            parsed[aware] = aware_utc.dt.tz_convert(tzlocal()).dt.tz_localize(None)
+        return parsed
+
+    @staticmethod
+    def to_change_events(ratings: Dict[str, Optional[float]],
+                         timestamp: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Convierte lecturas de canales a eventos en formato largo
+        (una fila TIMESTAMP, CHANNEL, RATING por canal)
+
+        Args:
+            ratings: Diccionario con ratings por canal (solo los que cambiaron)
+            timestamp: Timestamp opcional (se genera si no se proporciona)
+
+        Returns:
+            Lista de eventos; los canales sin lectura se omiten
+        """
+        if timestamp is None:
+            timestamp = Transformer.generate_timestamp()
+        return [{'TIMESTAMP': timestamp, 'CHANNEL': channel, 'RATING': float(rating)}
+                for channel, rating in ratings.items() if rating is not None]
+
     @staticmethod
     def to_dataframe(transformed_data: Dict[str, any]) -> pd.DataFrame:
         """
@@ -63,28 +169,334 @@ class Transformer:
         """
         return pd.DataFrame([transformed_data])
     
+    # Cabecera validada por archivo: (st_dev, st_ino) para detectar reemplazos del
+    # archivo por otro proceso, columnas y la línea tal como está escrita
+    _header_cache: Dict[str, Tuple[Tuple[int, int], List[str], bytes]] = {}
+
     @staticmethod
-    def append_to_csv(data: Dict[str, any], filepath: str):
+    def _format_rows(rows: List[Dict[str, Any]], header: List[str]) -> bytes:
         """
-        Agrega los datos al archivo CSV (crea el archivo si no existe)
-        
+        Serializa filas a CSV respetando el orden de la cabecera
+
+        Args:
+            rows: Filas a serializar
+            header: Columnas del archivo
+
+        Returns:
+            Bytes listos para escribir
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        for row in rows:
+            writer.writerow(['' if row.get(col) is None else row.get(col) for col in header])
+        return buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def _format_header(header: List[str]) -> bytes:
+        """Serializa la línea de cabecera del CSV"""
+        return Transformer._format_rows([dict(zip(header, header))], header)
+
+    @staticmethod
+    def _write_all(fd: int, payload: bytes):
+        """Escribe el buffer completo en el descriptor (os.write puede ser parcial)"""
+        view = memoryview(payload)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+
+    @staticmethod
+    def _fsync_dir(filepath: str):
+        """Sincroniza el directorio para que un os.replace sobreviva a un corte"""
+        if os.name != 'posix':
+            return
+        dir_fd = os.open(os.path.dirname(os.path.abspath(filepath)), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+    @staticmethod
+    @contextmanager
+    def file_lock(filepath: str, exclusive: bool = False, create: bool = True) -> Iterator[None]:
+        """
+        Lock entre procesos sobre <archivo>.lock
+
+        Los append del CSV y de LongStore toman el exclusivo (así pueden
+        reparar una fila truncada sin pisar un append en curso); quien
+        reescribe el archivo lo toma para copiar la última cola y hacer el
+        os.replace, así ningún append cae en el inode que se descarta. Sin
+        fcntl (Windows) no bloquea.
+
+        Args:
+            filepath: Archivo protegido
+            exclusive: True para excluir a todos los demás, False para compartir
+            create: False para lectores: si <archivo>.lock no existe o no se
+                puede abrir (montaje de solo lectura) no se bloquea, porque
+                tampoco hay un escritor con el lock
+        """
+        if fcntl is None:
+            yield
+            return
+        flags = (os.O_RDWR | os.O_CREAT) if create else os.O_RDONLY
+        try:
+            fd = os.open(f"{filepath}.lock", flags, 0o644)
+        except OSError:
+            if create:
+                raise
+            fd = None
+        if fd is None:
+            yield
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            # Cerrar el descriptor libera el lock
+            os.close(fd)
+
+    @staticmethod
+    def _atomic_write(filepath: str, chunks: Iterable[bytes], fsync: bool = False,
+                      locked_tail: Optional[Callable[[], Iterable[bytes]]] = None):
+        """
+        Escribe un archivo completo en un temporal y lo reemplaza de forma atómica
+
+        Args:
+            filepath: Ruta destino
+            chunks: Bloques de bytes a escribir
+            fsync: Si True, fuerza los datos a disco antes del reemplazo
+            locked_tail: Bloques finales (lo agregado al archivo original
+                mientras se copiaba) que se leen con el lock exclusivo tomado
+                hasta el reemplazo (ver file_lock)
+        """
+        directory = os.path.dirname(os.path.abspath(filepath))
+        fd, tmp_path = tempfile.mkstemp(prefix='.tmp-', suffix='.csv', dir=directory)
+        try:
+            for chunk in chunks:
+                Transformer._write_all(fd, chunk)
+            with Transformer.file_lock(filepath, exclusive=True) if locked_tail else nullcontext():
+                for chunk in locked_tail() if locked_tail else ():
+                    Transformer._write_all(fd, chunk)
+                if fsync:
+                    os.fsync(fd)
+                os.close(fd)
+                fd = -1
+                os.replace(tmp_path, filepath)
+            if fsync:
+                Transformer._fsync_dir(filepath)
+        except BaseException:
+            if fd >= 0:
+                os.close(fd)
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _repair_tail(fd: int, filepath: str):
+        """
+        Descarta una última fila sin salto de línea (escritura interrumpida por un corte)
+
+        Se llama con el lock exclusivo tomado: nadie más está escribiendo, así
+        que una línea sin terminar no es un append en curso de otro proceso.
+
+        Args:
+            fd: Descriptor del CSV abierto para lectura y escritura
+            filepath: Ruta del archivo (para el log)
+        """
+        end = os.fstat(fd).st_size
+        if end == 0:
+            return
+        os.lseek(fd, end - 1, os.SEEK_SET)
+        if os.read(fd, 1) == b'\n':
+            return
+        block = 64 * 1024
+        pos = end
+        while pos > 0:
+            start = max(0, pos - block)
+            os.lseek(fd, start, os.SEEK_SET)
+            idx = os.read(fd, pos - start).rfind(b'\n')
+            if idx >= 0:
+                pos = start + idx + 1
+                break
+            pos = start
+        logger.warning(f"Fila incompleta detectada en {filepath}, se descartan {end - pos} bytes")
+        os.ftruncate(fd, pos)
+
+    @staticmethod
+    def _validate_csv(filepath: str) -> Optional[List[str]]:
+        """
+        Lee la cabecera del CSV
+
+        Solo se ejecuta una vez por archivo; el resultado queda en cache
+        mientras el archivo no sea reemplazado. Una última fila truncada se
+        repara en cada append, con el lock tomado (ver _repair_tail).
+
         Args:
-            data: Datos transformados
             filepath: Ruta del archivo CSV
+
+        Returns:
+            Lista de columnas, o None si el archivo no existe o está vacío
         """
-        df = Transformer.to_dataframe(data)
-        
         try:
-            # Intentar leer el CSV existente
-            existing_df = pd.read_csv(filepath)
-            # Concatenar con los nuevos datos
-            combined_df = pd.concat([existing_df, df], ignore_index=True)
-            combined_df.to_csv(filepath, index=False)
-            logger.info(f"Datos agregados a {filepath}")
+            stat = os.stat(filepath)
         except FileNotFoundError:
-            # Si el archivo no existe, crearlo
-            df.to_csv(filepath, index=False)
-            logger.info(f"Archivo CSV creado: {filepath}")
+            Transformer._header_cache.pop(filepath, None)
+            return None
+
+        file_id = (stat.st_dev, stat.st_ino)
+        cached = Transformer._header_cache.get(filepath)
+        if cached and cached[0] == file_id:
+            return cached[1]
+
+        if stat.st_size == 0:
+            return None
+
+        with open(filepath, 'rb') as f:
+            header_line = f.readline()
+        if not header_line.endswith(b'\n'):
+            # Ni siquiera la cabecera alcanzó a escribirse completa
+            return None
+        header = next(csv.reader([header_line.decode('utf-8-sig')]))
+
+        Transformer._header_cache[filepath] = (file_id, header, header_line)
+        return header
+
+    @staticmethod
+    def append_rows_to_csv(rows: List[Dict[str, Any]], filepath: str, fsync: bool = False):
+        """
+        Agrega varias filas al CSV escribiendo solo los bytes nuevos
+
+        La cabecera se valida una vez por archivo. Las filas se escriben con una
+        sola llamada en modo O_APPEND y el lock exclusivo, por lo que un corte a
+        lo sumo deja una fila incompleta que el siguiente append descarta. Crear el
+        archivo o agregarle columnas (una reescritura atómica) se hace con el
+        lock exclusivo; si el archivo cambió entre la validación y el append, se
+        vuelve a validar.
+
+        Args:
+            rows: Filas transformadas
+            filepath: Ruta del archivo CSV
+            fsync: Si True, fuerza los datos a disco tras cada escritura
+        """
+        if not rows:
+            return
+
+        columns = list(dict.fromkeys(col for row in rows for col in row))
+
+        try:
+            while True:
+                header = Transformer._validate_csv(filepath)
+                if header is None or any(col not in header for col in columns):
+                    # Crear o ampliar el archivo excluye a los demás escritores de principio a fin
+                    with Transformer.file_lock(filepath, exclusive=True):
+                        if Transformer._create_or_extend(filepath, columns, rows, fsync):
+                            return
+                    continue
+
+                with METRICS.span('csv_append'), Transformer.file_lock(filepath, exclusive=True):
+                    fd = os.open(filepath, os.O_RDWR | os.O_APPEND)
+                    try:
+                        stat = os.fstat(fd)
+                        cached = Transformer._header_cache.get(filepath)
+                        os.lseek(fd, 0, os.SEEK_SET)
+                        if (not cached or cached[0] != (stat.st_dev, stat.st_ino)
+                                or os.read(fd, len(cached[2])) != cached[2]):
+                            # Reemplazado entre la validación y el lock (el inode nuevo
+                            # puede reusar el número del anterior): la cabecera puede ser otra
+                            Transformer._header_cache.pop(filepath, None)
+                            continue
+                        Transformer._repair_tail(fd, filepath)
+                        Transformer._write_all(fd, Transformer._format_rows(rows, header))
+                        if fsync:
+                            os.fsync(fd)
+                    finally:
+                        os.close(fd)
+                logger.info(f"Datos agregados a {filepath}")
+                return
         except Exception as e:
             logger.error(f"Error al guardar CSV: {str(e)}")
             raise
+
+    @staticmethod
+    def _create_or_extend(filepath: str, columns: List[str], rows: List[Dict[str, Any]],
+                          fsync: bool) -> bool:
+        """
+        Crea el CSV o amplía su cabecera (con el lock exclusivo ya tomado)
+
+        Args:
+            filepath: Ruta del archivo CSV
+            columns: Columnas de las filas nuevas
+            rows: Filas nuevas
+            fsync: Si True, fuerza los datos a disco
+
+        Returns:
+            True si las filas quedaron escritas; False si otro proceso ya creó o
+            amplió el archivo y basta un append normal
+        """
+        # Sin cache: con el lock tomado se relee lo que dejó el último escritor
+        Transformer._header_cache.pop(filepath, None)
+        header = Transformer._validate_csv(filepath)
+        if header is None:
+            with METRICS.span('csv_create'):
+                Transformer._atomic_write(filepath, [Transformer._format_header(columns),
+                                                     Transformer._format_rows(rows, columns)],
+                                          fsync=fsync)
+            Transformer._header_cache.pop(filepath, None)
+            logger.info(f"Archivo CSV creado: {filepath}")
+            return True
+
+        new_columns = [col for col in columns if col not in header]
+        if not new_columns:
+            return False
+        fd = os.open(filepath, os.O_RDWR)
+        try:
+            Transformer._repair_tail(fd, filepath)
+        finally:
+            os.close(fd)
+        with METRICS.span('csv_rewrite'):
+            Transformer._rewrite_with_columns(filepath, header + new_columns, rows, fsync)
+        logger.info(f"Columnas nuevas {new_columns} agregadas a {filepath}")
+        return True
+
+    @staticmethod
+    def _rewrite_with_columns(filepath: str, header: List[str], rows: List[Dict[str, Any]],
+                              fsync: bool):
+        """
+        Reescribe el CSV con una cabecera ampliada (solo ante cambios de esquema)
+
+        Se llama con el lock exclusivo del archivo tomado (ver
+        append_rows_to_csv), así ningún append cae en el archivo que se descarta.
+
+        Args:
+            filepath: Ruta del archivo CSV
+            header: Cabecera nueva (la anterior más las columnas nuevas)
+            rows: Filas nuevas a agregar al final
+            fsync: Si True, fuerza los datos a disco
+        """
+        def chunks():
+            yield Transformer._format_header(header)
+            with open(filepath, newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                batch = []
+                for existing in reader:
+                    batch.append(existing)
+                    if len(batch) >= 10000:
+                        yield Transformer._format_rows(batch, header)
+                        batch = []
+                if batch:
+                    yield Transformer._format_rows(batch, header)
+            yield Transformer._format_rows(rows, header)
+
+        Transformer._atomic_write(filepath, chunks(), fsync=fsync)
+        Transformer._header_cache.pop(filepath, None)
+
+    @staticmethod
+    def append_to_csv(data: Dict[str, any], filepath: str, fsync: bool = False):
+        """
+        Agrega los datos al archivo CSV (crea el archivo si no existe)
+
+        Args:
+            data: Datos transformados
+            filepath: Ruta del archivo CSV
+            fsync: Si True, fuerza los datos a disco tras la escritura
+        """
+        Transformer.append_rows_to_csv([data], filepath, fsync=fsync)
@@ -0,0 +1,339 @@
+"""
+WriteBehindBuffer - Cola acotada con un escritor de fondo entre el scraping y el almacenamiento
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from change_feed import ChangeNotifier
+from lazy_imports import lazy_import
+from metrics import METRICS
+from rollups import RollupStore
+from storage import RatingStore
+
+pd = lazy_import('pandas')
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Desacopla la latencia del scraping de la del disco
+
+    put() encola la fila y la registra en un journal; un hilo escritor la
+    guarda en el RatingStore en lotes, cuando se juntan batch_size filas o
+    pasan flush_interval segundos desde la primera pendiente. Si la cola está
+    llena, put() bloquea (backpressure) en vez de acumular memoria sin
+    límite; si vence put_timeout la fila no queda ni en la cola ni en el
+    journal.
+
+    Cada fila lleva un número de secuencia; tras cada lote guardado se anota
+    el último confirmado en un archivo .commit. Al iniciar, las filas del
+    journal posteriores a esa marca se vuelven a escribir, así que una fila
+    aceptada por put() no se pierde con un corte. Si el corte cae entre el
+    append al store y el .commit, las filas de ese lote que ya están en el
+    store (mismo TIMESTAMP) se descartan al recuperar en vez de duplicarse;
+    los agregados de ese lote pueden quedar incompletos (rebuild_rollups.py
+    los recalcula).
+    """
+
+    def __init__(self, store: RatingStore, rollups: Optional[RollupStore] = None,
+                 journal_path: Optional[str] = None, max_queue: int = 1000,
+                 batch_size: int = 50, flush_interval: float = 5.0,
+                 put_timeout: Optional[float] = None, fsync_journal: bool = True,
+                 retry_max: float = 30.0, notifier: Optional[ChangeNotifier] = None):
+        """
+        Args:
+            store: Backend donde se guardan las filas
+            rollups: Agregados a actualizar junto con cada lote (opcional)
+            journal_path: Journal write-ahead; por defecto <ubicación del store>.journal
+            max_queue: Filas máximas en memoria antes de bloquear a put()
+            batch_size: Filas por escritura
+            flush_interval: Segundos máximos que una fila espera en la cola
+            put_timeout: Segundos máximos que put() espera con la cola llena
+                (None = sin límite); al vencer se lanza queue.Full
+            fsync_journal: Si True, fuerza cada entrada del journal a disco
+            retry_max: Espera máxima entre reintentos cuando el store falla
+            notifier: Aviso a publicar tras cada lote guardado (opcional)
+        """
+        self.store = store
+        self.rollups = rollups
+        self.journal_path = journal_path or f"{store.location}.journal"
+        self.commit_path = f"{self.journal_path}.commit"
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.fsync_journal = fsync_journal
+        self.retry_max = retry_max
+        self.notifier = notifier
+
+        # Entradas (secuencia, fila)
+        self._queue: "queue.Queue[Tuple[int, Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._journal_lock = threading.Lock()
+        # Serializa put(): la secuencia se asigna, encola y registra en orden
+        self._put_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._committed_seq = self._read_commit()
+        self._last_seq = self._committed_seq
+        self.stats: Dict[str, float] = {
+            'queued': 0, 'written': 0, 'batches': 0, 'retries': 0, 'recovered': 0,
+            'max_depth': 0, 'blocked_seconds': 0.0, 'last_flush_seconds': 0.0,
+        }
+
+    # --- journal -----------------------------------------------------------
+
+    def _read_commit(self) -> int:
+        """Última secuencia confirmada en el store"""
+        try:
+            with open(self.commit_path, encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _write_commit(self, seq: int):
+        """Anota de forma atómica la última secuencia guardada en el store"""
+        tmp_path = f"{self.commit_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(seq))
+            f.flush()
+            if self.fsync_journal:
+                os.fsync(f.fileno())
+        os.replace(tmp_path, self.commit_path)
+        self._committed_seq = seq
+
+    def _journal_append(self, seq: int, row: Dict[str, Any]):
+        """Registra la fila ya encolada en el journal"""
+        with self._journal_lock:
+            line = json.dumps({'seq': seq, 'row': row}, ensure_ascii=False) + '\n'
+            fd = os.open(self.journal_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, line.encode('utf-8'))
+                if self.fsync_journal:
+                    os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._last_seq = seq
+
+    def _truncate_journal(self):
+        """Vacía el journal cuando todo lo registrado ya está en el store"""
+        with self._journal_lock:
+            if self._last_seq == self._committed_seq and os.path.exists(self.journal_path):
+                os.truncate(self.journal_path, 0)
+
+    def _pending_journal(self) -> List[Dict[str, Any]]:
+        """Entradas del journal posteriores a la última confirmada"""
+        entries = []
+        try:
+            with open(self.journal_path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Línea cortada a medio escribir: la fila nunca se encoló
+                        logger.warning(f"Entrada incompleta descartada en {self.journal_path}")
+                        continue
+                    if entry['seq'] > self._committed_seq:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _skip_stored(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Descarta las entradas pendientes que ya llegaron al store
+
+        Un corte entre store.append y el .commit deja el último lote en el
+        store y en el journal. Las primeras entradas pendientes cuyo
+        TIMESTAMP ya está en el store se confirman sin volver a escribirlas.
+
+        Args:
+            entries: Entradas pendientes, en orden de secuencia
+
+        Returns:
+            Entradas que faltan en el store
+        """
+        if not entries:
+            return entries
+        try:
+            stamps = [pd.Timestamp(entry['row']['TIMESTAMP']) for entry in entries]
+            stored = set(self.store.read(start=min(stamps))['TIMESTAMP'])
+        except Exception as e:
+            logger.warning(f"No se pudo comparar el journal con el store ({str(e)}); "
+                           f"se reescribe todo")
+            return entries
+        skipped = 0
+        while skipped < len(entries) and stamps[skipped] in stored:
+            skipped += 1
+        if skipped:
+            logger.warning(f"{skipped} filas del journal ya estaban en el store; no se duplican")
+            self._write_commit(entries[skipped - 1]['seq'])
+        return entries[skipped:]
+
+    def _recover(self) -> int:
+        """
+        Vuelve a encolar las filas del journal que no alcanzaron a guardarse
+
+        Conservan su secuencia original, así que el escritor las guarda (con
+        reintentos) antes que cualquier fila nueva.
+
+        Returns:
+            Filas recuperadas
+        """
+        entries = self._skip_stored(self._pending_journal())
+        with self._journal_lock:
+            self._last_seq = max([self._committed_seq] + [e['seq'] for e in entries])
+            # Cerrar una línea cortada para que la próxima entrada no quede pegada a ella
+            if os.path.exists(self.journal_path) and os.path.getsize(self.journal_path):
+                with open(self.journal_path, 'rb+') as f:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        f.write(b'\n')
+        if not entries:
+            self._truncate_journal()
+            return 0
+        logger.warning(f"Recuperando {len(entries)} filas del journal {self.journal_path}")
+        for entry in entries:
+            self._queue.put((entry['seq'], entry['row']))
+        self.stats['recovered'] += len(entries)
+        return len(entries)
+
+    # --- escritura ---------------------------------------------------------
+
+    def _write_batch(self, rows: List[Dict[str, Any]], last_seq: int):
+        """Guarda un lote en el store y los agregados, y confirma su secuencia"""
+        start = time.perf_counter()
+        with METRICS.span('buffer_flush', backend=type(self.store).__name__):
+            self.store.append(rows)
+        if self.rollups:
+            try:
+                self.rollups.update_many(rows)
+            except Exception as e:
+                logger.error(f"Error al actualizar agregados: {str(e)}")
+        self._write_commit(last_seq)
+        if self.notifier:
+            self.notifier.publish(len(rows), rows[-1].get('TIMESTAMP'))
+        self.stats['written'] += len(rows)
+        self.stats['batches'] += 1
+        self.stats['last_flush_seconds'] = time.perf_counter() - start
+
+    def _flush_with_retry(self, batch: List[Tuple[int, Dict[str, Any]]]) -> bool:
+        """Escribe un lote reintentando con backoff; False si se pidió detener antes"""
+        rows = [row for _, row in batch]
+        delay = 1.0
+        while True:
+            try:
+                self._write_batch(rows, batch[-1][0])
+                return True
+            except Exception as e:
+                self.stats['retries'] += 1
+                logger.error(f"Error al guardar {len(rows)} filas ({str(e)}); "
+                             f"reintento en {delay:.0f}s")
+                if self._stop.wait(delay):
+                    return False
+                delay = min(self.retry_max, delay * 2)
+
+    def _run(self):
+        """Loop del hilo escritor"""
+        while True:
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Al cerrar se vacía lo que quede sin esperar el intervalo
+            while self._stop.is_set() and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            written = self._flush_with_retry(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if not written:
+                # Las filas siguen en el journal y se recuperan al reiniciar
+                logger.error(f"{len(batch)} filas quedan pendientes en {self.journal_path}")
+                return
+            METRICS.set_gauge('ratings_write_queue_depth', self._queue.qsize())
+            self._truncate_journal()
+
+    # --- API pública -------------------------------------------------------
+
+    def start(self):
+        """Recupera el journal pendiente e inicia el hilo escritor"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        self._recover()
+        logger.info(f"Escritura en segundo plano activa (journal: {self.journal_path})")
+
+    def put(self, row: Dict[str, Any]):
+        """
+        Registra una fila para guardarla en segundo plano
+
+        Args:
+            row: Fila transformada
+
+        Raises:
+            queue.Full: si la cola sigue llena tras put_timeout segundos
+        """
+        if self._thread is None:
+            self.start()
+        with self._put_lock:
+            with self._journal_lock:
+                seq = self._last_seq + 1
+            start = time.perf_counter()
+            # Se encola antes de registrar: si vence put_timeout la fila no
+            # queda en el journal, donde un .commit posterior la ocultaría
+            self._queue.put((seq, row), timeout=self.put_timeout)
+            waited = time.perf_counter() - start
+            self._journal_append(seq, row)
+        if waited > 0.01:
+            logger.warning(f"Cola de escritura llena, el scraping esperó {waited:.2f}s")
+        self.stats['blocked_seconds'] += waited
+        self.stats['queued'] += 1
+        depth = self._queue.qsize()
+        self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+        METRICS.set_gauge('ratings_write_queue_depth', depth)
+
+    def flush(self):
+        """Bloquea hasta que todas las filas encoladas estén guardadas"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self, timeout: float = 30.0):
+        """
+        Guarda lo pendiente y detiene el hilo escritor
+
+        Args:
+            timeout: Segundos máximos de espera por el escritor
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            logger.error(f"El escritor no terminó en {timeout:.0f}s; "
+                         f"lo pendiente queda en el journal")
+        self._thread = None
+        logger.info(f"Escritura en segundo plano detenida: {int(self.stats['written'])} filas "
+                    f"en {int(self.stats['batches'])} lotes")
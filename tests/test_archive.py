@@ -0,0 +1,110 @@
+"""
+SegmentArchive, compact y TieredStore: segmentos versionados, retención y lectura entre niveles
+"""
+import os
+import sys
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from archive import RetentionPolicy, SegmentArchive, TieredStore, compact  # noqa: E402
+from storage import create_store  # noqa: E402
+
+NOW = datetime(2024, 5, 20, 12, 0)
+PATHS = {'csv': 'ratings.csv', 'sqlite': 'ratings.db', 'long': 'ratings.bin',
+         'parquet': 'ratings_parquet'}
+
+
+def _rows(*stamps: str) -> list:
+    return [{'TIMESTAMP': ts, 'MEGA': float(i + 1)} for i, ts in enumerate(stamps)]
+
+
+@pytest.fixture(params=sorted(PATHS))
+def hot(request, tmp_path):
+    store = create_store(request.param, str(tmp_path / PATHS[request.param]))
+    store.append(_rows('2024-05-01T21:00:00', '2024-05-02T21:00:00', '2024-05-19T21:00:00'))
+    return store
+
+
+def test_row_arriving_during_compaction_is_archived(hot, tmp_path):
+    archive = SegmentArchive(str(tmp_path / 'archive'))
+    late = pd.DataFrame({'TIMESTAMP': pd.to_datetime(['2024-05-03T21:00:00']), 'MEGA': [9.0]})
+    drop_before = hot.drop_before
+
+    def backfill_then_drop(cutoff, on_drop=None):
+        # Un backfill que escribe entre el inicio de la compactación y el recorte
+        hot.merge_frame(late)
+        return drop_before(cutoff, on_drop=on_drop)
+
+    hot.drop_before = backfill_then_drop
+    summary = compact(hot, archive, RetentionPolicy(hot_days=7, raw_days=None), now=NOW)
+
+    archived = archive.read()
+    assert summary['archived_rows'] == 3
+    assert list(archived['TIMESTAMP'].dt.day) == [1, 2, 3]
+    assert archived['MEGA'].iloc[-1] == 9.0
+    assert list(hot.read()['TIMESTAMP'].dt.day) == [19]
+    assert list(TieredStore(hot, archive).read()['TIMESTAMP'].dt.day) == [1, 2, 3, 19]
+
+
+def _frame(stamps, values) -> pd.DataFrame:
+    return pd.DataFrame({'TIMESTAMP': pd.to_datetime(stamps), 'MEGA': values})
+
+
+def test_segment_archive_versions_segments_and_reads_by_range(tmp_path):
+    archive = SegmentArchive(str(tmp_path / 'archive'))
+    written = archive.write(_frame(['2024-05-01T21:00', '2024-05-02T21:00'], [1.0, 2.0]))
+    assert [s.key for s in written] == ['2024-05-01', '2024-05-02']
+
+    # Una fila tardía crea la versión 2 del día y borra la 1
+    archive.write(_frame(['2024-05-01T22:00'], [3.0]))
+    segments = {s.key: s for s in archive.segments()}
+    assert segments['2024-05-01'].file.startswith('2024-05-01.v2')
+    assert segments['2024-05-01'].rows == 2
+    assert not (tmp_path / 'archive' / '2024-05-01.v1.csv.gz').exists()
+
+    assert archive.read(start='2024-05-01T21:30', end='2024-05-02')['MEGA'].tolist() == [3.0]
+    assert archive.read()['MEGA'].tolist() == [1.0, 3.0, 2.0]
+    assert archive.bounds() == ('2024-05-01T00:00:00', '2024-05-03T00:00:00')
+
+    # merge conserva lo archivado y solo completa lo que falta
+    assert archive.merge(_frame(['2024-05-01T21:00', '2024-05-01T23:00'], [9.0, 4.0])) == 1
+    assert archive.read()['MEGA'].tolist() == [1.0, 3.0, 4.0, 2.0]
+
+
+def test_compact_rolls_up_rows_past_the_raw_window(tmp_path):
+    hot = create_store('csv', str(tmp_path / 'ratings.csv'))
+    hot.append(_rows('2024-04-01T21:00:00', '2024-04-01T21:30:00', '2024-05-10T21:00:00',
+                     '2024-05-19T21:00:00'))
+    archive = SegmentArchive(str(tmp_path / 'archive'))
+
+    summary = compact(hot, archive, RetentionPolicy(hot_days=7, raw_days=30), now=NOW)
+
+    assert summary['cutoff'] == '2024-05-13T00:00:00'
+    assert summary['archived_rows'] == 3 and summary['segments'] == 2
+    resolutions = {s.key: s.resolution for s in archive.segments()}
+    assert resolutions == {'2024-04-01': 'h', '2024-05-10': 'raw'}
+    # Las dos lecturas de las 21 h del 1 de abril quedan promediadas
+    assert archive.read(end='2024-04-02')['MEGA'].tolist() == [1.5]
+    assert hot.read()['MEGA'].tolist() == [4.0]
+
+
+def test_tiered_store_reads_across_tiers_once_and_routes_backfill(tmp_path):
+    hot = create_store('csv', str(tmp_path / 'ratings.csv'))
+    archive = SegmentArchive(str(tmp_path / 'archive'))
+    archive.write(_frame(['2024-05-01T21:00', '2024-05-02T21:00'], [1.0, 2.0]))
+    # Compactación interrumpida: el 2 de mayo quedó en ambos niveles
+    hot.append(_rows('2024-05-02T21:00:00', '2024-05-04T21:00:00'))
+    tiered = TieredStore(hot, archive)
+
+    df = tiered.read()
+    assert list(df['TIMESTAMP'].dt.day) == [1, 2, 4]
+    assert tiered.read(start='2024-05-02', end='2024-05-03')['TIMESTAMP'].dt.day.tolist() == [2]
+
+    added = tiered.merge_frame(_frame(['2024-05-01T22:00', '2024-05-05T21:00'], [7.0, 8.0]))
+    assert added == 2
+    assert archive.read()['TIMESTAMP'].dt.hour.tolist() == [21, 22, 21]
+    assert hot.read()['TIMESTAMP'].dt.day.tolist() == [2, 4, 5]
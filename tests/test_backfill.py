@@ -0,0 +1,71 @@
+"""
+BackfillLoader: deduplicación dentro del lote y contra el historial existente
+"""
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from backfill import BackfillLoader  # noqa: E402
+from storage import create_store  # noqa: E402
+
+CHANNELS = {'MEGA': 'mega', 'CHV': 'chv'}
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    wide = tmp_path / 'export.csv'
+    wide.write_text("timestamp,Mega,Chilevision\n"
+                    "2024-05-01T21:00:00,9.0,4.0\n"
+                    "2024-05-01T21:01:00,6.0,\n"
+                    "2024-05-01T21:01:00,,3.0\n")
+    long = tmp_path / 'events.csv'
+    long.write_text("TIMESTAMP,CHANNEL,RATING\n"
+                    "2024-05-02T01:02:00+00:00,MEGA,7.0\n"
+                    "2024-05-02T01:02:00+00:00,MEGA,7.5\n")
+    return [str(wide), str(long)]
+
+
+@pytest.fixture
+def utc(monkeypatch):
+    # Las fechas con desfase se pasan a la hora local del equipo
+    monkeypatch.setenv('TZ', 'UTC')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+# Con un lote por bloque, entre lotes gana la lectura que se escribió primero
+@pytest.mark.parametrize('batch_rows, duplicates, late_mega', [(1000, 1, 7.5), (1, 0, 7.0)])
+def test_load_keeps_existing_readings_and_dedupes_the_batch(tmp_path, inputs, utc, batch_rows,
+                                                              duplicates, late_mega):
+    store = create_store('csv', str(tmp_path / 'ratings.csv'))
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0, 'CHV': None}])
+    loader = BackfillLoader(CHANNELS, workers=1, chunksize=1, batch_rows=batch_rows,
+                            renames={'CHILEVISION': 'CHV'})
+
+    summary = loader.load(store, csv_paths=inputs)
+
+    # MEGA de las 21:00 ya estaba: solo se completa CHV
+    assert summary['added'] == 4
+    assert summary['duplicates'] == duplicates
+    df = store.read()
+    assert list(df['TIMESTAMP'].dt.strftime('%H:%M')) == ['21:00', '21:01', '01:02']
+    assert df['MEGA'].tolist() == [5.0, 6.0, late_mega]
+    assert df['CHV'].tolist()[:2] == [4.0, 3.0]
+
+    # Repetir la carga no agrega nada
+    assert BackfillLoader(CHANNELS, workers=1, renames={'CHILEVISION': 'CHV'}).load(
+        store, csv_paths=inputs)['added'] == 0
+
+
+def test_dry_run_does_not_write(tmp_path, inputs):
+    store = create_store('csv', str(tmp_path / 'ratings.csv'))
+    summary = BackfillLoader(CHANNELS, workers=1).load(store, csv_paths=inputs, dry_run=True)
+
+    assert summary['rows'] == 3 and summary['added'] == 0
+    assert not store.exists()
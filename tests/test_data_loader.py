@@ -0,0 +1,33 @@
+"""
+Regresiones de IncrementalLoader sobre LongStore
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import long_format  # noqa: E402
+from data_loader import IncrementalLoader  # noqa: E402
+from storage import LongStore  # noqa: E402
+
+
+def test_row_split_across_reads_is_combined(tmp_path):
+    store = LongStore(str(tmp_path / 'ratings.bin'))
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0, 'CHV': 4.0}])
+    loader = IncrementalLoader(store)
+    loader.load()
+
+    # Un append visto a medias: solo el primer registro de la fila
+    row = {'TIMESTAMP': '2024-05-01T21:01:00', 'MEGA': 6.0, 'CHV': 3.0}
+    records = long_format.rows_to_records([row])
+    payload = long_format.pack_records(records, {'MEGA': 0, 'CHV': 1})
+    with open(store.filepath, 'ab') as f:
+        f.write(payload[:long_format.RECORD_SIZE])
+    assert len(loader.load()) == 2
+    with open(store.filepath, 'ab') as f:
+        f.write(payload[long_format.RECORD_SIZE:])
+    frame = loader.load()
+
+    assert len(frame) == 2
+    assert frame['TIMESTAMP'].is_unique
+    assert frame.iloc[-1][['MEGA', 'CHV']].tolist() == [6.0, 3.0]
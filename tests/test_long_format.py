@@ -0,0 +1,70 @@
+"""
+Regresiones del formato largo y de LongStore
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import long_format  # noqa: E402
+from storage import LongStore, create_store  # noqa: E402
+
+
+def test_scraper_timestamps_keep_microseconds(tmp_path):
+    store = LongStore(str(tmp_path / 'ratings.bin'))
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00.123456', 'MEGA': 5.0},
+                  {'TIMESTAMP': '2024-05-01T21:00:00.123999', 'MEGA': 6.0}])
+
+    df = store.read()
+    assert list(df['TIMESTAMP']) == [pd.Timestamp('2024-05-01T21:00:00.123456'),
+                                     pd.Timestamp('2024-05-01T21:00:00.123999')]
+    # El mismo lote leído de un CSV se reconoce como ya guardado
+    assert store.merge_frame(df) == 0
+    assert len(store.read()) == 2
+
+
+def test_read_incremental_creates_no_files(tmp_path):
+    store = LongStore(str(tmp_path / 'ratings.bin'))
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0}])
+    os.remove(store.filepath + '.lock')
+    before = sorted(os.listdir(tmp_path))
+    os.chmod(tmp_path, 0o555)
+    try:
+        df, cursor, reset = store.read_incremental()
+    finally:
+        os.chmod(tmp_path, 0o755)
+
+    assert reset and list(df['MEGA']) == [5.0]
+    assert sorted(os.listdir(tmp_path)) == before
+
+
+def test_wide_long_round_trip_keeps_values_and_missing_readings():
+    wide = pd.DataFrame({
+        'TIMESTAMP': pd.to_datetime(['2024-05-01T21:00:00', '2024-05-01T21:00:30.250000'],
+                                    format='ISO8601'),
+        'MEGA': [5.1, float('nan')],
+        'CHV': [0.0, 14.4],
+    })
+
+    long = long_format.wide_to_long(wide)
+    assert len(long) == 4 and str(long['rating'].dtype) == 'float32'
+    back = long_format.long_to_wide(long, channels=['MEGA', 'CHV'])
+    pd.testing.assert_frame_equal(back, wide, check_dtype=False)
+
+    # 0.0 del historial viejo como lectura faltante
+    nulls = long_format.long_to_wide(long_format.wide_to_long(wide, zero_as_null=True))
+    assert pd.isna(nulls['CHV'].iloc[0]) and nulls['CHV'].iloc[1] == 14.4
+
+
+def test_long_store_matches_csv_rows(tmp_path):
+    rows = [{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.1, 'CHV': None},
+            {'TIMESTAMP': '2024-05-01T21:01:00', 'MEGA': 6.0, 'CHV': 3.25, 'TVN': 1.0}]
+    csv_store = create_store('csv', str(tmp_path / 'ratings.csv'))
+    long_store = create_store('long', str(tmp_path / 'ratings.bin'))
+    for row in rows:
+        csv_store.append([row])
+        long_store.append([row])
+
+    pd.testing.assert_frame_equal(long_store.read(), csv_store.read(), check_dtype=False)
@@ -0,0 +1,21 @@
+"""
+Regresiones de MetricsRegistry
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from metrics import MetricsRegistry  # noqa: E402
+
+
+def test_overflow_observation_does_not_leak_into_sum():
+    registry = MetricsRegistry()
+    registry.observe('x', 100.0)
+    registry.observe('x', 0.5)
+    text = registry.render_prometheus()
+
+    assert 'x_sum 100.500000' in text
+    assert 'x_bucket{le="60"} 1' in text
+    assert 'x_bucket{le="+Inf"} 2' in text
+    assert 'x_count 2' in text
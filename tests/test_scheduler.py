@@ -0,0 +1,115 @@
+"""
+AlignedScheduler con un reloj simulado: alineación, solapamiento y backoff
+"""
+import calendar
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from scheduler import AlignedScheduler  # noqa: E402
+
+
+class FakeClock:
+    """Reloj de pared simulado; el Event del scheduler lo avanza en vez de dormir"""
+
+    def __init__(self, now: float):
+        self.now = now
+        self.stopped = False
+
+    def __call__(self) -> float:
+        return self.now
+
+    # Interfaz de threading.Event que usa AlignedScheduler
+    def wait(self, timeout: float) -> bool:
+        self.now += timeout
+        return self.stopped
+
+    def set(self):
+        self.stopped = True
+
+    def clear(self):
+        self.stopped = False
+
+    def is_set(self) -> bool:
+        return self.stopped
+
+
+def _local(*parts) -> float:
+    """Epoch de una hora local en UTC-3 (ver fixture chile_time)"""
+    return calendar.timegm(parts) + 3 * 3600
+
+
+@pytest.fixture(autouse=True)
+def chile_time(monkeypatch):
+    monkeypatch.setenv('TZ', '<-03>3')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def _scheduler(clock: FakeClock, **kwargs) -> AlignedScheduler:
+    scheduler = AlignedScheduler(1800, clock=clock, jitter=0.0, **kwargs)
+    scheduler._stop = clock
+    return scheduler
+
+
+def test_ticks_align_to_local_half_hours():
+    clock = FakeClock(_local(2024, 5, 1, 21, 10, 5))
+    scheduler = _scheduler(clock)
+    ticks = []
+    scheduler.run(lambda scheduled: ticks.append(scheduled), max_runs=3)
+
+    assert ticks == [_local(2024, 5, 1, 21, 30, 0), _local(2024, 5, 1, 22, 0, 0),
+                     _local(2024, 5, 1, 22, 30, 0)]
+    assert scheduler.stats['max_lag'] == 0
+
+
+@pytest.mark.parametrize('policy, expected, skipped', [
+    # 21:30 dura 70 min: skip omite 22:00 y 22:30; queue corre 22:30 ya
+    ('skip', [(21, 30), (23, 0)], 2),
+    ('queue', [(21, 30), (22, 30)], 1),
+])
+def test_overlapping_run_follows_policy(policy, expected, skipped):
+    clock = FakeClock(_local(2024, 5, 1, 21, 10, 0))
+    scheduler = _scheduler(clock, overlap_policy=policy)
+    ticks = []
+
+    def job(scheduled):
+        ticks.append(scheduled)
+        if len(ticks) == 1:
+            clock.now += 70 * 60
+
+    scheduler.run(job, max_runs=2)
+    assert ticks == [_local(2024, 5, 1, hour, minute, 0) for hour, minute in expected]
+    assert scheduler.stats['skipped'] == skipped
+
+
+def test_failures_retry_with_exponential_backoff_until_next_tick():
+    clock = FakeClock(_local(2024, 5, 1, 21, 29, 0))
+    scheduler = _scheduler(clock, backoff_base=5.0)
+    attempts = []
+
+    def job(scheduled):
+        attempts.append(clock.now - scheduled)
+        if len(attempts) < 3:
+            raise RuntimeError("sin conexión")
+
+    scheduler.run(job, max_runs=1)
+    assert attempts == [0, 5, 15]
+    assert scheduler.stats['failures'] == 2 and scheduler.stats['retries'] == 2
+
+    # Un reintento que caería después del próximo tick no se hace
+    scheduler = _scheduler(clock, backoff_base=1000.0, backoff_max=5000.0)
+    calls = []
+
+    def always_fails(scheduled):
+        calls.append(scheduled)
+        raise RuntimeError("sin conexión")
+
+    scheduler.run(always_fails, max_runs=1)
+    assert len(calls) == 2 and scheduler.stats['retries'] == 1
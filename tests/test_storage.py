@@ -0,0 +1,93 @@
+"""
+Comportamiento común de los backends de almacenamiento
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage import create_store  # noqa: E402
+
+PATHS = {'csv': 'ratings.csv', 'sqlite': 'ratings.db', 'long': 'ratings.bin',
+         'parquet': 'ratings_parquet'}
+
+
+@pytest.fixture(params=sorted(PATHS))
+def store(request, tmp_path):
+    return create_store(request.param, str(tmp_path / PATHS[request.param]))
+
+
+def _frame(stamps, **channels) -> pd.DataFrame:
+    df = pd.DataFrame({'TIMESTAMP': pd.to_datetime(stamps)})
+    for name, values in channels.items():
+        df[name] = np.array(values, dtype='float64')
+    return df
+
+
+def test_merge_frame_skips_rows_without_readings(store):
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0}])
+    batch = _frame(['2024-05-01T20:00:00', '2024-05-01T22:00:00'], MEGA=[np.nan, 7.0])
+
+    assert store.merge_frame(batch) == 1
+    assert list(store.read()['TIMESTAMP'].dt.hour) == [21, 22]
+
+
+def test_append_reads_back_sorted_with_new_channels(store):
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0, 'CHV': None}])
+    store.append([{'TIMESTAMP': '2024-05-01T21:01:00', 'MEGA': 6.0, 'CHV': 3.5, 'TVN': 2.0}])
+
+    df = store.read()
+    assert list(df['TIMESTAMP'].dt.minute) == [0, 1]
+    assert df['MEGA'].tolist() == [5.0, 6.0]
+    assert np.isnan(df['CHV'].iloc[0]) and df['CHV'].iloc[1] == 3.5
+    assert np.isnan(df['TVN'].iloc[0]) and df['TVN'].iloc[1] == 2.0
+    assert list(store.read(start='2024-05-01T21:01:00')['TIMESTAMP'].dt.minute) == [1]
+
+
+def test_merge_frame_keeps_existing_readings_and_fills_gaps(store):
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0, 'CHV': None},
+                  {'TIMESTAMP': '2024-05-01T21:02:00', 'MEGA': 7.0, 'CHV': 1.0}])
+    batch = _frame(['2024-05-01T20:59:00', '2024-05-01T21:00:00', '2024-05-01T21:01:00'],
+                   MEGA=[4.0, 99.0, 6.0], CHV=[np.nan, 2.0, np.nan])
+
+    # 20:59 MEGA, 21:00 CHV (MEGA ya estaba) y 21:01 MEGA
+    assert store.merge_frame(batch) == 3
+    df = store.read()
+    assert list(df['TIMESTAMP'].dt.minute) == [59, 0, 1, 2]
+    assert df['MEGA'].tolist() == [4.0, 5.0, 6.0, 7.0]
+    assert df['CHV'].iloc[1] == 2.0
+    assert store.merge_frame(batch) == 0
+
+
+def test_drop_before_removes_only_older_rows(store):
+    store.append([{'TIMESTAMP': f"2024-05-0{day}T21:00:00", 'MEGA': float(day)}
+                  for day in (1, 2, 3)])
+    dropped = []
+
+    assert store.drop_before('2024-05-02', on_drop=dropped.append) == 1
+    assert list(store.read()['MEGA']) == [2.0, 3.0]
+    assert len(dropped) == 1 and dropped[0]['MEGA'].tolist() == [1.0]
+    assert store.drop_before('2024-05-02') == 0
+
+
+def test_read_incremental_returns_only_new_rows(store):
+    store.append([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 5.0}])
+    df, cursor, reset = store.read_incremental()
+    assert reset and df['MEGA'].tolist() == [5.0]
+
+    df, cursor, reset = store.read_incremental(cursor)
+    assert not reset and df.empty
+
+    store.append([{'TIMESTAMP': '2024-05-01T21:01:00', 'MEGA': 6.0}])
+    df, cursor, reset = store.read_incremental(cursor)
+    assert not reset and df['MEGA'].tolist() == [6.0]
+
+    # csv y long detectan el archivo reescrito y releen todo; sqlite y parquet
+    # siguen desde el último TIMESTAMP
+    store.drop_before('2024-05-01T21:01:00')
+    df, cursor, reset = store.read_incremental(cursor)
+    assert df['MEGA'].tolist() == ([6.0] if reset else [])
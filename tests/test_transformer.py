@@ -0,0 +1,53 @@
+"""
+Regresiones del append al CSV con varios procesos escribiendo el mismo archivo
+"""
+import csv
+import multiprocessing
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from transformer import Transformer  # noqa: E402
+
+
+def _write_rows(filepath: str, worker: int):
+    # Cada proceso trae su propio canal: crea el archivo o lo amplía
+    for k in range(50):
+        row = {'TIMESTAMP': f"2024-05-01T{worker:02d}:00:{k:02d}", 'MEGA': 1.0,
+               f"C{worker}": float(k)}
+        Transformer.append_rows_to_csv([row], filepath)
+
+
+def test_concurrent_create_and_new_columns_keep_every_row(tmp_path):
+    filepath = str(tmp_path / 'ratings.csv')
+    processes = [multiprocessing.Process(target=_write_rows, args=(filepath, worker))
+                 for worker in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    with open(filepath, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 200
+    assert {f"C{worker}" for worker in range(4)} <= set(rows[0])
+    assert all(row['MEGA'] == '1.0' for row in rows)
+    # Cada fila conserva el valor de su propio canal (hora = proceso, segundo = k)
+    assert all(float(row[f"C{int(row['TIMESTAMP'][11:13])}"]) == int(row['TIMESTAMP'][17:])
+               for row in rows)
+
+
+def test_torn_line_from_another_process_is_repaired_with_header_cached(tmp_path):
+    filepath = str(tmp_path / 'ratings.csv')
+    Transformer.append_rows_to_csv([{'TIMESTAMP': '2024-05-01T21:00:00', 'MEGA': 1.0}], filepath)
+    Transformer.append_rows_to_csv([{'TIMESTAMP': '2024-05-01T21:01:00', 'MEGA': 2.0}], filepath)
+    # Otro proceso se cortó a mitad de su append; la cabecera sigue en cache
+    with open(filepath, 'ab') as f:
+        f.write(b'2024-05-01T21:02:00,3')
+    Transformer.append_rows_to_csv([{'TIMESTAMP': '2024-05-01T21:03:00', 'MEGA': 4.0}], filepath)
+
+    with open(filepath, encoding='utf-8') as f:
+        lines = f.read().splitlines()
+    assert lines == ['TIMESTAMP,MEGA', '2024-05-01T21:00:00,1.0', '2024-05-01T21:01:00,2.0',
+                     '2024-05-01T21:03:00,4.0']